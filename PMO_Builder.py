@@ -1,5 +1,6 @@
 import streamlit as st
 from src.format_page import render_header
+from src.schema_index import get_schema_index
 
 
 def main():
@@ -58,4 +59,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Build the schema matching index once, before any page needs it
+    get_schema_index()
     main()
@@ -0,0 +1,335 @@
+"""
+Benchmark of field matching speed, memory and accuracy.
+
+Synthetic tables are generated from the targets and alternate names of
+sections of conf/schema.json, with controlled noise. Every required target
+is present, optional targets fill part of the remaining columns and the
+rest are near misses: names of the section decorated the way pipelines add
+related columns (e.g. "reads_filtered"), holding the same kind of values,
+and targets of other sections. For each size the mapping path of
+`load_data` (profiling the preview rows, suggesting the required then the
+optional mapping, and reading it back from the mapping editor's table) is
+timed, its peak memory traced and its accuracy scored against the known
+answer, with and without the column profiles. Results are written as JSON
+so runs can be compared when the matcher changes.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.field_matching --output field_matching.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import string
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib.metadata import version
+
+import pandas as pd
+
+from src.field_matcher import (
+    MATCH_CACHE,
+    PROFILE_SAMPLE_ROWS,
+    TARGET_CONTENT,
+    mapping_table,
+    profile_columns,
+    read_mapping_table,
+    suggest_field_mapping,
+)
+from src.utils import load_schema
+
+DEFAULT_SIZES = (10, 50, 100, 500, 1000, 5000)
+DEFAULT_SECTIONS = ("specimen_level_metadata", "panel_info", "mhap_info")
+DEFAULT_NOISE = 0.3
+DEFAULT_REPEATS = 3
+SEPARATORS = ("_", " ", "-", ".", "")
+# Words pipelines add to related columns, making near misses of a target
+DECORATIONS = (
+    "raw",
+    "total",
+    "filtered",
+    "mean",
+    "qc",
+    "old",
+    "flag",
+    "notes",
+    "pct",
+    "rc",
+    "2",
+)
+
+
+def _add_noise(name, noise, rng):
+    """Rename a header the way real pipelines do, each change with `noise`."""
+    words = name.replace("-", "_").split("_")
+    if rng.random() < noise:
+        words = [word.capitalize() for word in words]
+    if rng.random() < noise:
+        name = rng.choice(SEPARATORS).join(words)
+    else:
+        name = "_".join(words)
+    if rng.random() < noise and len(name) > 4:
+        # Drop one character, as in a typo or an abbreviation
+        i = rng.randrange(len(name))
+        name = name[:i] + name[i + 1 :]
+    if rng.random() < noise:
+        name = name.upper() if rng.random() < 0.5 else name.lower()
+    return name
+
+
+def _section_names(fields):
+    """Every target and alternate name of a section, with the target it names."""
+    alternatives = {
+        **fields.get("optional_alternatives", {}),
+        **fields.get("required_alternatives", {}),
+    }
+    names = {}
+    for target in fields.get("required", []) + fields.get("optional", []):
+        for name in (target, *alternatives.get(target, [])):
+            names.setdefault(name, target)
+    return names
+
+
+def _near_miss(section_names, other_names, noise, rng):
+    """
+    A header close to the targets without being one.
+
+    Returns:
+        str: The header.
+        str: The target whose kind of values the header holds, or None.
+    """
+    if other_names and rng.random() < 0.5:
+        return _add_noise(rng.choice(other_names), noise, rng), None
+    name = rng.choice(list(section_names))
+    decoration = rng.choice(DECORATIONS)
+    if rng.random() < 0.5:
+        decorated = f"{decoration}_{name}"
+    else:
+        decorated = f"{name}_{decoration}"
+    return _add_noise(decorated, noise, rng), section_names[name]
+
+
+def synthetic_headers(fields, n_columns, noise, rng, other_names=()):
+    """
+    Generate input headers for a schema section.
+
+    Args:
+        fields (dict): Section of the schema with required and optional
+            targets and their alternatives.
+        n_columns (int): Number of headers to generate; at least one per
+            required target.
+        noise (float): Probability of each renaming step.
+        rng (random.Random): Source of randomness.
+        other_names (list): Targets of other sections, used as near misses.
+
+    Returns:
+        list: Headers in random order.
+        dict: The header generated for each target.
+        dict: The target whose kind of values each header holds, or None.
+    """
+    required = fields.get("required", [])
+    optional = fields.get("optional", [])
+    alternatives = {
+        **fields.get("optional_alternatives", {}),
+        **fields.get("required_alternatives", {}),
+    }
+    # Optional targets fill half of the columns left after the required ones
+    n_optional = min(len(optional), max(0, n_columns - len(required)) // 2)
+    targets = required + rng.sample(optional, n_optional)
+    truth, holds = {}, {}
+    for target in targets:
+        name = rng.choice([target, *alternatives.get(target, [])])
+        header = _add_noise(name, noise, rng) or name
+        while header in holds:
+            header = f"{header}_{rng.randint(1, 9)}"
+        truth[target] = header
+        holds[header] = target
+    section_names = _section_names(fields)
+    taken = {name.lower() for name in section_names}
+    while len(holds) < n_columns:
+        header, target = _near_miss(section_names, list(other_names), noise, rng)
+        if not header or header in holds or header.lower() in taken:
+            header = "".join(rng.choices(string.ascii_lowercase, k=8))
+            target = None
+        if header not in holds:
+            holds[header] = target
+    headers = list(holds)
+    rng.shuffle(headers)
+    return headers, truth, holds
+
+
+def _values(content, rows, rng):
+    """Sample values of one kind of column."""
+    if content == "dna":
+        return [
+            "".join(rng.choices("ACGT", k=rng.randint(18, 40))) for _ in range(rows)
+        ]
+    if content == "count":
+        return [rng.randint(0, 5000) for _ in range(rows)]
+    if content == "pseudocigar":
+        return [
+            "".join(f"{rng.randint(1, 250)}{rng.choice('ACGT')}" for _ in range(3))
+            for _ in range(rows)
+        ]
+    if content == "date":
+        return [
+            f"20{rng.randint(10, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            for _ in range(rows)
+        ]
+    prefix = "".join(rng.choices(string.ascii_uppercase, k=2))
+    return [f"{prefix}{rng.randint(1, 999)}" for _ in range(rows)]
+
+
+def synthetic_preview(headers, holds, rng, rows=PROFILE_SAMPLE_ROWS):
+    """Preview rows whose values fit the target each header holds."""
+    return pd.DataFrame(
+        {
+            header: _values(TARGET_CONTENT.get(holds[header]), rows, rng)
+            for header in headers
+        }
+    )
+
+
+def match_headers(headers, fields, field_profiles=None):
+    """The mapping path of `load_data`, without the widgets."""
+    mapped_fields, unused = suggest_field_mapping(
+        headers,
+        fields["required"],
+        fields.get("required_alternatives"),
+        is_required=True,
+        field_profiles=field_profiles,
+    )
+    groups = [fields["required"]]
+    mappings = [mapped_fields]
+    if fields.get("optional"):
+        mapped_optional_fields, unused = suggest_field_mapping(
+            unused,
+            fields["optional"],
+            fields.get("optional_alternatives"),
+            is_required=False,
+            field_profiles=field_profiles,
+        )
+        groups.append(fields["optional"])
+        mappings.append(mapped_optional_fields)
+    mappings, _ = read_mapping_table(mapping_table(headers, mappings), groups)
+    return {target: field for mapping in mappings for target, field in mapping.items()}
+
+
+def profile_and_match(headers, fields, preview):
+    """Profile the preview rows, then match the headers with the profiles."""
+    return match_headers(headers, fields, profile_columns(preview))
+
+
+def accuracy(matches, truth, targets):
+    """Share of the generated targets in `targets` matched to their header."""
+    present = [target for target in targets if target in truth]
+    if not present:
+        return None
+    correct = sum(matches.get(target) == truth[target] for target in present)
+    return correct / len(present)
+
+
+def run_size(fields, n_columns, noise, repeats, seed, other_names=()):
+    """Benchmark one number of columns."""
+    rng = random.Random(f"{seed}-{n_columns}")
+    headers, truth, holds = synthetic_headers(
+        fields, n_columns, noise, rng, other_names
+    )
+    preview = synthetic_preview(headers, holds, rng)
+    seconds = []
+    for _ in range(repeats):
+        # Time the matcher itself, not the result cache
+        MATCH_CACHE.clear()
+        start = time.perf_counter()
+        matches = profile_and_match(headers, fields, preview)
+        seconds.append(time.perf_counter() - start)
+    MATCH_CACHE.clear()
+    tracemalloc.start()
+    profile_and_match(headers, fields, preview)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    MATCH_CACHE.clear()
+    names_only = match_headers(headers, fields)
+    MATCH_CACHE.clear()
+    return {
+        "n_columns": len(headers),
+        "n_targets_present": len(truth),
+        "seconds_median": statistics.median(seconds),
+        "seconds_min": min(seconds),
+        "peak_bytes": peak_bytes,
+        "accuracy": accuracy(matches, truth, list(truth)),
+        "required_accuracy": accuracy(matches, truth, fields["required"]),
+        "optional_accuracy": accuracy(matches, truth, fields.get("optional", [])),
+        "names_only_accuracy": accuracy(names_only, truth, list(truth)),
+    }
+
+
+def run_section(schema, section, sizes, noise, repeats, seed):
+    """Benchmark every size for one section of the schema."""
+    fields = schema[section]
+    own = set(_section_names(fields))
+    other_names = sorted(
+        {
+            target
+            for name, other in schema.items()
+            if name != section and isinstance(other, dict)
+            for group in ("required", "optional")
+            for target in other.get(group) or []
+            if target not in own
+        }
+    )
+    results = []
+    for n_columns in sizes:
+        result = run_size(fields, n_columns, noise, repeats, seed, other_names)
+        print(
+            f"{section:<32} {result['n_columns']:>6} columns: "
+            f"{result['seconds_median'] * 1000:9.2f} ms, "
+            f"peak {result['peak_bytes'] / 1024**2:7.2f} MB, "
+            f"accuracy {result['accuracy']:.3f} "
+            f"(names only {result['names_only_accuracy']:.3f})"
+        )
+        results.append(result)
+    return {"section": section, "results": results}
+
+
+def run(sections, sizes, noise, repeats, seed):
+    """Benchmark every section and size and describe the run."""
+    schema = load_schema()
+    return {
+        "benchmark": "field_matching",
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "rapidfuzz": version("rapidfuzz"),
+        "noise": noise,
+        "repeats": repeats,
+        "seed": seed,
+        "sections": [
+            run_section(schema, section, sizes, noise, repeats, seed)
+            for section in sections
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--output", default="field_matching.json", help="JSON file for results"
+    )
+    parser.add_argument("--sections", nargs="+", default=list(DEFAULT_SECTIONS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--noise", type=float, default=DEFAULT_NOISE)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    report = run(args.sections, args.sizes, args.noise, args.repeats, args.seed)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
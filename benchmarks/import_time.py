@@ -0,0 +1,99 @@
+"""
+Benchmark of the import time of the transforms and the pmotools builders.
+
+Each import is timed in a fresh interpreter, after the libraries every page
+loads anyway (pandas and streamlit), so the numbers are what a cold page
+load pays on top of them. Results are written as JSON so runs can be
+compared when imports change.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.import_time --output import_time.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from src.transformer import BUILDER_MODULES
+
+# Imported before timing, as every page already has them loaded
+BASELINE_MODULES = ("pandas", "streamlit")
+DEFAULT_REPEATS = 5
+
+TIMER = """
+import sys, time
+for module in {baseline!r}:
+    __import__(module)
+start = time.perf_counter()
+__import__({module!r})
+seconds = time.perf_counter() - start
+loaded = sorted(name for name in sys.modules if "pmo_builder." in name)
+print(seconds)
+print(",".join(loaded))
+"""
+
+
+def time_import(module, repeats=DEFAULT_REPEATS, baseline=BASELINE_MODULES):
+    """
+    Time importing `module` in fresh interpreters.
+
+    Returns:
+        dict: Median and minimum seconds, and the pmotools builder modules
+            loaded by the import.
+    """
+    seconds = []
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-c", TIMER.format(baseline=baseline, module=module)],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        elapsed, loaded = result.stdout.splitlines()[-2:]
+        seconds.append(float(elapsed))
+    return {
+        "module": module,
+        "seconds_median": statistics.median(seconds),
+        "seconds_min": min(seconds),
+        "builder_modules_loaded": loaded.split(",") if loaded else [],
+    }
+
+
+def run(repeats):
+    """Time the transforms module and each builder module."""
+    modules = ["src.transformer", *dict.fromkeys(BUILDER_MODULES.values())]
+    results = []
+    for module in modules:
+        result = time_import(module, repeats)
+        print(f"{module:<55} {result['seconds_median'] * 1000:8.2f} ms")
+        results.append(result)
+    return {
+        "benchmark": "import_time",
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "baseline_modules": list(BASELINE_MODULES),
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--output", default="import_time.json", help="JSON file for results"
+    )
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    args = parser.parse_args(argv)
+    report = run(args.repeats)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
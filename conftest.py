@@ -1,6 +1,7 @@
 """
 Pytest configuration for pmotools-app
 """
+import io
 import pytest
 import sys
 import os
@@ -39,3 +40,19 @@ def sample_field_mapping():
         "patientName": "patient_name",
         "collectionDate": None,
     }
+
+
+@pytest.fixture
+def make_upload():
+    """Factory for in-memory uploads, named like Streamlit's uploaded files."""
+
+    def make(content, name="upload.csv", file_id=None):
+        if isinstance(content, str):
+            content = content.encode()
+        file_obj = io.BytesIO(content)
+        file_obj.name = name
+        if file_id is not None:
+            file_obj.file_id = file_id
+        return file_obj
+
+    return make
@@ -1,13 +1,23 @@
 import streamlit as st
-import pandas as pd
 from typing import Dict, List, Optional, Any
 from src.format_page import render_header
-from src.data_loader import load_csv
+from src.data_loader import COMPRESSED_FILE_TYPES, load_list_or_table
 
 # Constants
 REQUIRED_FIELDS = ["project_name", "project_description"]
 SEPARATOR_OPTIONS = {"newline": "\n", ",": ",", "tab": "\t"}
-SUPPORTED_FILE_TYPES = ["csv", "tsv", "txt", "xlsx", "xls"]
+SUPPORTED_FILE_TYPES = ["csv", "tsv", "txt", "xlsx", "xls"] + COMPRESSED_FILE_TYPES
+# First lines of a contributor list that are a header rather than a name
+CONTRIBUTOR_HEADER_NAMES = {
+    "name",
+    "names",
+    "contributor",
+    "contributors",
+    "person",
+    "people",
+    "author",
+    "authors",
+}
 
 
 class ProjectInfoPage:
@@ -62,69 +72,13 @@ class ProjectInfoPage:
             return []
 
         try:
-            # Reset file pointer to beginning in case it was read before
-            uploaded_file.seek(0)
-
-            # For text-based files, check if it's a simple list first
-            # Excel files are always read with header assumption
-            is_text_file = uploaded_file.name.endswith((".csv", ".tsv", ".txt"))
-
-            if is_text_file:
-                # Read file content to check if it's a simple list (one value per line)
-                uploaded_file.seek(0)
-                content = uploaded_file.read().decode("utf-8")
-                lines = [line.strip() for line in content.split("\n") if line.strip()]
-
-                # Check if this looks like a simple list (each line has one value, no commas/tabs in most lines)
-                # Count lines that look like they have multiple values (contain comma or tab)
-                multi_value_lines = sum(
-                    1 for line in lines if "," in line or "\t" in line
-                )
-
-                # If less than 20% of lines have separators, treat as simple list
-                if lines and multi_value_lines / len(lines) < 0.2:
-                    # It's a simple list - create DataFrame from lines
-                    df = pd.DataFrame(lines, columns=["contributor"])
-                else:
-                    # It's likely a structured file - use load_csv with auto-detection
-                    uploaded_file.seek(0)
-                    df = load_csv(uploaded_file)
-
-                # For single-column files from auto-detection, check if first row was treated as header
-                if len(df.columns) == 1 and not df.empty:
-                    column_name = str(df.columns[0]).lower()
-                    # Common header words that indicate a proper header
-                    common_headers = {
-                        "name",
-                        "names",
-                        "contributor",
-                        "contributors",
-                        "person",
-                        "people",
-                        "author",
-                        "authors",
-                        "0",
-                        "1",
-                    }
-
-                    # If column name doesn't look like a header, try reading without header
-                    if column_name not in common_headers and not column_name.isdigit():
-                        uploaded_file.seek(0)
-                        try:
-                            df_no_header = pd.read_csv(
-                                uploaded_file, sep=None, engine="python", header=None
-                            )
-                            # Use no-header version if it has more rows (includes the "header" row as data)
-                            if len(df_no_header) > len(df):
-                                df = df_no_header
-                                df.columns = [
-                                    f"Column_{i+1}" for i in range(len(df.columns))
-                                ]
-                        except Exception:
-                            pass  # Keep the current df
-            else:
-                # For Excel files, use load_csv directly
-                df = load_csv(uploaded_file)
+            # Text files may be a simple list of names, with or without a
+            # header, or a table; both are decided from a single scan
+            df = load_list_or_table(
+                uploaded_file,
+                header_names=CONTRIBUTOR_HEADER_NAMES,
+                list_column="contributor",
+            )
 
             if df.empty:
                 st.warning("File appears to be empty or could not be parsed.")
@@ -175,7 +129,7 @@ class ProjectInfoPage:
                 st.warning("File appears to be empty or could not be parsed.")
                 return []
         except ValueError as e:
-            # Handle errors from load_csv (e.g., unsupported format, parsing errors)
+            # Handle errors from load_list_or_table (e.g., unsupported format, parsing errors)
             st.error(f"Error reading file: {e}")
             return []
         except Exception as e:
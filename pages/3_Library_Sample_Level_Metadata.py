@@ -2,7 +2,7 @@ import streamlit as st
 from src.format_page import render_header
 from src.field_matcher import load_data
 from src.transformer import transform_library_sample_info
-from src.utils import load_schema
+from src.schema_index import get_schema_index
 
 session_name = "library_sample_info"
 title = "library sample level metadata"
@@ -15,11 +15,13 @@ class LibrarySampleMetadataPageMetadataPage:
         required_alternate_fields,
         optional_fields,
         optional_alternate_fields,
+        field_dtypes=None,
     ):
         self.required_fields = required_fields
         self.required_alternate_fields = required_alternate_fields
         self.optional_fields = optional_fields
         self.optional_alternate_fields = optional_alternate_fields
+        self.field_dtypes = field_dtypes
 
     def transform_and_save_data(
         self, df, mapped_fields, selected_optional_fields, selected_additional_fields
@@ -28,7 +30,7 @@ class LibrarySampleMetadataPageMetadataPage:
             st.subheader("Transform Data")
             if st.button("Transform Data"):
                 transformed_df = transform_library_sample_info(
-                    df.astype(object),
+                    df.load(),
                     mapped_fields,
                     selected_optional_fields,
                     selected_additional_fields,
@@ -58,6 +60,7 @@ class LibrarySampleMetadataPageMetadataPage:
             required_alternate_fields,
             optional_fields,
             optional_alternate_fields,
+            field_dtypes=self.field_dtypes,
         )
         # Transform and save data
         self.transform_and_save_data(
@@ -70,7 +73,7 @@ class LibrarySampleMetadataPageMetadataPage:
 if __name__ == "__main__":
     render_header()
     st.subheader("Library Sample Level Metadata Converter", divider="gray")
-    schema_fields = load_schema()
+    schema_fields = get_schema_index().schema
     required_fields = schema_fields["library_sample_level_metadata"]["required"]
     required_alternate_fields = schema_fields["library_sample_level_metadata"][
         "required_alternatives"
@@ -84,6 +87,7 @@ if __name__ == "__main__":
         required_alternate_fields,
         optional_fields,
         optional_alternate_fields,
+        field_dtypes=schema_fields["library_sample_level_metadata"].get("dtypes"),
     )
     if session_name in st.session_state:
         st.success(
@@ -5,7 +5,7 @@ import pandas as pd
 from src.field_matcher import load_data
 from src.transformer import transform_panel_info
 from src.format_page import render_header
-from src.utils import load_schema
+from src.schema_index import get_schema_index
 from pmotools.pmo_builder.panel_information_to_pmo import merge_panel_info_dicts
 
 session_name = "panel_info"
@@ -236,7 +236,7 @@ class PanelPage:
             else:
                 # All validations passed, proceed with transformation
                 transformed_df = transform_panel_info(
-                    df,
+                    df.load(),
                     panel_ID,
                     field_mapping,
                     genome_info,
@@ -296,7 +296,7 @@ class PanelPage:
 if __name__ == "__main__":
     render_header()
     st.subheader("Panel Information Converter", divider="gray")
-    schema_fields = load_schema()
+    schema_fields = get_schema_index().schema
     required_fields = schema_fields["panel_info"]["required"]
     required_alternate_fields = schema_fields["panel_info"]["required_alternatives"]
     optional_fields = schema_fields["panel_info"]["optional"]
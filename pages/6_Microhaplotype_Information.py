@@ -1,8 +1,8 @@
 import streamlit as st
 from src.format_page import render_header
-from src.field_matcher import load_data
+from src.field_matcher import file_timings_section, load_data
 from src.transformer import transform_mhap_info
-from src.utils import load_schema
+from src.schema_index import get_schema_index
 
 session_name = "microhaplotype_info"
 title = "microhaplotype information"
@@ -15,11 +15,13 @@ class MicrohaplotypeInfoPage:
         required_alternate_fields,
         optional_fields,
         optional_alternate_fields,
+        field_dtypes=None,
     ):
         self.required_fields = required_fields
         self.required_alternate_fields = required_alternate_fields
         self.optional_fields = optional_fields
         self.optional_alternate_fields = optional_alternate_fields
+        self.field_dtypes = field_dtypes
 
     def bioinfo_id_input(self, df):
         """Get bioinformatics ID from user - either from a column or as a string."""
@@ -86,14 +88,16 @@ class MicrohaplotypeInfoPage:
                     st.error(error)
             else:
                 # All validations passed, proceed with transformation
+                # The bioinformatics ID may name a column outside the mapping
                 transformed_df = transform_mhap_info(
-                    df.astype(object) if df is not None else None,
+                    df.load(extra_columns=[bioinfo_id]) if df is not None else None,
                     bioinfo_id,
                     mapped_fields,
                     selected_optional_fields,
                     selected_additional_fields,
                 )
                 st.session_state[session_name] = transformed_df
+                file_timings_section(df)
                 try:
                     st.success("Microhaplotype Information has been saved!")
                 except Exception as e:
@@ -117,6 +121,11 @@ class MicrohaplotypeInfoPage:
             required_alternate_fields,
             optional_fields,
             optional_alternate_fields,
+            field_dtypes=self.field_dtypes,
+            # Arrow strings keep large allele tables small, and unlike
+            # categories pmotools groups on them without empty groups
+            compact_dtype="string[pyarrow]",
+            accept_multiple_files=True,
         )
         # Get bioinformatics ID input
         bioinfo_id = self.bioinfo_id_input(df)
@@ -135,7 +144,7 @@ class MicrohaplotypeInfoPage:
 if __name__ == "__main__":
     render_header()
     st.subheader("Microhaplotype Information Converter", divider="gray")
-    schema_fields = load_schema()
+    schema_fields = get_schema_index().schema
     required_fields = schema_fields["mhap_info"]["required"]
     required_alternate_fields = schema_fields["mhap_info"]["required_alternatives"]
     optional_fields = schema_fields["mhap_info"]["optional"]
@@ -145,6 +154,7 @@ if __name__ == "__main__":
         required_alternate_fields,
         optional_fields,
         optional_alternate_fields,
+        field_dtypes=schema_fields["mhap_info"].get("dtypes"),
     )
     if session_name in st.session_state:
         st.success(
@@ -1,8 +1,8 @@
 import streamlit as st
 from src.format_page import render_header
-from src.field_matcher import load_data
+from src.field_matcher import file_timings_section, load_data
 from src.transformer import transform_read_counts_per_stage
-from src.utils import load_schema
+from src.schema_index import get_schema_index
 
 session_name = "read_counts_per_stage"
 title = "read counts per stage"
@@ -15,6 +15,8 @@ class ReadCountsPerStagePage:
         raw_counts_required_alternate_fields,
         reads_by_stage_required_fields,
         reads_by_stage_required_alternate_fields,
+        raw_counts_field_dtypes=None,
+        reads_by_stage_field_dtypes=None,
     ):
         self.raw_counts_required_fields = raw_counts_required_fields
         self.raw_counts_required_alternate_fields = raw_counts_required_alternate_fields
@@ -22,6 +24,8 @@ class ReadCountsPerStagePage:
         self.reads_by_stage_required_alternate_fields = (
             reads_by_stage_required_alternate_fields
         )
+        self.raw_counts_field_dtypes = raw_counts_field_dtypes
+        self.reads_by_stage_field_dtypes = reads_by_stage_field_dtypes
 
     def transform_and_save_data(
         self,
@@ -38,9 +42,10 @@ class ReadCountsPerStagePage:
         ):
             st.subheader("Transform Data")
             if st.button("Transform Data"):
+                # The run name may name a column outside the mapping
                 transformed_df = transform_read_counts_per_stage(
-                    raw_counts_df,
-                    reads_by_stage_df,
+                    raw_counts_df.load(extra_columns=[bioinfo_run_name]),
+                    reads_by_stage_df.load(extra_columns=[bioinfo_run_name]),
                     bioinfo_run_name,
                     raw_counts_field_mapping,
                     reads_by_stage_field_mapping,
@@ -48,6 +53,8 @@ class ReadCountsPerStagePage:
                     reads_by_stage_selected_additional_fields,
                 )
                 st.session_state[session_name] = transformed_df
+                file_timings_section(raw_counts_df)
+                file_timings_section(reads_by_stage_df)
                 try:
                     st.success("Specimen Information has been saved!")
                 except Exception as e:
@@ -73,6 +80,8 @@ class ReadCountsPerStagePage:
             [],
             [],
             key_suffix="raw_counts",
+            field_dtypes=self.raw_counts_field_dtypes,
+            accept_multiple_files=True,
         )
         st.subheader("Read Counts per Stage", divider="gray")
         (
@@ -86,6 +95,8 @@ class ReadCountsPerStagePage:
             [],
             [],
             key_suffix="reads_by_stage",
+            field_dtypes=self.reads_by_stage_field_dtypes,
+            accept_multiple_files=True,
         )
         bioinfo_run_name = st.text_input(
             "Bioinformatics Run Name:", help="The name of the bioinformatics run."
@@ -107,7 +118,7 @@ class ReadCountsPerStagePage:
 
 if __name__ == "__main__":
     render_header()
-    schema_fields = load_schema()
+    schema_fields = get_schema_index().schema
     raw_counts_required_fields = schema_fields["read_counts_perstage"]["raw_counts"][
         "required"
     ]
@@ -125,6 +136,12 @@ if __name__ == "__main__":
         raw_counts_required_alternate_fields,
         reads_by_stage_required_fields,
         reads_by_stage_required_alternate_fields,
+        raw_counts_field_dtypes=schema_fields["read_counts_perstage"]["raw_counts"].get(
+            "dtypes"
+        ),
+        reads_by_stage_field_dtypes=schema_fields["read_counts_perstage"][
+            "reads_by_stage"
+        ].get("dtypes"),
     )
     if session_name in st.session_state:
         st.success(
@@ -1,19 +1,1495 @@
+import bz2
+import csv
+import functools
+import glob
+import gzip
+import hashlib
+import importlib.util
+import io
+import lzma
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from xml.etree import ElementTree
+
+import openpyxl
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.utils import LRUCache, remove_file, write_atomically
+
+# Number of bytes inspected when guessing the delimiter of a text file
+SNIFF_SAMPLE_SIZE = 64 * 1024
+# Delimiters we expect in uploaded tables, in order of preference
+CANDIDATE_DELIMITERS = ",\t;|"
+# pandas engine used for the full parse once the delimiter is known
+PARSE_ENGINE = "c"
+# Default number of rows per DataFrame yielded by iter_csv_chunks
+DEFAULT_CHUNK_ROWS = 100_000
+# Number of data rows read to preview an upload and match its columns
+PROBE_ROWS = 100
+# Memory cap of the process-wide cache of parsed uploads
+PARSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Block size used when hashing server-side files
+HASH_BLOCK_SIZE = 1024 * 1024
+# Number of uploads whose content hash is remembered, so each is hashed once
+UPLOAD_HASH_MEMO_SIZE = 256
+# Uploads larger than this are spilled to a temporary file on local disk and
+# parsed with memory-mapped, chunked reads
+UPLOAD_MEMORY_BUDGET = 256 * 1024 * 1024
+# Uncompressed delimited files on disk larger than this are split into byte
+# ranges that are parsed in a process pool
+PARALLEL_PARSE_THRESHOLD = 64 * 1024 * 1024
+# Size of the one process pool shared by every parallel parse
+MAX_PARSE_PROCESSES = os.cpu_count() or 1
+# Forking the threaded Streamlit server could leave a child waiting on a lock
+# held by another thread, so parse processes are started fresh instead
+PARSE_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# Environment variable listing the directories (separated by os.pathsep) that
+# server-side paths may be read from; path input is disabled when it is unset
+DATA_ROOTS_ENV = "PMO_BUILDER_DATA_ROOTS"
+# Directory of the Parquet copies of parsed Excel sheets, which persist across
+# sessions and restarts; overridden by the PMO_BUILDER_EXCEL_CACHE_DIR variable
+EXCEL_CACHE_DIR = os.environ.get(
+    "PMO_BUILDER_EXCEL_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "pmo_builder_excel_cache"),
+)
+# Disk space the Parquet copies may use before the least recently read go
+EXCEL_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+# Upper bound on the threads parsing the files of a multi-file upload
+MAX_PARSE_WORKERS = 8
+# dtypes that string columns can be compacted to on load
+COMPACT_STRING_DTYPES = ("category", "string[pyarrow]")
+# String columns become categorical only if their distinct values are at most
+# this fraction of their rows; otherwise the categories cost more than they save
+COMPACT_MAX_UNIQUE_RATIO = 0.5
+
+DELIMITED_EXTENSIONS = (".csv", ".tsv", ".txt")
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+# Compression suffixes accepted on delimited files, mapped to pandas' names
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+# zstd needs the optional zstandard package, so .zst is only accepted with it
+if importlib.util.find_spec("zstandard") is not None:
+    COMPRESSION_EXTENSIONS[".zst"] = "zstd"
+# Extra file types to accept in upload widgets for compressed files
+COMPRESSED_FILE_TYPES = [ext.lstrip(".") for ext in COMPRESSION_EXTENSIONS]
+# Columnar formats read through pyarrow; Feather v2 is the Arrow IPC file format
+COLUMNAR_EXTENSIONS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+}
+# Extra file types to accept in upload widgets for columnar files
+COLUMNAR_FILE_TYPES = [ext.lstrip(".") for ext in COLUMNAR_EXTENSIONS]
+# Uploads where fewer than this fraction of lines hold a comma or tab are
+# read as a list of values, one per line
+LIST_MAX_SEPARATOR_RATIO = 0.2
+# Lines of a list are never split, so lists are parsed on a NUL delimiter
+LIST_DIALECT = {"delimiter": "\x00", "quotechar": '"'}
+# XML namespace of the sheet list in an xlsx workbook
+XLSX_NAMESPACE = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def _is_path(file):
+    """True if `file` is a server-side path rather than a file-like object."""
+    return isinstance(file, (str, os.PathLike)) and not hasattr(file, "read")
+
+
+def _file_name(file):
+    """Return the name of a path or file-like object."""
+    return os.fspath(file) if _is_path(file) else file.name
+
+
+def _compression(file):
+    """Return the pandas compression name for a file, or None if uncompressed."""
+    for extension, compression in COMPRESSION_EXTENSIONS.items():
+        if _file_name(file).endswith(extension):
+            return compression
+    return None
+
+
+def _file_format(file):
+    """Return "delimited", "excel", "parquet" or "feather" based on the file name."""
+    name = _file_name(file)
+    compression = _compression(file)
+    if compression:
+        name = name[: name.rfind(".")]
+    if name.endswith(DELIMITED_EXTENSIONS):
+        return "delimited"
+    if not compression:
+        if name.endswith(EXCEL_EXTENSIONS):
+            return "excel"
+        for extension, file_format in COLUMNAR_EXTENSIONS.items():
+            if name.endswith(extension):
+                return file_format
+    compressions = ["gzip", "bzip2", "xz"]
+    if ".zst" in COMPRESSION_EXTENSIONS:
+        compressions.append("zstd")
+    raise ValueError(
+        "Unsupported file format. Please upload a CSV, TSV, or Excel file, "
+        "or a Parquet, Feather or Arrow IPC file. CSV, TSV and TXT files may "
+        f"be compressed with {', '.join(compressions[:-1])} or {compressions[-1]}."
+    )
+
+
+def _open_decompressed(file, compression):
+    """Wrap a binary file in a streaming decompressor."""
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=file, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(file)
+    if compression == "xz":
+        return lzma.LZMAFile(file)
+    if compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(file)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def _read_sample(file, sample_size=SNIFF_SAMPLE_SIZE, compression=None):
+    """Read the first `sample_size` (decompressed) bytes of a file and rewind it."""
+    if _is_path(file):
+        with open(file, "rb") as handle:
+            return _read_sample(handle, sample_size, compression)
+    file.seek(0)
+    if compression:
+        sample = _open_decompressed(file, compression).read(sample_size)
+    elif isinstance(file, io.BytesIO):
+        # Only the sample is copied out of an in-memory upload
+        sample = bytes(file.getbuffer()[:sample_size])
+    else:
+        sample = file.read(sample_size)
+    file.seek(0)
+    if isinstance(sample, bytes):
+        sample = sample.decode("utf-8", errors="replace")
+    # Drop a trailing partial line so the sniffer only sees complete rows
+    if len(sample) >= sample_size and "\n" in sample:
+        sample = sample[: sample.rfind("\n")]
+    return sample
+
+
+def sniff_dialect(file, sample_size=SNIFF_SAMPLE_SIZE, compression=None):
+    """
+    Detect the delimiter and quote character of a delimited text file.
+
+    Only the first `sample_size` bytes are inspected. Files where no candidate
+    delimiter can be found (e.g. a single column of names) fall back to a comma.
+
+    Args:
+        file: A path, or a seekable file-like object (text or binary).
+        sample_size (int): Number of bytes to inspect.
+        compression (str, optional): pandas compression name of a binary file;
+            the sample is then taken from the decompressed stream.
+
+    Returns:
+        dict: The detected `delimiter` and `quotechar`.
+    """
+    return _sniff_sample(_read_sample(file, sample_size, compression))
+
+
+def _sniff_sample(sample):
+    """Detect the delimiter and quote character from a decoded sample."""
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=CANDIDATE_DELIMITERS)
+        delimiter = dialect.delimiter
+        quotechar = dialect.quotechar or '"'
+    except csv.Error:
+        delimiter, quotechar = ",", '"'
+    return {"delimiter": delimiter, "quotechar": quotechar}
+
+
+def _arrow_source(file):
+    """Memory-map a server-side path, or wrap an upload's buffer without copying."""
+    if _is_path(file):
+        return pa.memory_map(os.fspath(file), "r")
+    file.seek(0)
+    if hasattr(file, "getbuffer"):
+        return pa.py_buffer(file.getbuffer())
+    return pa.py_buffer(file.read())
+
+
+def _read_arrow_table(file, file_format, usecols=None, nrows=None):
+    """Read a Parquet or Arrow IPC file into a pyarrow Table."""
+    source = _arrow_source(file)
+    if file_format == "parquet":
+        parquet_file = pq.ParquetFile(source)
+        names = parquet_file.schema_arrow.names
+        columns = [name for name in names if usecols(name)] if usecols else None
+        if nrows is None:
+            return parquet_file.read(columns=columns)
+        # Only decode the row groups needed for the first `nrows` rows
+        batch = next(parquet_file.iter_batches(batch_size=nrows, columns=columns), None)
+        if batch is None:
+            return parquet_file.schema_arrow.empty_table().select(columns or names)
+        return pa.Table.from_batches([batch])
+    # Arrow IPC buffers are read in place, so this does not copy the data
+    table = pa.ipc.open_file(source).read_all()
+    if usecols:
+        table = table.select([name for name in table.column_names if usecols(name)])
+    if nrows is not None:
+        table = table.slice(0, nrows)
+    return table
+
+
+def list_excel_sheets(file):
+    """
+    List the sheet names of an Excel workbook without parsing any sheet.
+
+    For xlsx files only the workbook's sheet index is read from the archive.
+
+    Args:
+        file: A path, or a seekable file-like object with a `name` attribute.
+
+    Returns:
+        list: The sheet names, in workbook order.
+    """
+    try:
+        if not _file_name(file).endswith(".xlsx"):
+            return pd.ExcelFile(file).sheet_names
+        if not _is_path(file):
+            file.seek(0)
+        with zipfile.ZipFile(file) as archive:
+            workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        sheets = workbook.find("main:sheets", XLSX_NAMESPACE)
+        return [sheet.get("name") for sheet in sheets]
+    except Exception as e:
+        raise ValueError(f"Failed to read Excel file: {e}")
+
+
+def _iter_excel_rows(file, sheet_name=None):
+    """Stream the rows of an xlsx worksheet as tuples of cell values."""
+    if not _is_path(file):
+        file.seek(0)
+    workbook = openpyxl.load_workbook(
+        file, read_only=True, data_only=True, keep_links=False
+    )
+    try:
+        if sheet_name is None:
+            sheet = workbook.worksheets[0]
+        else:
+            sheet = workbook[sheet_name]
+        yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _row_width(row):
+    """Number of cells in a row up to its last non-blank cell."""
+    width = len(row)
+    while width and row[width - 1] is None:
+        width -= 1
+    return width
+
+
+def _excel_header(row, width):
+    """
+    Names of the first `width` columns under a header row, as pandas names them.
+
+    Blank header cells, and columns past the end of the header, are named
+    "Unnamed: <index>". Duplicates are numbered the way pandas.read_excel
+    does, skipping names already in the header and numbering named columns
+    before unnamed ones, so `a, a, a.1` becomes `a, a.2, a.1`.
+    """
+    names, unnamed = [], []
+    for index in range(width):
+        value = row[index] if index < len(row) else None
+        if value is None:
+            unnamed.append(index)
+            value = f"Unnamed: {index}"
+        names.append(value)
+    unnamed_set = set(unnamed)
+    counts = {}
+    for index in [i for i in range(width) if i not in unnamed_set] + unnamed:
+        name = original = names[index]
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in names else counts.get(name, 0)
+        names[index] = name
+        counts[name] = count + 1
+    return names
+
+
+def _iter_excel_frames(file, sheet_name=None, usecols=None, rows_per_chunk=None):
+    """
+    Stream an xlsx worksheet into DataFrames of at most `rows_per_chunk` rows.
+
+    Rows are read one at a time in openpyxl's read-only mode, only the columns
+    selected by the `usecols` callable are kept, and blank rows are skipped.
+    Like pandas.read_excel, every column holding a value is kept, also under
+    a blank header cell or past the end of the header. A row wider than
+    those before it adds columns, so a later chunk may have more columns
+    than an earlier one.
+    """
+    rows = _iter_excel_rows(file, sheet_name)
+    try:
+        header = next(rows, None)
+        if header is None:
+            yield pd.DataFrame()
+            return
+        width = _row_width(header)
+        names = _excel_header(header, width)
+        indices = [
+            index
+            for index, name in enumerate(names)
+            if usecols is None or usecols(name)
+        ]
+        batch, yielded = [], False
+        for row in rows:
+            row_width = _row_width(row)
+            if not row_width:
+                continue
+            if row_width > width:
+                # The new columns are unnamed, so the names given are kept
+                names += _excel_header(header, row_width)[width:]
+                indices += [
+                    index
+                    for index in range(width, row_width)
+                    if usecols is None or usecols(names[index])
+                ]
+                width = row_width
+                for values in batch:
+                    values.extend([None] * (len(indices) - len(values)))
+            batch.append(
+                [row[index] if index < len(row) else None for index in indices]
+            )
+            if rows_per_chunk and len(batch) == rows_per_chunk:
+                yield pd.DataFrame(batch, columns=[names[i] for i in indices])
+                batch, yielded = [], True
+        if batch or not yielded:
+            yield pd.DataFrame(batch, columns=[names[i] for i in indices])
+    finally:
+        rows.close()
+
+
+def _read_excel(file, sheet_name=None, usecols=None, nrows=None, dtype=None):
+    """Read one sheet of an Excel workbook, streaming rows for xlsx files."""
+    if not _file_name(file).endswith(".xlsx"):
+        read_kwargs = {
+            key: value
+            for key, value in [
+                ("sheet_name", sheet_name),
+                ("usecols", usecols),
+                ("nrows", nrows),
+                ("dtype", dtype),
+            ]
+            if value is not None
+        }
+        if not _is_path(file):
+            file.seek(0)
+        return pd.read_excel(file, **read_kwargs)
+
+    frames = _iter_excel_frames(file, sheet_name, usecols, rows_per_chunk=nrows)
+    try:
+        # Without nrows the first frame holds the whole sheet
+        df = next(frames)
+    finally:
+        frames.close()
+    if dtype:
+        df = _cast_columns(df, dtype)
+    return df
+
 
+def _read_excel_cached(file, sheet_name=None, usecols=None, nrows=None, dtype=None):
+    """
+    Read an Excel sheet from its Parquet copy in `EXCEL_CACHE`.
 
-def load_csv(file):
-    """Load a CSV file into a pandas DataFrame with automatic separator detection."""
+    On a miss, a full read parses the whole sheet once, stores the copy and
+    then applies the projection; a preview of the first rows is streamed from
+    the workbook instead, so it does not pay for converting the whole sheet.
+
+    Returns:
+        pd.DataFrame: The sheet.
+        str: "hit" or "miss", or None if the cache was not used.
+    """
+    cache = EXCEL_CACHE
     try:
-        if file.name.endswith((".csv", ".tsv", ".txt")):
-            # Use pandas' automatic separator detection
-            df = pd.read_csv(file, sep=None, engine="python")
-        elif file.name.endswith((".xlsx", ".xls")):
-            df = pd.read_excel(file)
+        key = content_hash(file) if cache is not None else None
+    except Exception:
+        key = None
+    if key is None:
+        return _read_excel(file, sheet_name, usecols, nrows, dtype), None
+
+    path = cache.get(key, sheet_name)
+    if path is not None:
+        df = _read_arrow_table(path, "parquet", usecols, nrows).to_pandas()
+        return (_cast_columns(df, dtype) if dtype else df), "hit"
+    if nrows is not None:
+        return _read_excel(file, sheet_name, usecols, nrows, dtype), "miss"
+    df = _read_excel(file, sheet_name)
+    cache.put(key, sheet_name, df)
+    if usecols is not None:
+        df = df[[column for column in df.columns if usecols(column)]]
+    return (_cast_columns(df, dtype) if dtype else df), "miss"
+
+
+def _parse_table(file, sheet_name=None, dialect=None, compact=None, **read_kwargs):
+    """
+    Parse a delimited, Excel or columnar file, passing `read_kwargs` to pandas.
+
+    The dialect of a delimited file is sniffed unless it is given. A file split
+    across processes has each part compacted to `compact` in its process;
+    other files are returned uncompacted.
+    """
+    file_format = _file_format(file)
+    if file_format in ("parquet", "feather"):
+        start = time.perf_counter()
+        table = _read_arrow_table(
+            file, file_format, read_kwargs.get("usecols"), read_kwargs.get("nrows")
+        )
+        df = table.to_pandas()
+        if read_kwargs.get("dtype"):
+            df = _cast_columns(df, read_kwargs["dtype"])
+        df.attrs["load_info"] = {
+            "format": file_format,
+            "parse_seconds": time.perf_counter() - start,
+        }
+    elif file_format == "delimited":
+        compression = _compression(file)
+        if compression:
+            # Decompression streams during the parse
+            read_kwargs["compression"] = compression
+        elif _is_path(file):
+            read_kwargs["memory_map"] = True
+        start = time.perf_counter()
+        if dialect is None:
+            dialect = sniff_dialect(file, compression=compression)
+        elif not _is_path(file):
+            file.seek(0)
+        sniff_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        processes = 1
+        if _parallel_parse_eligible(file, compression, read_kwargs):
+            df, processes = _parse_in_parallel(
+                file, dialect, compact=compact, **read_kwargs
+            )
         else:
-            raise ValueError(
-                "Unsupported file format. Please upload a CSV, TSV, or Excel file."
+            df = pd.read_csv(
+                file,
+                sep=dialect["delimiter"],
+                quotechar=dialect["quotechar"],
+                engine=PARSE_ENGINE,
+                **read_kwargs,
+            )
+        parse_seconds = time.perf_counter() - start
+
+        df.attrs["load_info"] = {
+            **dialect,
+            "engine": PARSE_ENGINE,
+            "processes": processes,
+            "sniff_seconds": sniff_seconds,
+            "parse_seconds": parse_seconds,
+        }
+    else:
+        start = time.perf_counter()
+        df, parquet_cache = _read_excel_cached(file, sheet_name, **read_kwargs)
+        df.attrs["load_info"] = {
+            "format": file_format,
+            "sheet_name": sheet_name,
+            "parquet_cache": parquet_cache,
+            "parse_seconds": time.perf_counter() - start,
+        }
+    return df
+
+
+def _parallel_parse_eligible(file, compression, read_kwargs):
+    """True if a delimited file is large enough, and simple enough, to split."""
+    if compression or not _is_path(file) or MAX_PARSE_PROCESSES < 2:
+        return False
+    # Row limits and header options apply to the whole file, not to each range
+    if set(read_kwargs) - {"usecols", "dtype", "memory_map"}:
+        return False
+    return os.path.getsize(file) > PARALLEL_PARSE_THRESHOLD
+
+
+def _splits_in_parallel(file):
+    """True if a full parse of `file` is split across the process pool."""
+    if _file_format(file) != "delimited":
+        return False
+    return _parallel_parse_eligible(file, _compression(file), {})
+
+
+def _byte_ranges(path, start, n_ranges):
+    """Split the bytes of `path` after `start` into ranges that end on a newline."""
+    size = os.path.getsize(path)
+    step = max(1, (size - start) // n_ranges)
+    offsets = [start]
+    with open(path, "rb") as handle:
+        for index in range(1, n_ranges):
+            handle.seek(start + index * step)
+            # Move to the start of the next line
+            handle.readline()
+            offset = handle.tell()
+            if offset >= size:
+                break
+            if offset > offsets[-1]:
+                offsets.append(offset)
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def _parse_byte_range(path, start, end, read_kwargs, compact=None):
+    """Parse the rows between two newline-aligned byte offsets of a file."""
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        data = handle.read(end - start)
+    df = pd.read_csv(io.BytesIO(data), header=None, **read_kwargs)
+    return compact_columns(df, compact) if compact else df
+
+
+def _contains(path, text):
+    """True if the file at `path` contains `text`, searched without reading it all."""
+    if not os.path.getsize(path):
+        return False
+    with open(path, "rb") as handle:
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return data.find(text.encode()) != -1
+
+
+@functools.cache
+def _parse_pool():
+    """The process pool shared by every parallel parse, started on first use."""
+    return ProcessPoolExecutor(
+        max_workers=MAX_PARSE_PROCESSES,
+        mp_context=multiprocessing.get_context(PARSE_START_METHOD),
+    )
+
+
+def _parse_in_parallel(
+    path, dialect, usecols=None, dtype=None, memory_map=None, compact=None
+):
+    """
+    Parse an uncompressed delimited file by splitting it into byte ranges.
+
+    The header is read once, the rest of the file is split at newlines into one
+    range per process and the ranges are parsed in the shared process pool,
+    then concatenated in order. If `compact` is given each range is compacted
+    in its process. Files holding the quote character anywhere are parsed
+    serially, since a quoted field may contain a newline that a split would
+    cut through, and so is a file whose ranges fail to parse.
+
+    Returns:
+        pd.DataFrame: The parsed table.
+        int: The number of processes used.
+    """
+    read_kwargs = {
+        "sep": dialect["delimiter"],
+        "quotechar": dialect["quotechar"],
+        "engine": PARSE_ENGINE,
+    }
+
+    def parse_serially():
+        df = pd.read_csv(
+            path, usecols=usecols, dtype=dtype, memory_map=True, **read_kwargs
+        )
+        return df, 1
+
+    if _contains(path, dialect["quotechar"]):
+        return parse_serially()
+
+    header = pd.read_csv(path, nrows=0, **read_kwargs)
+    with open(path, "rb") as handle:
+        handle.readline()
+        data_start = handle.tell()
+    names = header.columns.tolist()
+    range_kwargs = {
+        **read_kwargs,
+        "names": names,
+        # Workers are sent the column names, as a callable cannot be pickled
+        "usecols": [name for name in names if usecols(name)] if usecols else None,
+        "dtype": dtype,
+    }
+    ranges = _byte_ranges(path, data_start, MAX_PARSE_PROCESSES)
+    try:
+        frames = list(
+            _parse_pool().map(
+                _parse_byte_range,
+                [os.fspath(path)] * len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges],
+                [range_kwargs] * len(ranges),
+                [compact] * len(ranges),
+            )
+        )
+    except BrokenProcessPool:
+        # Start a new pool for the next parse
+        _parse_pool.cache_clear()
+        return parse_serially()
+    except Exception:
+        return parse_serially()
+    if range_kwargs["usecols"] is not None:
+        names = range_kwargs["usecols"]
+    return _concat_tables([frame[names] for frame in frames]), len(ranges)
+
+
+def _cast_columns(df, dtype):
+    """Cast columns to the declared dtypes, leaving any that do not fit as-is."""
+    for column, column_dtype in dtype.items():
+        if column not in df.columns:
+            continue
+        try:
+            df[column] = df[column].astype(column_dtype)
+        except (ValueError, TypeError):
+            pass
+    return df
+
+
+def compact_columns(
+    df, string_dtype="category", max_unique_ratio=COMPACT_MAX_UNIQUE_RATIO
+):
+    """
+    Store repetitive string columns in a compact dtype.
+
+    With "category" only low-cardinality string columns are converted; with
+    "string[pyarrow]" every string column is stored in Arrow buffers. The memory
+    used by each column before and after is stored in `df.attrs["memory_usage"]`.
+
+    Args:
+        df (pd.DataFrame): The table to compact, modified in place.
+        string_dtype (str): "category" or "string[pyarrow]".
+        max_unique_ratio (float): Highest ratio of distinct values to rows for a
+            column to be made categorical.
+
+    Returns:
+        pd.DataFrame: The compacted table.
+    """
+    if string_dtype not in COMPACT_STRING_DTYPES:
+        raise ValueError(
+            f"Unsupported string dtype {string_dtype!r}. "
+            f"Choose one of: {', '.join(COMPACT_STRING_DTYPES)}"
+        )
+    before = df.memory_usage(deep=True, index=False).tolist()
+    for position in range(df.shape[1]):
+        series = df.iloc[:, position]
+        if series.dtype != object or series.empty:
+            continue
+        if pd.api.types.infer_dtype(series, skipna=True) != "string":
+            continue
+        if string_dtype == "category" and series.nunique() > max_unique_ratio * len(
+            series
+        ):
+            continue
+        df.isetitem(position, series.astype(string_dtype))
+    after = df.memory_usage(deep=True, index=False).tolist()
+    df.attrs["memory_usage"] = {
+        str(column): {"dtype": str(df.dtypes.iloc[position]), "before": b, "after": a}
+        for position, (column, b, a) in enumerate(zip(df.columns, before, after))
+    }
+    return df
+
+
+def memory_report(df):
+    """
+    Tabulate the per-column memory recorded by `compact_columns`.
+
+    Args:
+        df (pd.DataFrame): A table returned by `compact_columns`.
+
+    Returns:
+        pd.DataFrame: One row per column with its dtype and memory in KB before
+        and after compaction, or None if the table was not compacted.
+    """
+    usage = df.attrs.get("memory_usage")
+    if not usage:
+        return None
+    return pd.DataFrame(
+        [
+            {
+                "Column": column,
+                "dtype": info["dtype"],
+                "Before (KB)": round(info["before"] / 1024, 1),
+                "After (KB)": round(info["after"] / 1024, 1),
+            }
+            for column, info in usage.items()
+        ]
+    )
+
+
+def _usecols_callable(usecols):
+    """Turn a list of columns into a callable usecols, or None for all columns."""
+    if usecols is None:
+        return None
+    # A callable matches on column names, even when the names are integers
+    keep = set(usecols)
+    return lambda column: column in keep
+
+
+def load_csv(
+    file,
+    usecols=None,
+    dtype=None,
+    sheet_name=None,
+    compact=None,
+    dialect=None,
+    rows_per_chunk=None,
+):
+    """
+    Load a CSV file into a pandas DataFrame with automatic separator detection.
+
+    For delimited text files the dialect is sniffed from a small sample and the
+    full file is then parsed with the fast pandas engine. The detected dialect
+    and the time spent sniffing and parsing are stored in `df.attrs["load_info"]`.
+
+    Args:
+        file: A seekable file-like object with a `name` attribute.
+        usecols (list, optional): Only parse these columns.
+        dtype (dict, optional): dtypes to parse columns as. If a column does not
+            fit its dtype (e.g. missing values in an int32 column), it is left
+            with the dtype pandas infers.
+        sheet_name (str, optional): Sheet to read from an Excel workbook.
+            Defaults to the first sheet.
+        compact (str, optional): Compact string columns to this dtype, see
+            `compact_columns`.
+        dialect (dict, optional): The `delimiter` and `quotechar` of a delimited
+            file, e.g. from `sniff_dialect`. Sniffed from the file if not given.
+        rows_per_chunk (int, optional): With `compact`, parse the file this
+            many rows at a time, compacting each chunk before the next is
+            read, so the uncompacted table is never held in memory as a whole.
+            The compacted chunks are then concatenated, so the result is held
+            in full like any other load. Ignored without `compact`, as a
+            chunked parse would then only add a copy, and for files split
+            across processes, whose parts are compacted as they are parsed.
+    """
+    if rows_per_chunk and compact and not _splits_in_parallel(file):
+        chunks = [
+            compact_columns(chunk, compact) if compact else chunk
+            for chunk in iter_csv_chunks(
+                file, rows_per_chunk, sheet_name, usecols=usecols, dtype=dtype
+            )
+        ]
+        if chunks:
+            return _concat_tables(chunks)
+    read_kwargs = {"sheet_name": sheet_name, "dialect": dialect, "compact": compact}
+    if usecols is not None:
+        read_kwargs["usecols"] = _usecols_callable(usecols)
+    try:
+        if not dtype:
+            df = _parse_table(file, **read_kwargs)
+        else:
+            try:
+                df = _parse_table(file, dtype=dtype, **read_kwargs)
+            except (ValueError, TypeError):
+                df = _cast_columns(_parse_table(file, **read_kwargs), dtype)
+    except Exception as e:
+        raise ValueError(f"Failed to read CSV: {e}")
+    return compact_columns(df, compact) if compact else df
+
+
+def load_list_or_table(file, header_names=(), list_column="value"):
+    """
+    Load an upload that is either a list of values, one per line, or a table.
+
+    One sample of a delimited file decides both whether it is a list (fewer than
+    `LIST_MAX_SEPARATOR_RATIO` of its lines contain a comma or tab) and, for a
+    list, whether its first line is a header. The same sample gives the dialect
+    of a table, so the file is then parsed once, straight from its buffer.
+    Excel and columnar files are always read as tables.
+
+    Args:
+        file: A path, or a seekable file-like object with a `name` attribute.
+        header_names (set): Lower-case values that mark the first line of a list
+            as a header rather than a value.
+        list_column (str): Column name for a list without a header.
+
+    Returns:
+        pd.DataFrame: One column for a list, or the parsed table.
+    """
+    if _file_format(file) != "delimited":
+        return load_csv(file)
+    compression = _compression(file)
+    try:
+        sample = _read_sample(file, compression=compression)
+    except Exception as e:
+        raise ValueError(f"Failed to read CSV: {e}")
+    lines = [line.strip() for line in sample.splitlines() if line.strip()]
+    if not lines:
+        return pd.DataFrame()
+    separator_lines = sum(1 for line in lines if "," in line or "\t" in line)
+    if separator_lines / len(lines) >= LIST_MAX_SEPARATOR_RATIO:
+        return load_csv(file, dialect=_sniff_sample(sample))
+
+    has_header = lines[0].lower() in header_names
+    try:
+        df = _parse_table(
+            file,
+            dialect=LIST_DIALECT,
+            header=0 if has_header else None,
+            names=None if has_header else [list_column],
+            quoting=csv.QUOTE_NONE,
+            dtype=str,
+        )
+    except Exception as e:
+        raise ValueError(f"Failed to read CSV: {e}")
+    return df
+
+
+def probe_file(file, n_rows=PROBE_ROWS, sheet_name=None, compact=None):
+    """
+    Read only the header and the first `n_rows` rows of a file.
+
+    This is enough to match the input columns to the schema and to preview the
+    upload, without paying for a full parse of a large table.
+
+    Args:
+        file: A seekable file-like object with a `name` attribute.
+        n_rows (int): Number of data rows to read after the header.
+        sheet_name (str, optional): Sheet to read from an Excel workbook.
+            Defaults to the first sheet.
+        compact (str, optional): Compact string columns to this dtype, see
+            `compact_columns`.
+
+    Returns:
+        pd.DataFrame: The first `n_rows` rows of the file.
+    """
+    try:
+        df = _parse_table(file, sheet_name=sheet_name, nrows=n_rows)
+    except Exception as e:
+        raise ValueError(f"Failed to read CSV: {e}")
+    return compact_columns(df, compact) if compact else df
+
+
+def _hash_contents(file):
+    """Hash the bytes of a path or a seekable file-like object."""
+    digest = hashlib.blake2b(digest_size=16)
+    if _is_path(file):
+        with open(file, "rb") as handle:
+            for block in iter(lambda: handle.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    file.seek(0)
+    if hasattr(file, "getbuffer"):
+        digest.update(file.getbuffer())
+    else:
+        data = file.read()
+        digest.update(data.encode() if isinstance(data, str) else data)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _upload_identity(file):
+    """
+    A key that changes whenever the file does, or None if it cannot be told.
+
+    Paths are identified by their size and modification time. Streamlit
+    uploads carry a `file_id` that is new for every upload.
+    """
+    if _is_path(file):
+        stat = os.stat(file)
+        return ("path", os.path.realpath(file), stat.st_size, stat.st_mtime_ns)
+    file_id = getattr(file, "file_id", None)
+    if file_id is None:
+        return None
+    return ("upload", file_id, upload_size(file))
+
+
+_UPLOAD_HASHES = LRUCache(UPLOAD_HASH_MEMO_SIZE)
+
+
+def content_hash(file):
+    """
+    Hash the bytes of a file, so the same upload can be recognised across reruns.
+
+    The hash of a path or a Streamlit upload is remembered, so a rerun does
+    not read the whole file again; other file objects are hashed every time.
+
+    Args:
+        file: A path, or a seekable file-like object (text or binary).
+
+    Returns:
+        str: A hex digest of the file contents.
+    """
+    identity = _upload_identity(file)
+    if identity is None:
+        return _hash_contents(file)
+    digest = _UPLOAD_HASHES.get(identity)
+    if digest is None:
+        digest = _hash_contents(file)
+        _UPLOAD_HASHES.put(identity, digest)
+    return digest
+
+
+def _table_nbytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+class ParseCache(LRUCache):
+    """
+    Parsed tables, keyed by the content hash of a file and the options it was
+    parsed with, kept while their total memory fits in `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=PARSE_CACHE_MAX_BYTES):
+        super().__init__(max_bytes, weigh=_table_nbytes)
+
+    @property
+    def max_bytes(self):
+        return self.max_weight
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        self.max_weight = value
+
+    @property
+    def nbytes(self):
+        """Memory used by the cached tables."""
+        return self.weight
+
+    def get(self, key):
+        """Return a shallow copy of the cached table for `key`, or None."""
+        df = super().get(key)
+        # Callers may add or drop columns; the cached table stays as parsed
+        return None if df is None else df.copy(deep=False)
+
+    def stats(self):
+        """Hit and miss counts, number of entries and memory used."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self),
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+PARSE_CACHE = ParseCache()
+
+
+class ExcelParquetCache:
+    """
+    Disk cache of parsed Excel sheets stored as Parquet, keyed by the content
+    hash of the workbook and the sheet name.
+
+    Parsing a workbook with openpyxl is far slower than reading Parquet, so
+    each sheet is parsed once and later reads, including from other sessions
+    and after a restart, come from its Parquet copy. Once the copies use more
+    than `max_bytes`, the least recently read are deleted.
+    """
+
+    def __init__(self, directory=EXCEL_CACHE_DIR, max_bytes=EXCEL_CACHE_MAX_BYTES):
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def path(self, key, sheet_name):
+        """Where the copy of a sheet is stored."""
+        sheet = hashlib.blake2b(repr(sheet_name).encode(), digest_size=8).hexdigest()
+        return os.path.join(self.directory, f"{key}-{sheet}.parquet")
+
+    def get(self, key, sheet_name):
+        """Return the path of the copy of a sheet, or None if there is none."""
+        path = self.path(key, sheet_name)
+        try:
+            # The modification time orders copies for eviction
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, key, sheet_name, df):
+        """
+        Store a parsed sheet, then evict copies beyond `max_bytes`.
+
+        Sheets that Parquet cannot hold exactly, e.g. with non-string column
+        names or columns mixing numbers and text, are not stored.
+
+        Returns:
+            bool: True if the sheet was stored.
+        """
+        if not all(isinstance(column, str) for column in df.columns):
+            return False
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            write_atomically(
+                self.path(key, sheet_name),
+                lambda temporary_path: pq.write_table(table, temporary_path),
+            )
+        except (pa.ArrowException, OSError):
+            return False
+        self._evict()
+        return True
+
+    def _entries(self):
+        """Copies in the cache as (modification time, size, path), oldest first."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".parquet"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def _evict(self):
+        """Delete the least recently read copies until they fit in `max_bytes`."""
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                remove_file(path)
+                total -= size
+
+    def stats(self):
+        """Hit and miss counts, number of copies and disk space used."""
+        entries = self._entries() if os.path.isdir(self.directory) else []
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "nbytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+EXCEL_CACHE = ExcelParquetCache()
+
+
+def data_roots():
+    """The allow-listed directories that server-side paths may be read from."""
+    roots = os.environ.get(DATA_ROOTS_ENV, "").split(os.pathsep)
+    return [os.path.realpath(root) for root in roots if root]
+
+
+def _is_supported(path):
+    """True if a file name has a format that can be loaded."""
+    try:
+        _file_format(path)
+    except ValueError:
+        return False
+    return True
+
+
+def resolve_data_paths(pattern, roots=None):
+    """
+    Expand a path, directory or glob into the supported files it names.
+
+    Relative patterns are resolved against each data root, and absolute ones
+    must lie inside a root. A directory stands for the supported files
+    directly inside it, and `**` matches subdirectories. The pattern is
+    checked before it is expanded, so it never walks outside the roots;
+    matches that resolve outside every root through a symbolic link are
+    ignored.
+
+    Args:
+        pattern (str): A file, directory or glob pattern.
+        roots (list, optional): Allowed directories; defaults to `data_roots()`.
+
+    Returns:
+        list: `Path`s of the matching files, sorted within each pattern match.
+
+    Raises:
+        ValueError: If no roots are configured, the pattern contains `..` or
+            lies outside every root, or no supported file matches.
+    """
+    roots = data_roots() if roots is None else [os.path.realpath(r) for r in roots]
+    if not roots:
+        raise ValueError(
+            f"Reading files from the server is disabled. Set {DATA_ROOTS_ENV} "
+            "to the directories that may be read."
+        )
+    pattern = os.path.expanduser(pattern.strip())
+    if ".." in Path(pattern).parts:
+        raise ValueError(f"{pattern!r} may not contain '..'.")
+    if os.path.isabs(pattern):
+        # Glob only the part of the pattern below the root it lies in
+        candidates = [
+            (root, os.path.relpath(pattern, root))
+            for root in roots
+            if os.path.commonpath([pattern, root]) == root
+        ]
+        if not candidates:
+            raise ValueError(f"{pattern!r} is outside the data roots.")
+    else:
+        candidates = [(root, pattern) for root in roots]
+
+    paths = []
+    for root, relative in candidates:
+        for match in sorted(glob.glob(relative, root_dir=root, recursive=True)):
+            match = os.path.join(root, match)
+            if os.path.isdir(match):
+                files = [
+                    os.path.join(match, name) for name in sorted(os.listdir(match))
+                ]
+            else:
+                files = [match]
+            for file in files:
+                real_path = os.path.realpath(file)
+                allowed = any(
+                    os.path.commonpath([real_path, root]) == root for root in roots
+                )
+                if allowed and os.path.isfile(real_path) and _is_supported(file):
+                    if Path(real_path) not in paths:
+                        paths.append(Path(real_path))
+    if not paths:
+        raise ValueError(f"No supported files match {pattern!r} in the data roots.")
+    return paths
+
+
+def upload_size(file):
+    """Size in bytes of a path or an in-memory upload."""
+    if _is_path(file):
+        return os.path.getsize(file)
+    if hasattr(file, "size"):
+        return file.size
+    if isinstance(file, io.BytesIO):
+        return file.getbuffer().nbytes
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END)
+    file.seek(position)
+    return size
+
+
+class SpilledUpload(os.PathLike):
+    """
+    An upload copied to a temporary file on local disk.
+
+    It can be used wherever a path is accepted, so a large upload is parsed
+    with memory-mapped reads of the file rather than from the upload's buffer.
+    The file is deleted by `close`, when the object is garbage collected (e.g.
+    when the Streamlit session holding it ends), or at interpreter exit.
+    """
+
+    def __init__(self, file, directory=None):
+        self.name = os.path.basename(_file_name(file))
+        # Keep the original name as a suffix so the format is still detected
+        handle = tempfile.NamedTemporaryFile(
+            delete=False, prefix="pmo_upload_", suffix=f"_{self.name}", dir=directory
+        )
+        self.path = handle.name
+        self._finalizer = weakref.finalize(self, remove_file, self.path)
+        with handle:
+            file.seek(0)
+            if isinstance(file, io.BytesIO):
+                handle.write(file.getbuffer())
+            else:
+                shutil.copyfileobj(file, handle, HASH_BLOCK_SIZE)
+            file.seek(0)
+
+    def __fspath__(self):
+        return self.path
+
+    def close(self):
+        """Delete the temporary file."""
+        self._finalizer()
+
+
+class UploadedTable:
+    """
+    An uploaded table whose full parse is deferred until it is needed.
+
+    The header and a sample of rows are read up front so the field mapping can
+    be shown straight away; the whole file is only parsed when `load` is called,
+    e.g. when the user clicks "Transform Data". Both parses go through `cache`,
+    keyed by the content of the file, so reruns reuse them. If `compact` is
+    given, string columns are stored in that dtype, see `compact_columns`, and
+    if `rows_per_chunk` is also given they are compacted in chunks of that size
+    during the full parse.
+    """
+
+    def __init__(
+        self,
+        file,
+        n_rows=PROBE_ROWS,
+        sheet_name=None,
+        cache=PARSE_CACHE,
+        compact=None,
+        rows_per_chunk=None,
+    ):
+        self.file = file
+        self.sheet_name = sheet_name
+        self.cache = cache
+        self.compact = compact
+        self.rows_per_chunk = rows_per_chunk
+        self.key = content_hash(file) if cache is not None else None
+        options = ("probe", n_rows, sheet_name, compact)
+        # Identifies the preview rows across reruns, or None without a cache
+        self.preview_key = (self.key, *options) if cache is not None else None
+        self.preview = self._cached(
+            options,
+            lambda: probe_file(file, n_rows, sheet_name=sheet_name, compact=compact),
+        )
+        self.usecols = None
+        self.dtypes = None
+        self._df = None
+        self._loaded_columns = None
+
+    @property
+    def columns(self):
+        """Columns of the uploaded table."""
+        return self.preview.columns
+
+    @property
+    def empty(self):
+        """True if the uploaded table has no data rows."""
+        return self.preview.empty
+
+    def project(self, columns, dtypes=None):
+        """
+        Restrict the full parse to `columns`, parsed as `dtypes` where given.
+
+        Args:
+            columns (list): Input columns needed by the transform.
+            dtypes (dict, optional): dtypes keyed by input column name.
+        """
+        keep = set(columns)
+        self.usecols = [column for column in self.columns if column in keep]
+        self.dtypes = {
+            column: dtype for column, dtype in (dtypes or {}).items() if column in keep
+        }
+        self._df = None
+
+    def load(self, extra_columns=None):
+        """
+        Parse the full file, reusing the result on later calls.
+
+        Args:
+            extra_columns (list, optional): Columns to parse in addition to the
+                projection, e.g. a column picked outside the field mapping.
+                Names that are not columns of the table are ignored.
+        """
+        usecols = self.usecols
+        if usecols is not None and extra_columns:
+            usecols = usecols + [
+                column
+                for column in self.columns
+                if column in extra_columns and column not in usecols
+            ]
+        if self._df is None or self._loaded_columns != usecols:
+            options = (
+                "load",
+                tuple(usecols) if usecols is not None else None,
+                tuple(sorted((self.dtypes or {}).items())),
+                self.sheet_name,
+                self.compact,
+            )
+            self._df = self._cached(
+                options,
+                lambda: load_csv(
+                    self.file,
+                    usecols=usecols,
+                    dtype=self.dtypes,
+                    sheet_name=self.sheet_name,
+                    compact=self.compact,
+                    rows_per_chunk=self.rows_per_chunk,
+                ),
             )
+            self._loaded_columns = usecols
+        return self._df
+
+    def _cached(self, options, parse):
+        """Return the cached parse for `options`, calling `parse` on a miss."""
+        if self.cache is None:
+            return parse()
+        key = (self.key, *options)
+        df = self.cache.get(key)
+        if df is None:
+            df = parse()
+            self.cache.put(key, df)
+            df = df.copy(deep=False)
         return df
 
+
+def _concat_tables(frames):
+    """Concatenate the parts of a table, keeping dtypes every part agrees on."""
+    df = pd.concat(frames, ignore_index=True)
+    for column in df.columns:
+        dtypes = {frame[column].dtype for frame in frames}
+        # Categoricals with different categories concatenate to object
+        if len(dtypes) > 1 and all(
+            isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes
+        ):
+            df[column] = df[column].astype("category")
+    return df
+
+
+class UploadedTables:
+    """
+    Several uploaded files holding parts of one table, e.g. an allele table per
+    sequencing run, used like a single `UploadedTable`.
+
+    Each file is parsed as an `UploadedTable` in a bounded thread pool, so a
+    batch of files loads in about the time of the slowest one, and the parts are
+    concatenated in upload order. The time spent on each file by the latest
+    parse is kept in `timings`.
+    """
+
+    def __init__(
+        self,
+        files,
+        n_rows=PROBE_ROWS,
+        sheet_name=None,
+        cache=PARSE_CACHE,
+        compact=None,
+        max_workers=MAX_PARSE_WORKERS,
+        rows_per_chunk=None,
+    ):
+        self.files = list(files)
+        if not self.files:
+            raise ValueError("No files to load.")
+        self.max_workers = max_workers
+        self.timings = {}
+        self.tables = self._map(
+            lambda file: UploadedTable(
+                file,
+                n_rows,
+                sheet_name=sheet_name,
+                cache=cache,
+                compact=compact,
+                rows_per_chunk=rows_per_chunk,
+            )
+        )
+        columns = self.tables[0].columns
+        for file, table in zip(self.files, self.tables):
+            if set(table.columns) != set(columns):
+                raise ValueError(
+                    f"{_file_name(file)} does not have the same columns as "
+                    f"{_file_name(self.files[0])}."
+                )
+        self.preview = _concat_tables([table.preview[columns] for table in self.tables])
+        keys = tuple(table.preview_key for table in self.tables)
+        self.preview_key = None if None in keys else keys
+
+    @property
+    def columns(self):
+        """Columns of the combined table, in the order of the first file."""
+        return self.preview.columns
+
+    @property
+    def empty(self):
+        """True if none of the files has data rows."""
+        return all(table.empty for table in self.tables)
+
+    def project(self, columns, dtypes=None):
+        """Restrict the full parse of every file, see `UploadedTable.project`."""
+        for table in self.tables:
+            table.project(columns, dtypes)
+
+    def load(self, extra_columns=None):
+        """
+        Parse every file concurrently and concatenate them.
+
+        Args:
+            extra_columns (list, optional): See `UploadedTable.load`.
+        """
+        frames = self._map(lambda table: table.load(extra_columns), self.tables)
+        columns = frames[0].columns
+        return _concat_tables([frame[columns] for frame in frames])
+
+    def _map(self, parse, items=None):
+        """Apply `parse` to each file (or `items`) in the thread pool, timing each."""
+        items = self.files if items is None else items
+
+        def timed(index):
+            start = time.perf_counter()
+            result = parse(items[index])
+            return result, time.perf_counter() - start
+
+        workers = max(1, min(self.max_workers, len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(timed, range(len(items))))
+        self.timings = {
+            getattr(file, "name", None) or _file_name(file): seconds
+            for file, (_, seconds) in zip(self.files, results)
+        }
+        return [result for result, _ in results]
+
+
+def iter_csv_chunks(
+    file, rows_per_chunk=DEFAULT_CHUNK_ROWS, sheet_name=None, usecols=None, dtype=None
+):
+    """
+    Iterate over a CSV, TSV, TXT, Excel or columnar file in DataFrames of bounded size.
+
+    Uses the same format and delimiter detection as `load_csv`, but never holds
+    more than `rows_per_chunk` parsed rows of a delimited file in memory at once.
+    Parquet files are decoded batch by batch and Arrow IPC files are sliced in
+    place. Rows of xlsx sheets are streamed with openpyxl; legacy xls workbooks
+    cannot be parsed incrementally, so the sheet is read once and then yielded
+    in slices of `rows_per_chunk` rows.
+
+    Args:
+        file: A path, or a seekable file-like object with a `name` attribute.
+        rows_per_chunk (int): Maximum number of rows in each yielded DataFrame.
+        sheet_name (str, optional): Sheet to read from an Excel workbook.
+            Defaults to the first sheet.
+        usecols (list, optional): Only parse these columns.
+        dtype (dict, optional): dtypes to cast each chunk's columns to, as in
+            `load_csv`.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the file, sharing the same columns.
+    """
+    if rows_per_chunk < 1:
+        raise ValueError("rows_per_chunk must be a positive integer.")
+    keep = _usecols_callable(usecols)
+    try:
+        for chunk in _iter_chunks(file, rows_per_chunk, sheet_name, keep):
+            yield _cast_columns(chunk, dtype) if dtype else chunk
     except Exception as e:
         raise ValueError(f"Failed to read CSV: {e}")
+
+
+def _iter_chunks(file, rows_per_chunk, sheet_name, usecols):
+    """Yield chunks of a file, keeping the columns selected by `usecols`."""
+    file_format = _file_format(file)
+    if file_format == "parquet":
+        parquet_file = pq.ParquetFile(_arrow_source(file))
+        names = parquet_file.schema_arrow.names
+        columns = [name for name in names if usecols(name)] if usecols else None
+        for batch in parquet_file.iter_batches(
+            batch_size=rows_per_chunk, columns=columns
+        ):
+            yield batch.to_pandas()
+    elif file_format == "feather":
+        table = pa.ipc.open_file(_arrow_source(file)).read_all()
+        if usecols:
+            table = table.select([name for name in table.column_names if usecols(name)])
+        for batch in table.to_batches(max_chunksize=rows_per_chunk):
+            yield batch.to_pandas()
+    elif file_format == "delimited":
+        compression = _compression(file)
+        dialect = sniff_dialect(file, compression=compression)
+        with pd.read_csv(
+            file,
+            sep=dialect["delimiter"],
+            quotechar=dialect["quotechar"],
+            engine=PARSE_ENGINE,
+            chunksize=rows_per_chunk,
+            compression=compression,
+            usecols=usecols,
+            memory_map=_is_path(file) and not compression,
+        ) as reader:
+            for chunk in reader:
+                chunk.attrs["load_info"] = {**dialect, "engine": PARSE_ENGINE}
+                yield chunk
+    elif _file_name(file).endswith(".xlsx"):
+        yield from _iter_excel_frames(
+            file, sheet_name, usecols, rows_per_chunk=rows_per_chunk
+        )
+    else:
+        df = _read_excel(file, sheet_name, usecols=usecols)
+        for start in range(0, len(df), rows_per_chunk):
+            yield df.iloc[start : start + rows_per_chunk]
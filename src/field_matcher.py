@@ -1,8 +1,473 @@
-from fuzzywuzzy import process
+import hashlib
+import json
+import os
 from collections import Counter
+import numpy as np
 import pandas as pd
+from rapidfuzz import fuzz
+from rapidfuzz.process import cdist
+from rapidfuzz.utils import default_process
 import streamlit as st
-from src.data_loader import load_csv
+from src.data_loader import (
+    COLUMNAR_FILE_TYPES,
+    COMPRESSED_FILE_TYPES,
+    EXCEL_EXTENSIONS,
+    DEFAULT_CHUNK_ROWS,
+    EXCEL_CACHE,
+    PARSE_CACHE,
+    UPLOAD_MEMORY_BUDGET,
+    SpilledUpload,
+    UploadedTable,
+    UploadedTables,
+    data_roots,
+    list_excel_sheets,
+    memory_report,
+    resolve_data_paths,
+    upload_size,
+)
+from src.schema_index import schema_section
+from src.utils import LRUCache, remove_file, write_atomically
+
+
+# Number of field matching results kept in memory
+MATCH_CACHE_MAX_ENTRIES = 1024
+
+
+class MatchCache(LRUCache):
+    """
+    Field matching results, keyed by the input columns, the schema section
+    they were matched against and the matching options. At most
+    `max_entries` results are kept.
+    """
+
+    def __init__(self, max_entries=MATCH_CACHE_MAX_ENTRIES):
+        super().__init__(max_entries)
+
+    @property
+    def max_entries(self):
+        return self.max_weight
+
+    @staticmethod
+    def key(
+        field_names,
+        target_schema,
+        alternate_schema_names=None,
+        is_required=True,
+        match_threshold=60,
+        field_profiles=None,
+    ):
+        """Hashable key for one call of `fuzzy_match_fields`."""
+        section = schema_section(target_schema, alternate_schema_names)
+        profiles = (
+            tuple(field_profiles.get(field) for field in field_names)
+            if field_profiles
+            else None
+        )
+        return (
+            tuple(field_names),
+            section.key,
+            is_required,
+            match_threshold,
+            profiles,
+        )
+
+    def get(self, key):
+        """Return a copy of the cached mapping and unused fields, or None."""
+        entry = super().get(key)
+        if entry is None:
+            return None
+        # Callers edit the mapping; the cached result stays as matched
+        return dict(entry[0]), list(entry[1])
+
+    def put(self, key, matches, unused_field_names):
+        """Cache a result under `key`, evicting the least recently used."""
+        super().put(key, (dict(matches), list(unused_field_names)))
+
+    def stats(self):
+        """Hit and miss counts and number of entries."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+        }
+
+
+MATCH_CACHE = MatchCache()
+
+
+# Confirmed field mappings, kept across sessions and restarts; overridden by
+# the PMO_BUILDER_TEMPLATE_DIR variable
+MAPPING_TEMPLATE_DIR = os.environ.get(
+    "PMO_BUILDER_TEMPLATE_DIR",
+    os.path.join(os.path.expanduser("~"), ".pmo_builder", "mapping_templates"),
+)
+
+
+def column_fingerprint(columns, *sections):
+    """
+    Fingerprint of an input column set and the schema sections it is mapped to.
+
+    The columns are sorted, so files from the same pipeline share a
+    fingerprint whatever order their columns are in.
+
+    Args:
+        columns (list): Input column names.
+        *sections (SchemaSection): Schema sections the columns are mapped to.
+
+    Returns:
+        str: Hex digest identifying the columns and sections.
+    """
+    payload = json.dumps(
+        [sorted({str(column) for column in columns}), [s.key for s in sections]]
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class MappingTemplateStore:
+    """
+    Disk store of confirmed field mappings, keyed by `column_fingerprint`.
+
+    Labs upload the same pipeline output formats again and again, so once a
+    mapping has been checked and saved, later uploads with the same columns,
+    from any session and after a restart, start from it instead of from fuzzy
+    matching.
+    """
+
+    def __init__(self, directory=MAPPING_TEMPLATE_DIR):
+        self.directory = os.fspath(directory)
+
+    def path(self, fingerprint):
+        """Where the template for a fingerprint is stored."""
+        return os.path.join(self.directory, f"{fingerprint}.json")
+
+    def get(self, fingerprint):
+        """
+        Return the saved template for a fingerprint, or None if there is none.
+
+        Returns:
+            dict: "required" and "optional" mappings from target to input
+                field, and the "additional" fields selected.
+        """
+        try:
+            with open(self.path(fingerprint)) as file:
+                template = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(template, dict):
+            return None
+        return template
+
+    def put(self, fingerprint, required, optional=None, additional=()):
+        """
+        Save a confirmed mapping for a fingerprint.
+
+        Returns:
+            bool: True if the template was saved.
+        """
+        template = {
+            "required": dict(required or {}),
+            "optional": dict(optional or {}),
+            "additional": list(additional or []),
+        }
+
+        def write(temporary_path):
+            with open(temporary_path, "w") as file:
+                json.dump(template, file, indent=2)
+
+        try:
+            write_atomically(self.path(fingerprint), write)
+        except (OSError, TypeError, ValueError):
+            return False
+        return True
+
+    def delete(self, fingerprint):
+        """Forget the template for a fingerprint."""
+        remove_file(self.path(fingerprint))
+
+
+MAPPING_TEMPLATES = MappingTemplateStore()
+
+
+def template_mapping(saved_mapping, target_schema, field_names):
+    """
+    Restores a saved mapping for the current targets and input fields.
+
+    Args:
+        saved_mapping (dict): Saved mapping from target to input field.
+        target_schema (list): Targets the mapping must cover.
+        field_names (list): Input fields available for the mapping.
+
+    Returns:
+        dict: The mapping for every target, or None if the saved mapping
+            refers to targets or fields that no longer exist.
+    """
+    if not isinstance(saved_mapping, dict) or set(saved_mapping) - set(target_schema):
+        return None
+    available = set(field_names)
+    mapping = {target: saved_mapping.get(target) for target in target_schema}
+    if any(field is not None and field not in available for field in mapping.values()):
+        return None
+    return mapping
+
+
+# Mapping editor value for a column included as an additional field
+ADDITIONAL_FIELD = "additional field"
+# Rows sampled per column when profiling column contents
+PROFILE_SAMPLE_ROWS = 200
+# Share of sampled values that must pass a check for a column to match it
+PROFILE_MIN_FRACTION = 0.9
+# Score added when a column's contents fit a target, or removed when they
+# clearly do not
+CONTENT_MATCH_BONUS = 30
+CONTENT_MISMATCH_PENALTY = 30
+# Kind of values each target holds, checked against the sampled contents
+TARGET_CONTENT = {
+    "seq": "dna",
+    "ref_seq": "dna",
+    "forward_primer_seq": "dna",
+    "reverse_primer_seq": "dna",
+    "reads": "count",
+    "umis": "count",
+    "read_count": "count",
+    "raw_read_count": "count",
+    "total_raw_count": "count",
+    "start": "count",
+    "end": "count",
+    "pseudocigar": "pseudocigar",
+    "collection_date": "date",
+    "seq_date": "date",
+    "nucl_acid_ext_date": "date",
+    "nucl_acid_amp_date": "date",
+}
+DNA_PATTERN = r"[ACGTNacgtn-]{4,}"
+# Positions followed by a substitution, insertion, deletion or masked run,
+# e.g. "12A40I=TT61D=2", or "." for a sequence matching the reference
+PSEUDOCIGAR_PATTERN = (
+    r"\.|(?:\d+(?:[ACGTNacgtn]|I=[ACGTNacgtn]+|D=[ACGTNacgtn\d]+|\+\d+N))+"
+)
+DATE_PATTERN = (
+    r"\d{4}[-/]\d{1,2}(?:[-/]\d{1,2})?(?:[ T].*)?|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}"
+)
+
+
+def _content_checks(values):
+    """
+    Which sampled values of one column pass each content check.
+
+    Args:
+        values (pd.Series): Non-null sampled values of a column.
+
+    Returns:
+        dict: Boolean Series per content type.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return {"date": pd.Series(True, index=values.index)}
+    if pd.api.types.is_bool_dtype(values):
+        return {}
+    numbers = pd.to_numeric(values, errors="coerce")
+    checks = {"count": numbers.notna() & (numbers >= 0) & (numbers % 1 == 0)}
+    if pd.api.types.is_numeric_dtype(values):
+        return checks
+    text = values.astype(str).str.strip()
+    checks["dna"] = text.str.fullmatch(DNA_PATTERN)
+    checks["pseudocigar"] = text.str.fullmatch(PSEUDOCIGAR_PATTERN)
+    dates = text.str.fullmatch(DATE_PATTERN)
+    if dates.any():
+        parsed = pd.to_datetime(text[dates], errors="coerce", format="mixed")
+        dates &= parsed.reindex(text.index).notna()
+    checks["date"] = dates
+    return checks
+
+
+def profile_columns(df, sample_rows=PROFILE_SAMPLE_ROWS):
+    """
+    Detects what kind of values each column holds from a bounded sample.
+
+    Only the first `sample_rows` rows are checked, so the cost does not grow
+    with the size of the file.
+
+    Args:
+        df (pd.DataFrame): Table, or the preview rows of one.
+        sample_rows (int): Rows checked per column.
+
+    Returns:
+        dict: Content types detected for each column with sampled values.
+    """
+    profiles = {}
+    sample = df.head(sample_rows)
+    for column in sample.columns.unique():
+        values = sample[column]
+        if isinstance(values, pd.DataFrame):
+            # Duplicate column names; profile the first
+            values = values.iloc[:, 0]
+        values = values.dropna()
+        if values.empty:
+            continue
+        profiles[column] = frozenset(
+            content
+            for content, passed in _content_checks(values).items()
+            if passed.mean() >= PROFILE_MIN_FRACTION
+        )
+    return profiles
+
+
+# Number of column profiles kept in memory, one per uploaded table
+PROFILE_CACHE_MAX_ENTRIES = 64
+PROFILE_CACHE = LRUCache(PROFILE_CACHE_MAX_ENTRIES)
+
+
+def table_profiles(table, cache=PROFILE_CACHE):
+    """
+    Profiles the preview rows of an uploaded table once per upload.
+
+    Args:
+        table (UploadedTable or UploadedTables): The uploaded table.
+        cache (LRUCache, optional): Profiles keyed by the table's
+            `preview_key`; None disables it.
+
+    Returns:
+        dict: Content types per column, see `profile_columns`.
+    """
+    key = getattr(table, "preview_key", None)
+    if cache is None or key is None:
+        return profile_columns(table.preview)
+    profiles = cache.get(key)
+    if profiles is None:
+        profiles = profile_columns(table.preview)
+        cache.put(key, profiles)
+    return profiles
+
+
+def content_scores(field_names, target_schema, field_profiles):
+    """
+    Score adjustments from how well each column's contents fit each target.
+
+    Args:
+        field_names (list): List of column names to be matched.
+        target_schema (list): List of standard schema fields.
+        field_profiles (dict): Content types per column, from
+            `profile_columns`.
+
+    Returns:
+        numpy.ndarray: A (targets x fields) array to add to the name scores.
+    """
+    profiles = [field_profiles.get(field) for field in field_names]
+    profiled = np.array([detected is not None for detected in profiles], dtype=bool)
+    adjustments = np.zeros((len(target_schema), len(field_names)), dtype=np.float32)
+    rows = {}
+    for i, target in enumerate(target_schema):
+        content = TARGET_CONTENT.get(target)
+        if content is None:
+            continue
+        if content not in rows:
+            fits = np.array(
+                [detected is not None and content in detected for detected in profiles],
+                dtype=bool,
+            )
+            rows[content] = np.where(
+                fits,
+                CONTENT_MATCH_BONUS,
+                np.where(profiled, -CONTENT_MISMATCH_PENALTY, 0),
+            )
+        adjustments[i] = rows[content]
+    return adjustments
+
+
+def score_matrix(field_names, target_schema, alternate_schema_names=None):
+    """
+    Scores every field name against every target schema field in one pass.
+
+    Each target is scored under its own name and under each of its alternate
+    names, and keeps the best of those scores. The target names come
+    preprocessed from the schema index, so only the fields are normalized.
+
+    Args:
+        field_names (list): List of column names to be matched.
+        target_schema (list or SchemaSection): Standard schema fields to match
+            against.
+        alternate_schema_names (dict, optional): Alternate names per target.
+
+    Returns:
+        numpy.ndarray: A (targets x fields) array of WRatio scores from 0 to 100.
+    """
+    section = schema_section(target_schema, alternate_schema_names)
+    scores = np.zeros((len(section), len(field_names)), dtype=np.float32)
+    if not section.queries or not field_names:
+        return scores
+    query_scores = cdist(
+        section.queries,
+        [default_process(str(field)) for field in field_names],
+        scorer=fuzz.WRatio,
+        dtype=np.float32,
+    )
+    # Keep the best score among each target's own name and its alternates
+    np.maximum.at(scores, section.owners, query_scores)
+    return scores
+
+
+def optimal_assignment(scores):
+    """
+    Finds the one-to-one assignment of rows to columns with the highest total
+    score (Hungarian algorithm with shortest augmenting paths).
+
+    Each row is assigned to at most one column and each column to at most one
+    row. When there are more rows than columns, some rows stay unassigned.
+
+    Args:
+        scores (numpy.ndarray): A (rows x columns) score matrix.
+
+    Returns:
+        numpy.ndarray: The assigned column for every row, or -1 if unassigned.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n_rows, n_cols = scores.shape
+    if n_rows == 0 or n_cols == 0:
+        return np.full(n_rows, -1, dtype=np.intp)
+    if n_rows > n_cols:
+        # Solve the transposed problem so every column gets a row
+        assignment = np.full(n_rows, -1, dtype=np.intp)
+        assignment[optimal_assignment(scores.T)] = np.arange(n_cols)
+        return assignment
+
+    # Minimize cost; index 0 of the potentials and links is a virtual column
+    cost = scores.max() - scores
+    u = np.zeros(n_rows + 1)
+    v = np.zeros(n_cols + 1)
+    row_of = np.zeros(n_cols + 1, dtype=np.intp)
+    way = np.zeros(n_cols + 1, dtype=np.intp)
+    for row in range(1, n_rows + 1):
+        row_of[0] = row
+        col = 0
+        min_slack = np.full(n_cols + 1, np.inf)
+        used = np.zeros(n_cols + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = row_of[col]
+            free = ~used[1:]
+            slack = cost[current - 1] - u[current] - v[1:]
+            improved = free & (slack < min_slack[1:])
+            min_slack[1:][improved] = slack[improved]
+            way[1:][improved] = col
+            candidates = np.where(free, min_slack[1:], np.inf)
+            next_col = int(candidates.argmin()) + 1
+            delta = candidates[next_col - 1]
+            u[row_of[used]] += delta
+            v[used] -= delta
+            min_slack[~used] -= delta
+            col = next_col
+            if row_of[col] == 0:
+                break
+        # Flip the augmenting path back to the virtual column
+        while col:
+            previous = way[col]
+            row_of[col] = row_of[previous]
+            col = previous
+
+    assignment = np.full(n_rows, -1, dtype=np.intp)
+    assigned = np.nonzero(row_of[1:])[0]
+    assignment[row_of[1:][assigned] - 1] = assigned
+    return assignment
 
 
 def fuzzy_match_fields(
@@ -11,66 +476,80 @@ def fuzzy_match_fields(
     alternate_schema_names=None,
     is_required: bool = True,
     match_threshold: int = 60,
+    cache=MATCH_CACHE,
+    field_profiles=None,
 ):
     """
     Matches field names to the target schema using fuzzy matching, ensuring
-    that each target schema field is only matched to one field name.
+    that each target schema field is only matched to one field name. Fields
+    are assigned to maximize the total match score over all targets, so the
+    result does not depend on the order of the schema.
 
     Args:
         field_names (list): List of column names to be matched.
-        target_schema (list): List of standard schema fields to match against.
+        target_schema (list or SchemaSection): Standard schema fields to match
+            against.
+        cache (MatchCache, optional): Cache of earlier results; None disables it.
+        field_profiles (dict, optional): Content types per column, from
+            `profile_columns`; columns whose contents fit a target score higher.
 
     Returns:
         dict: A dictionary mapping each field name to the best-matched schema field.
         list: A list of unused field names that could not be matched.
     """
+    section = schema_section(target_schema, alternate_schema_names)
+    target_schema = section.targets
     # Initialize all targets with None to ensure full coverage in the table
     matches = {target: None for target in target_schema}
-    # Track remaining available fields to enforce one-to-one mapping
-    available_fields = set(field_names)
+    # Duplicate column names can only be matched once
+    field_names = list(dict.fromkeys(field_names))
 
     # Error if not enough unique fields to match all targets
-    if is_required and len(available_fields) < len(target_schema):
+    if is_required and len(field_names) < len(target_schema):
         st.error(
             "Not enough unique input fields to match all required schema fields. "
-            f"Have {len(available_fields)} unique field(s) for {len(target_schema)} target(s)."
+            f"Have {len(field_names)} unique field(s) for {len(target_schema)} target(s)."
         )
 
-    # For every target find the best matching unused field
-    for target in target_schema:
-        if not available_fields:
-            # If no fields remain, required path already surfaced a global error above
-            # For optional, we keep 'no match' as initialized
-            continue
-
-        remaining_fields = list(available_fields)
-        best_match = process.extractOne(target, remaining_fields)
-
-        if alternate_schema_names and target in alternate_schema_names:
-            for alt_target in alternate_schema_names.get(target, []):
-                alt_match = process.extractOne(alt_target, remaining_fields)
-                if alt_match and best_match and alt_match[1] > best_match[1]:
-                    best_match = alt_match
-
-        if not best_match:
-            # Leave as None
-            continue
+    if cache is not None:
+        key = cache.key(
+            field_names,
+            section,
+            None,
+            is_required,
+            match_threshold,
+            field_profiles,
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
-        best_match_field = best_match[0]
-        best_score = best_match[1]
+    scores = score_matrix(field_names, section)
+    # Optional targets only take fields whose names clear the threshold;
+    # contents rank those fields but cannot qualify a weak name on their own
+    eligible = np.asarray(is_required or scores >= match_threshold)
+    if field_profiles:
+        # Contents that fit a target outweigh a cryptic header. Scores are not
+        # clipped to 100, so columns whose contents fit the same target are
+        # still told apart by their names
+        scores = scores + content_scores(field_names, target_schema, field_profiles)
+    if not is_required:
+        # Pairs below the threshold must not steer the assignment
+        scores = np.where(eligible, scores, 0)
 
-        if is_required:
-            # Always take the best remaining field for required targets
-            matches[target] = best_match_field
-            available_fields.discard(best_match_field)
-        else:
-            # Only accept if above threshold; otherwise keep None
-            if best_score >= match_threshold:
-                matches[target] = best_match_field
-                available_fields.discard(best_match_field)
+    # Assign fields to targets to maximize the total score; required targets
+    # always take their assigned field, optional ones only above threshold
+    available = np.ones(len(field_names), dtype=bool)
+    for i, field in enumerate(optimal_assignment(scores)):
+        target = target_schema[i]
+        if field >= 0 and (is_required or eligible[i, field]):
+            matches[target] = field_names[field]
+            available[field] = False
 
     # Fields not used in matching
-    unused_field_names = list(available_fields)
+    unused_field_names = [field for field, free in zip(field_names, available) if free]
+    if cache is not None:
+        cache.put(key, matches, unused_field_names)
     return matches, unused_field_names
 
 
@@ -102,152 +581,307 @@ def no_duplicates(field_mapping):
     return True
 
 
-def interactive_field_mapping(field_mapping, df_columns, is_required: bool = True):
-    updated_mapping = {}
-
-    # Add "no match" option to the available choices
-    if is_required:
-        options = df_columns
-    else:
-        options = ["no match"] + df_columns
-
-    for field, suggested_match in field_mapping.items():
-        # Use streamlit widgets to allow the user to select a match from df columns
-        if isinstance(suggested_match, list):  # For multiple possible matches
-            # Find the index in the options list
-            try:
-                index = options.index(suggested_match[0]) if suggested_match else 0
-            except ValueError:
-                index = 0  # Default to "no match" if not found
-
-            selected = st.selectbox(
-                f"Select match for {field}",
-                options=options,
-                index=index,
-            )
-        else:
-            # Find the index in the options list
-            try:
-                index = options.index(suggested_match) if suggested_match else 0
-            except ValueError:
-                index = 0  # Default to "no match" if not found
-
-            selected = st.selectbox(
-                f"Modify match for {field}",
-                options=options,
-                index=index,
-            )
-
-        # Convert "no match" to None
-        updated_mapping[field] = None if selected == "no match" else selected
-
-    return updated_mapping
-
-
 def field_mapping_json_to_table(mapping):
     data = [{"PMO Field": key, "Input Field": value} for key, value in mapping.items()]
     df = pd.DataFrame(data)
     return df
 
 
-def fuzzy_field_matching_page_section(
-    input_fields, target_schema, alternate_schema_names=None, is_required: bool = True
+def suggest_field_mapping(
+    input_fields,
+    target_schema,
+    alternate_schema_names=None,
+    is_required: bool = True,
+    saved_mapping=None,
+    field_profiles=None,
 ):
-    st.subheader("Match Fields")
-    field_mapping, unused_field_names = fuzzy_match_fields(
-        input_fields, target_schema, alternate_schema_names, is_required=is_required
+    """
+    Suggests a mapping of input fields to targets for the mapping editor.
+
+    A mapping saved as a template is used as is; otherwise the fields are
+    fuzzy matched.
+
+    Returns:
+        dict: A dictionary mapping each target to an input field or None.
+        list: Input fields not used by the mapping.
+    """
+    if saved_mapping is not None:
+        field_mapping = dict(saved_mapping)
+        used_fields = set(field_mapping.values())
+        unused_field_names = [
+            field for field in input_fields if field not in used_fields
+        ]
+        return field_mapping, unused_field_names
+    return fuzzy_match_fields(
+        input_fields,
+        target_schema,
+        alternate_schema_names,
+        is_required=is_required,
+        field_profiles=field_profiles,
     )
-    st.write("Suggested Field Mapping:")
-    st.dataframe(field_mapping_json_to_table(field_mapping))
-    return field_mapping, unused_field_names
 
 
-def interactive_field_mapping_page_section(
-    field_mapping,
-    df_columns,
-    toggle_name="Manually Alter Field Mapping",
-    key_suffix: str = "",
-    is_required: bool = True,
+def mapping_table(columns, mappings, additional_fields=()):
+    """
+    One row per input column with the PMO field it is mapped to.
+
+    Args:
+        columns (list): Input column names.
+        mappings (list): Mappings from target to input field.
+        additional_fields (list): Columns to include as additional fields.
+
+    Returns:
+        pd.DataFrame: "Input Field" and "PMO Field" columns; the PMO field is
+            `ADDITIONAL_FIELD` for additional fields and None for unused ones.
+    """
+    target_of = {}
+    for mapping in mappings:
+        for target, field in (mapping or {}).items():
+            if field is not None:
+                target_of.setdefault(field, target)
+    additional_fields = set(additional_fields)
+    pmo_fields = [
+        target_of.get(column, ADDITIONAL_FIELD if column in additional_fields else None)
+        for column in columns
+    ]
+    return pd.DataFrame({"Input Field": list(columns), "PMO Field": pmo_fields})
+
+
+def read_mapping_table(table, target_groups):
+    """
+    Reads the mappings and additional fields back from an edited table.
+
+    When several columns are given the same target, the first one is used.
+
+    Args:
+        table (pd.DataFrame): Table from `mapping_table`, possibly edited.
+        target_groups (list): Target lists, e.g. required and optional.
+
+    Returns:
+        list: A mapping from target to input field or None for each group.
+        list: Input fields selected as additional fields.
+    """
+    field_of = {}
+    additional_fields = []
+    for column, target in zip(table["Input Field"], table["PMO Field"]):
+        if target == ADDITIONAL_FIELD:
+            additional_fields.append(column)
+        elif isinstance(target, str) and target:
+            field_of.setdefault(target, column)
+    mappings = [
+        {target: field_of.get(target) for target in targets}
+        for targets in target_groups
+    ]
+    return mappings, additional_fields
+
+
+def mapping_editor_section(
+    columns,
+    target_groups,
+    suggested_mappings,
+    additional_fields=(),
+    key_suffix="",
 ):
-    unique_key = (
-        f"interactive_field_mapping_{key_suffix}"
-        if key_suffix
-        else "interactive_field_mapping"
+    """
+    Edit the field mapping and the additional fields in a single grid.
+
+    Every input column is one row, in which the user picks the PMO field it
+    maps to, marks it as an additional field, or leaves it empty.
+
+    Returns:
+        list: A mapping from target to input field or None for each group. The
+            first, required group is None instead while any of its targets is
+            unmapped, so pages do not transform an incomplete mapping.
+        list: Input fields selected as additional fields.
+    """
+    st.subheader("Map Fields")
+    st.write(
+        "Pick the PMO field each column of your input maps to. Mark columns "
+        f'without a PMO field as "{ADDITIONAL_FIELD}" to include them in the '
+        "final PMO file, or leave them empty to leave them out."
     )
-    interactive_field_mapping_on = st.toggle(toggle_name, key=unique_key)
-    if interactive_field_mapping_on:
-        updated_mapping = interactive_field_mapping(
-            field_mapping, df_columns, is_required=is_required
+    table = mapping_table(columns, suggested_mappings, additional_fields)
+    options = [target for targets in target_groups for target in targets]
+    # Edits belong to one suggestion; a new upload or template starts afresh
+    suggestion = hashlib.blake2b(table.to_json().encode(), digest_size=8).hexdigest()
+    editor_key = f"mapping_editor_{key_suffix}" if key_suffix else "mapping_editor"
+    edited = st.data_editor(
+        table,
+        column_config={
+            "Input Field": st.column_config.TextColumn(disabled=True),
+            "PMO Field": st.column_config.SelectboxColumn(
+                options=[*dict.fromkeys(options), ADDITIONAL_FIELD]
+            ),
+        },
+        hide_index=True,
+        use_container_width=True,
+        key=f"{editor_key}_{suggestion}",
+    )
+    no_duplicates(
+        {
+            column: target
+            for column, target in zip(edited["Input Field"], edited["PMO Field"])
+            if target != ADDITIONAL_FIELD
+        }
+    )
+    mappings, selected_additional_fields = read_mapping_table(edited, target_groups)
+    missing = [target for target, field in mappings[0].items() if field is None]
+    if missing:
+        st.error(
+            "Map an input field to each required field to transform the data. "
+            f"Missing: {missing}"
         )
-        st.write("Updated Field Mapping:")
-        st.dataframe(field_mapping_json_to_table(updated_mapping))
-        no_duplicates(updated_mapping)
-
-        # Calculate updated unused_field_names
-        used_fields = {field for field in updated_mapping.values() if field is not None}
-        updated_unused_field_names = [
-            field for field in df_columns if field not in used_fields
-        ]
+        mappings[0] = None
+    return mappings, selected_additional_fields
 
-        return updated_mapping, updated_unused_field_names
-    return field_mapping, df_columns
 
+def mapping_projection(mappings, additional_fields=None, field_dtypes=None):
+    """
+    Work out which input columns a transform needs and the dtypes to parse them as.
 
-def additional_fields_section(unused_field_names, key_suffix=None):
-    """Show an Additional Fields section for unmatched input fields and allow selection."""
-    selected_additional_fields = []
-    if not unused_field_names:
-        return selected_additional_fields
+    Args:
+        mappings (list): Dictionaries mapping PMO fields to input columns.
+        additional_fields (list, optional): Extra input columns to keep.
+        field_dtypes (dict, optional): dtypes keyed by PMO field name, as declared
+            in the "dtypes" section of the schema.
 
-    st.subheader("Additional Fields")
-    st.write(
-        "The following fields from your input were not matched. Select any to include as additional fields in the final PMO file."
-    )
+    Returns:
+        list: The input columns used by the mappings and additional fields.
+        dict: dtypes keyed by input column name.
+    """
+    columns, dtypes = [], {}
+    for mapping in mappings:
+        for field, column in (mapping or {}).items():
+            if column is None:
+                continue
+            if column not in columns:
+                columns.append(column)
+            if field_dtypes and field in field_dtypes:
+                dtypes[column] = field_dtypes[field]
+    for column in additional_fields or []:
+        if column not in columns:
+            columns.append(column)
+    return columns, dtypes
 
-    cols = st.columns(2) if len(unused_field_names) <= 6 else st.columns(3)
-    for i, field in enumerate(unused_field_names):
-        with cols[i % len(cols)]:
-            checkbox_key = (
-                f"additional_{key_suffix}_{field}"
-                if key_suffix
-                else f"additional_{field}"
-            )
-            include = st.checkbox(f"{field}", key=checkbox_key)
-            if include:
-                selected_additional_fields.append(field)
 
-    if selected_additional_fields:
-        st.success(
-            f"Selected {len(selected_additional_fields)} additional field(s): {', '.join(selected_additional_fields)}"
-        )
+def spill_oversized_uploads(uploaded_files, session_key, memory_budget):
+    """
+    Copy uploads larger than `memory_budget` bytes to temporary files.
 
-    return selected_additional_fields
+    The copies are kept in the session state under `session_key`, so each
+    upload is only written once per session. Copies of files that are no longer
+    uploaded are dropped, and their temporary files deleted, on the next rerun;
+    the rest are deleted when the session ends.
 
+    Returns:
+        list: The uploads, with oversized ones replaced by their SpilledUpload.
+        bool: True if any upload was spilled.
+    """
+    previous = st.session_state.get(session_key, {})
+    spilled = {}
+    files = []
+    for uploaded_file in uploaded_files:
+        if upload_size(uploaded_file) <= memory_budget:
+            files.append(uploaded_file)
+            continue
+        file_id = getattr(uploaded_file, "file_id", uploaded_file.name)
+        spilled[file_id] = previous.get(file_id) or SpilledUpload(uploaded_file)
+        files.append(spilled[file_id])
+    st.session_state[session_key] = spilled
+    return files, bool(spilled)
 
-def field_mapping(
-    input_fields,
-    target_schema,
-    target_alternate_schema,
-    key_suffix: str = "",
-    is_required: bool = True,
-):
-    # Fuzzy field matching required arguments
-    mapped_fields, unused_field_names = fuzzy_field_matching_page_section(
-        input_fields, target_schema, target_alternate_schema, is_required=is_required
-    )
 
-    # Interactive field mapping
-    mapped_fields, updated_unused_field_names = interactive_field_mapping_page_section(
-        mapped_fields, input_fields, key_suffix=key_suffix, is_required=is_required
+def server_path_input(key_suffix="", accept_multiple_files=False):
+    """
+    Let the user name files that are already on the server by path, directory
+    or glob, relative to an allow-listed data root.
+
+    Returns:
+        list: Paths of the matching files, or an empty list.
+    """
+    path_key = f"server_path_{key_suffix}" if key_suffix else None
+    pattern = st.text_input(
+        "Path, directory or glob",
+        help=f"Relative to {', '.join(data_roots())}, e.g. run1/*.tsv",
+        key=path_key,
     )
-    # Use updated unused_field_names if interactive mapping was used, otherwise use original
-    final_unused_field_names = (
-        updated_unused_field_names
-        if updated_unused_field_names != input_fields
-        else unused_field_names
+    if not pattern:
+        return []
+    try:
+        paths = resolve_data_paths(pattern)
+    except ValueError as e:
+        st.error(str(e))
+        return []
+    if len(paths) > 1 and not accept_multiple_files:
+        st.error(
+            f"{pattern!r} matches {len(paths)} files, but only one file can be "
+            "loaded here."
+        )
+        return []
+    names = ", ".join(path.name for path in paths[:10])
+    more = f" and {len(paths) - 10} more" if len(paths) > 10 else ""
+    st.caption(f"Found {len(paths)} file(s): {names}{more}")
+    return paths
+
+
+def file_timings_section(df):
+    """Show how long each file of a multi-file upload took to parse."""
+    timings = getattr(df, "timings", None)
+    if not timings:
+        return
+    st.write("Parse time per file:")
+    st.dataframe(
+        pd.DataFrame(
+            [
+                {"File": name, "Parse time (s)": round(seconds, 3)}
+                for name, seconds in timings.items()
+            ]
+        ),
+        hide_index=True,
     )
 
-    return mapped_fields, final_unused_field_names
+
+def mapping_template_section(fingerprint, key_suffix="", store=MAPPING_TEMPLATES):
+    """
+    Offer the saved mapping template for an upload's columns, if there is one.
+
+    Returns:
+        dict: The saved template, or None if there is none or it is ignored.
+    """
+    template = store.get(fingerprint)
+    if template is None:
+        return None
+    st.info("Pre-filled the field mapping saved for files with these columns.")
+    ignore_key = f"ignore_template_{key_suffix}" if key_suffix else "ignore_template"
+    if st.toggle("Ignore saved mapping", key=ignore_key):
+        return None
+    return template
+
+
+def save_mapping_template_section(
+    fingerprint,
+    mapped_fields,
+    mapped_optional_fields,
+    selected_additional_fields,
+    key_suffix="",
+    store=MAPPING_TEMPLATES,
+):
+    """Offer to save the confirmed mapping for later uploads with these columns."""
+    save_key = f"save_template_{key_suffix}" if key_suffix else "save_template"
+    if st.button("Save Mapping for These Columns", key=save_key):
+        if not no_duplicates({**mapped_fields, **(mapped_optional_fields or {})}):
+            return
+        if store.put(
+            fingerprint,
+            mapped_fields,
+            mapped_optional_fields,
+            selected_additional_fields,
+        ):
+            st.success(
+                "Saved this mapping. Files with the same columns will start from it."
+            )
+        else:
+            st.error(f"Could not save the mapping to {store.directory}.")
 
 
 def load_data(
@@ -256,58 +890,194 @@ def load_data(
     optional_field_schema,
     optional_field_alternate_schema,
     key_suffix="",
+    field_dtypes=None,
+    compact_dtype=None,
+    accept_multiple_files=False,
+    memory_budget=UPLOAD_MEMORY_BUDGET,
 ):
     # Load file
     st.subheader("Upload File")
-    file_uploader_key = f"file_uploader_{key_suffix}" if key_suffix else None
-    uploaded_file = st.file_uploader(
-        "Upload a TSV file",
-        type=["csv", "tsv", "xlsx", "xls", "txt"],
-        key=file_uploader_key,
-    )
+    use_server_path = False
+    if data_roots():
+        # Files already on the server are read in place, without an upload
+        source_key = f"input_source_{key_suffix}" if key_suffix else None
+        input_source = st.radio(
+            "Input source", ["Upload", "Server path"], horizontal=True, key=source_key
+        )
+        use_server_path = input_source == "Server path"
+    rows_per_chunk = None
+    if use_server_path:
+        uploaded_files = server_path_input(key_suffix, accept_multiple_files)
+    else:
+        file_uploader_key = f"file_uploader_{key_suffix}" if key_suffix else None
+        uploaded_file = st.file_uploader(
+            "Upload TSV files" if accept_multiple_files else "Upload a TSV file",
+            type=["csv", "tsv", "xlsx", "xls", "txt"]
+            + COMPRESSED_FILE_TYPES
+            + COLUMNAR_FILE_TYPES,
+            key=file_uploader_key,
+            accept_multiple_files=accept_multiple_files,
+        )
+        # Several files holding parts of one table are parsed concurrently
+        if accept_multiple_files:
+            uploaded_files = uploaded_file or []
+        else:
+            uploaded_files = [uploaded_file] if uploaded_file else []
+        # Uploads over the memory budget are parsed from disk, and compacted
+        # in chunks if the page compacts strings
+        uploaded_files, spilled = spill_oversized_uploads(
+            uploaded_files, f"spilled_uploads_{key_suffix}", memory_budget
+        )
+        if spilled:
+            rows_per_chunk = DEFAULT_CHUNK_ROWS
+            st.caption("Large upload: parsing from a temporary file on disk.")
+    uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
     df, mapped_fields, selected_optional_fields, selected_additional_fields = (
         None,
         None,
         None,
         None,
     )
-    if uploaded_file:
-        df = load_csv(uploaded_file)
+    if uploaded_files and len(uploaded_files) > 1:
+        try:
+            df = UploadedTables(
+                uploaded_files, compact=compact_dtype, rows_per_chunk=rows_per_chunk
+            )
+        except ValueError as e:
+            st.error(f"Error reading files: {e}")
+            return (
+                df,
+                mapped_fields,
+                selected_optional_fields,
+                selected_additional_fields,
+            )
+        st.caption(f"Combined {len(uploaded_files)} files into one table.")
+    elif uploaded_file:
+        # Let the user pick the sheet of a workbook with more than one
+        sheet_name = None
+        if uploaded_file.name.endswith(EXCEL_EXTENSIONS):
+            sheet_names = list_excel_sheets(uploaded_file)
+            if len(sheet_names) > 1:
+                sheet_key = f"sheet_{key_suffix}" if key_suffix else None
+                sheet_name = st.selectbox("Select Sheet", sheet_names, key=sheet_key)
+        # Only the header and a sample of rows are parsed here; the full file
+        # is parsed by the page when the user transforms the data
+        df = UploadedTable(
+            uploaded_file,
+            sheet_name=sheet_name,
+            compact=compact_dtype,
+            rows_per_chunk=rows_per_chunk,
+        )
+    if df is not None:
         preview_toggle_key = f"preview_toggle_{key_suffix}" if key_suffix else None
         interactive_preview = st.toggle("Preview File", key=preview_toggle_key)
         if interactive_preview:
-            st.write("Uploaded File Preview:")
-            st.dataframe(df)
-
-        # Required fields
-        st.subheader("Required Fields")
-        required_key_suffix = f"{key_suffix}_required" if key_suffix else "required"
-        mapped_fields, unused_field_names = field_mapping(
-            df.columns.tolist(),
+            st.write(f"Uploaded File Preview (first {len(df.preview)} rows):")
+            st.dataframe(df.preview)
+            load_info = df.preview.attrs.get("load_info")
+            if load_info and "delimiter" in load_info:
+                st.caption(
+                    f"Detected delimiter {load_info['delimiter']!r} in "
+                    f"{load_info['sniff_seconds']:.3f}s, parsed preview in "
+                    f"{load_info['parse_seconds']:.3f}s"
+                )
+            if load_info and load_info.get("parquet_cache") == "hit":
+                st.caption(
+                    f"Read sheet from its Parquet cache in "
+                    f"{load_info['parse_seconds']:.3f}s"
+                )
+            file_timings_section(df)
+            preview_memory = memory_report(df.preview)
+            if preview_memory is not None:
+                st.write("Memory per column of the preview rows:")
+                st.dataframe(preview_memory, hide_index=True)
+            cache_stats = PARSE_CACHE.stats()
+            st.caption(
+                f"Parse cache: {cache_stats['hits']} hit(s), "
+                f"{cache_stats['misses']} miss(es), "
+                f"{cache_stats['nbytes'] / 1024**2:.1f} of "
+                f"{cache_stats['max_bytes'] / 1024**2:.0f} MB used"
+            )
+            if df.preview.attrs.get("load_info", {}).get("format") == "excel":
+                excel_stats = EXCEL_CACHE.stats()
+                st.caption(
+                    f"Excel Parquet cache: {excel_stats['hits']} hit(s), "
+                    f"{excel_stats['misses']} miss(es), "
+                    f"{excel_stats['nbytes'] / 1024**2:.1f} of "
+                    f"{excel_stats['max_bytes'] / 1024**2:.0f} MB used"
+                )
+            match_stats = MATCH_CACHE.stats()
+            st.caption(
+                f"Field match cache: {match_stats['hits']} hit(s), "
+                f"{match_stats['misses']} miss(es), "
+                f"{match_stats['entries']} of {match_stats['max_entries']} entries"
+            )
+
+        # A mapping saved for the same columns replaces fuzzy matching
+        columns = df.columns.tolist()
+        fingerprint = column_fingerprint(
+            columns,
+            schema_section(target_schema, target_alternate_schema),
+            schema_section(
+                optional_field_schema or [], optional_field_alternate_schema
+            ),
+        )
+        template = mapping_template_section(fingerprint, key_suffix) or {}
+        # Column contents guide matching where headers are cryptic
+        field_profiles = table_profiles(df)
+
+        # Suggest a mapping, then let the user edit it in one grid
+        mapped_fields, unused_field_names = suggest_field_mapping(
+            columns,
             target_schema,
             target_alternate_schema,
-            key_suffix=required_key_suffix,
             is_required=True,
+            saved_mapping=template_mapping(
+                template.get("required"), target_schema, columns
+            ),
+            field_profiles=field_profiles,
         )
+        target_groups = [target_schema]
+        suggested_mappings = [mapped_fields]
         if optional_field_schema:
-            # Optional fields
-            st.subheader("Optional Fields")
-            optional_key_suffix = f"{key_suffix}_optional" if key_suffix else "optional"
-            mapped_optional_fields, unused_field_names = field_mapping(
+            mapped_optional_fields, unused_field_names = suggest_field_mapping(
                 unused_field_names,
                 optional_field_schema,
                 optional_field_alternate_schema,
-                key_suffix=optional_key_suffix,
                 is_required=False,
+                saved_mapping=template_mapping(
+                    template.get("optional"), optional_field_schema, unused_field_names
+                ),
+                field_profiles=field_profiles,
             )
-        else:
-            mapped_optional_fields = None
-        # Additional fields
-        additional_key_suffix = f"{key_suffix}_additional" if key_suffix else None
-        selected_additional_fields = additional_fields_section(
-            unused_field_names, key_suffix=additional_key_suffix
+            target_groups.append(optional_field_schema)
+            suggested_mappings.append(mapped_optional_fields)
+        mappings, selected_additional_fields = mapping_editor_section(
+            columns,
+            target_groups,
+            suggested_mappings,
+            template.get("additional") or (),
+            key_suffix,
         )
+        mapped_fields = mappings[0]
+        mapped_optional_fields = mappings[1] if optional_field_schema else None
+        if mapped_fields is not None:
+            save_mapping_template_section(
+                fingerprint,
+                mapped_fields,
+                mapped_optional_fields,
+                selected_additional_fields,
+                key_suffix,
+            )
         # For output, set selected_optional_fields to the optional mapping result
         selected_optional_fields = mapped_optional_fields
+        # Only the mapped columns are parsed when the page loads the full file
+        df.project(
+            *mapping_projection(
+                [mapped_fields, mapped_optional_fields],
+                selected_additional_fields,
+                field_dtypes,
+            )
+        )
 
     return df, mapped_fields, selected_optional_fields, selected_additional_fields
@@ -0,0 +1,119 @@
+import functools
+from types import MappingProxyType
+
+import numpy as np
+from rapidfuzz.utils import default_process
+
+from src.utils import load_schema
+
+# Field groups of a schema section that are matched against input columns
+MATCHED_GROUPS = ("required", "optional")
+
+
+class SchemaSection:
+    """
+    Target fields of one schema group, preprocessed for fuzzy matching.
+
+    Every target is matched under its own name and each of its alternate
+    names. Those names are normalized once here, so matching only has to
+    process the input columns.
+
+    Attributes:
+        targets (tuple): Target field names in schema order.
+        alternates (MappingProxyType): Alternate names for each target.
+        queries (tuple): Normalized target and alternate names.
+        owners (numpy.ndarray): Index of the target each query belongs to.
+        key (tuple): Hashable identity of the targets and their alternates.
+    """
+
+    __slots__ = ("targets", "alternates", "queries", "owners", "key")
+
+    def __init__(self, key):
+        self.key = key
+        self.targets = tuple(target for target, _ in key)
+        self.alternates = MappingProxyType(dict(key))
+        queries = []
+        owners = []
+        for i, (target, alternates) in enumerate(key):
+            for name in (target, *alternates):
+                queries.append(default_process(name))
+                owners.append(i)
+        self.queries = tuple(queries)
+        self.owners = np.asarray(owners, dtype=np.intp)
+        self.owners.setflags(write=False)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __repr__(self):
+        return f"SchemaSection({list(self.targets)!r})"
+
+
+def section_key(target_schema, alternate_schema_names=None):
+    """Hashable identity of a list of targets and their alternate names."""
+    alternate_schema_names = alternate_schema_names or {}
+    return tuple(
+        (target, tuple(alternate_schema_names.get(target, [])))
+        for target in target_schema
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_section(key):
+    return SchemaSection(key)
+
+
+def schema_section(target_schema, alternate_schema_names=None):
+    """
+    The preprocessed section for `target_schema` and its alternates.
+
+    Sections of `conf/schema.json` are compiled once by `get_schema_index`;
+    other target lists are compiled on first use and kept for later calls.
+    """
+    if isinstance(target_schema, SchemaSection):
+        return target_schema
+    return _compile_section(section_key(target_schema, alternate_schema_names))
+
+
+class SchemaIndex:
+    """
+    Preprocessed matching data for every section of the schema.
+
+    Sections are looked up by their path in the schema and the field group,
+    for example `index.section("mhap_info", "required")` or
+    `index.section("read_counts_perstage", "raw_counts", "required")`.
+
+    Attributes:
+        schema (dict): The schema as loaded from JSON. Shared by every
+            session, so it must not be modified.
+        sections (MappingProxyType): `SchemaSection` for each path and group.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        sections = {}
+        self._collect(schema, (), sections)
+        self.sections = MappingProxyType(sections)
+
+    @classmethod
+    def _collect(cls, fields, path, sections):
+        for group in MATCHED_GROUPS:
+            targets = fields.get(group)
+            if isinstance(targets, list):
+                sections[(*path, group)] = schema_section(
+                    targets, fields.get(f"{group}_alternatives")
+                )
+        alternatives = {f"{group}_alternatives" for group in MATCHED_GROUPS}
+        for name, value in fields.items():
+            if isinstance(value, dict) and name not in alternatives:
+                cls._collect(value, (*path, name), sections)
+
+    def section(self, *path):
+        """The `SchemaSection` at `path`, ending with the field group."""
+        return self.sections[path]
+
+
+@functools.cache
+def get_schema_index():
+    """The schema index, built once per process on first use."""
+    return SchemaIndex(load_schema())
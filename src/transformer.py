@@ -1,20 +1,110 @@
-from pmotools.pmo_builder.mhap_table_to_pmo import mhap_table_to_pmo
-from pmotools.pmo_builder.panel_information_to_pmo import panel_info_table_to_pmo
-from pmotools.pmo_builder.read_count_by_stage_table_to_pmo import (
-    read_count_by_stage_table_to_pmo,
-)
-from pmotools.pmo_builder.metatable_to_pmo import (
-    library_sample_info_table_to_pmo,
-    specimen_info_table_to_pmo,
-)
+import importlib
+
+import numpy as np
+
 # from pmotools.pmo_builder import demultiplexed_targets_to_pmo_dict
 
+# Module of each pmotools builder. They are imported on first use, so a page
+# only pays for importing the builders its transforms call
+BUILDER_MODULES = {
+    "mhap_table_to_pmo": "pmotools.pmo_builder.mhap_table_to_pmo",
+    "panel_info_table_to_pmo": "pmotools.pmo_builder.panel_information_to_pmo",
+    "read_count_by_stage_table_to_pmo": (
+        "pmotools.pmo_builder.read_count_by_stage_table_to_pmo"
+    ),
+    "library_sample_info_table_to_pmo": "pmotools.pmo_builder.metatable_to_pmo",
+    "specimen_info_table_to_pmo": "pmotools.pmo_builder.metatable_to_pmo",
+}
+
+
+def _builder(name):
+    """Return the pmotools builder `name`, importing it on first use."""
+    builder = globals().get(name)
+    if builder is None:
+        module = importlib.import_module(BUILDER_MODULES[name])
+        builder = globals()[name] = getattr(module, name)
+    return builder
+
+
+def __getattr__(name):
+    # Builders are also reachable as module attributes, e.g. for patching
+    if name in BUILDER_MODULES:
+        return _builder(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def mapped_columns(*mappings):
+    """
+    Input columns named by field mappings and lists of additional columns.
+
+    Mapping values may be a column, a list of columns or None for an unmapped
+    field; each column is listed once, in the order first seen.
+    """
+    columns = {}
+    for mapping in mappings:
+        if not mapping:
+            continue
+        values = mapping.values() if isinstance(mapping, dict) else mapping
+        for value in values:
+            for column in value if isinstance(value, (list, tuple)) else [value]:
+                if column is not None:
+                    columns[column] = None
+    return list(columns)
+
+
+def columns_as_objects(df, columns, numeric_columns=()):
+    """
+    Convert the columns pmotools cannot take as they are to object dtype.
+
+    pmotools groups on mapped columns such as the sample and target names
+    with observed=False, so a categorical column gives an empty entry for
+    every unused category. Every extension dtype among `columns`
+    (categoricals, Arrow strings, nullable numbers) is therefore converted.
+    pmotools also copies the values of some columns into the PMO as they
+    are, and numpy scalars such as `np.int32` cannot be serialized to JSON,
+    so numpy numeric `numeric_columns` are converted too.
+
+    Args:
+        df (pd.DataFrame): The uploaded table.
+        columns (list): Mapped column names; None, for an unmapped field, and
+            names not in `df` are skipped.
+        numeric_columns (list): Columns whose numpy numbers are copied into
+            the PMO.
+
+    Returns:
+        pd.DataFrame: `df` itself when nothing needs converting, otherwise a
+            shallow copy sharing every other column with `df`.
+    """
+    numeric_columns = set(numeric_columns)
+    convert = []
+    for column in dict.fromkeys([*columns, *numeric_columns]):
+        if column is None or column not in df.columns:
+            continue
+        dtype = df[column].dtype
+        if not isinstance(dtype, np.dtype) or (
+            column in numeric_columns and dtype.kind in "biuf"
+        ):
+            convert.append(column)
+    if not convert:
+        return df
+    df = df.copy(deep=False)
+    for column in convert:
+        df[column] = df[column].astype(object)
+    return df
+
 
 def transform_mhap_info(
     df, bioinfo_id, field_mapping, optional_mapping, additional_mhap_detected_cols=None
 ):
     """Reformat the DataFrame based on the provided field mapping."""
-    transformed_df = mhap_table_to_pmo(
+    df = columns_as_objects(
+        df,
+        mapped_columns(
+            [bioinfo_id], field_mapping, optional_mapping, additional_mhap_detected_cols
+        ),
+        [optional_mapping.get("start"), optional_mapping.get("end")],
+    )
+    transformed_df = _builder("mhap_table_to_pmo")(
         df,
         bioinfo_id,
         library_sample_name_col=field_mapping["library_sample_name"],
@@ -51,7 +141,10 @@ def transform_panel_info(
     additional_target_info_cols=None,
 ):
     """Reformat the DataFrame based on the provided field mapping."""
-    transformed_df = panel_info_table_to_pmo(
+    df = columns_as_objects(
+        df, mapped_columns(field_mapping, optional_fields, additional_target_info_cols)
+    )
+    transformed_df = _builder("panel_info_table_to_pmo")(
         df,
         panel_id,
         target_genome_info,
@@ -78,7 +171,12 @@ def transform_panel_info(
 def transform_specimen_info(
     df, field_mapping, optional_field_mapping, additional_fields=None
 ):
-    transformed_df = specimen_info_table_to_pmo(
+    df = columns_as_objects(
+        df,
+        mapped_columns(field_mapping, optional_field_mapping, additional_fields),
+        [optional_field_mapping.get("parasite_density")],
+    )
+    transformed_df = _builder("specimen_info_table_to_pmo")(
         df,
         specimen_name_col=field_mapping["specimen_name"],
         specimen_taxon_id_col=field_mapping["specimen_taxon_id"],
@@ -129,7 +227,12 @@ def transform_specimen_info(
 def transform_library_sample_info(
     df, field_mapping, optional_mapping, additional_fields=None
 ):
-    transformed_df = library_sample_info_table_to_pmo(
+    df = columns_as_objects(
+        df,
+        mapped_columns(field_mapping, optional_mapping, additional_fields),
+        [optional_mapping.get("parasite_density")],
+    )
+    transformed_df = _builder("library_sample_info_table_to_pmo")(
         df,
         library_sample_name_col=field_mapping["library_sample_name"],
         sequencing_info_name_col=field_mapping["sequencing_info_name"],
@@ -161,7 +264,23 @@ def transform_read_counts_per_stage(
     raw_counts_selected_additional_fields=None,
     reads_by_stage_selected_additional_fields=None,
 ):
-    transformed_df = read_count_by_stage_table_to_pmo(
+    raw_counts_df = columns_as_objects(
+        raw_counts_df,
+        mapped_columns(
+            [bioinfo_run_name],
+            raw_counts_field_mapping,
+            raw_counts_selected_additional_fields,
+        ),
+    )
+    reads_by_stage_df = columns_as_objects(
+        reads_by_stage_df,
+        mapped_columns(
+            [bioinfo_run_name],
+            reads_by_stage_field_mapping,
+            reads_by_stage_selected_additional_fields,
+        ),
+    )
+    transformed_df = _builder("read_count_by_stage_table_to_pmo")(
         bioinformatics_run_name=bioinfo_run_name,
         total_raw_count_table=raw_counts_df,
         reads_by_stage_table=reads_by_stage_df,
@@ -1,4 +1,8 @@
 import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
 
 
 def save_to_csv(df, output_path):
@@ -12,3 +16,99 @@ def load_schema():
     with open("conf/schema.json", "r") as file:
         schema_fields = json.load(file)
     return schema_fields
+
+
+def remove_file(path):
+    """Delete a file, ignoring one that is already gone."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_atomically(path, write):
+    """
+    Write a file under a temporary name in its directory, then move it into
+    place, so readers never see a partial file.
+
+    Args:
+        path (str): Where the file is written; its directory is created.
+        write (callable): Writes the contents to the temporary path it is
+            given.
+
+    Raises:
+        Whatever `write` or the file system raises; the temporary file is
+        removed first.
+    """
+    directory = os.path.dirname(os.fspath(path)) or "."
+    os.makedirs(directory, exist_ok=True)
+    handle, temporary_path = tempfile.mkstemp(suffix=".tmp", dir=directory)
+    os.close(handle)
+    try:
+        write(temporary_path)
+        os.replace(temporary_path, path)
+    except BaseException:
+        remove_file(temporary_path)
+        raise
+
+
+class LRUCache:
+    """
+    Thread-safe least recently used cache, shared by the sessions of a process.
+
+    Streamlit reruns the page script on every widget interaction, so results
+    kept here are computed once rather than on every click. Entries are
+    evicted least recently used first once their total weight, given by
+    `weigh` (1 per entry by default), exceeds `max_weight`; an entry heavier
+    than `max_weight` is not cached.
+    """
+
+    def __init__(self, max_weight, weigh=None):
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def weight(self):
+        """Total weight of the cached entries."""
+        return self._weight
+
+    def get(self, key):
+        """Return the value cached under `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry[0]
+
+    def put(self, key, value):
+        """Cache `value` under `key`, evicting the least recently used."""
+        weight = self.weigh(value) if self.weigh else 1
+        with self._lock:
+            if key in self._entries:
+                self._weight -= self._entries.pop(key)[1]
+            if weight > self.max_weight:
+                return
+            self._entries[key] = (value, weight)
+            self._weight += weight
+            while self._weight > self.max_weight:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._weight -= evicted
+
+    def clear(self):
+        """Drop every entry and reset the hit and miss counts."""
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+            self.hits = 0
+            self.misses = 0
@@ -1,12 +1,49 @@
 """
 Unit tests for data_loader.py
 """
+import bz2
+import functools
+import gzip
+import importlib.util
+import io
+import lzma
+import os
+
+import openpyxl
 import pytest
 import pandas as pd
-import io
 from unittest.mock import patch, MagicMock
 
-from data_loader import load_csv
+import data_loader
+from data_loader import (
+    _byte_ranges,
+    COMPRESSED_FILE_TYPES,
+    ExcelParquetCache,
+    ParseCache,
+    SpilledUpload,
+    UploadedTable,
+    UploadedTables,
+    compact_columns,
+    content_hash,
+    data_roots,
+    iter_csv_chunks,
+    list_excel_sheets,
+    load_csv,
+    load_list_or_table,
+    memory_report,
+    probe_file,
+    resolve_data_paths,
+    sniff_dialect,
+    upload_size,
+)
+
+
+@pytest.fixture(autouse=True)
+def excel_cache(tmp_path):
+    """Keep the Parquet copies of Excel sheets made by each test in tmp_path."""
+    cache = ExcelParquetCache(tmp_path / "excel_cache")
+    with patch("data_loader.EXCEL_CACHE", cache):
+        yield cache
 
 
 class TestLoadCSV:
@@ -29,12 +66,15 @@ class TestLoadCSV:
             result = load_csv(mock_file)
 
             assert isinstance(result, pd.DataFrame)
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep=",", quotechar='"', engine="c"
+            )
 
     def test_load_tsv_file(self):
         """Test loading a TSV file successfully."""
         mock_file = MagicMock()
         mock_file.name = "test.tsv"
+        mock_file.read.return_value = b"col1\tcol2\nvalue1\tvalue2"
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_df = pd.DataFrame({"col1": ["value1"], "col2": ["value2"]})
@@ -43,12 +83,15 @@ class TestLoadCSV:
             result = load_csv(mock_file)
 
             assert isinstance(result, pd.DataFrame)
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep="\t", quotechar='"', engine="c"
+            )
 
     def test_load_txt_file(self):
         """Test loading a TXT file successfully."""
         mock_file = MagicMock()
         mock_file.name = "test.txt"
+        mock_file.read.return_value = b"col1,col2\nvalue1,value2"
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_df = pd.DataFrame({"col1": ["value1"], "col2": ["value2"]})
@@ -57,21 +100,22 @@ class TestLoadCSV:
             result = load_csv(mock_file)
 
             assert isinstance(result, pd.DataFrame)
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep=",", quotechar='"', engine="c"
+            )
 
     def test_load_xlsx_file(self):
         """Test loading an Excel file successfully."""
-        mock_file = MagicMock()
-        mock_file.name = "test.xlsx"
-
-        with patch("data_loader.pd.read_excel") as mock_read_excel:
-            mock_df = pd.DataFrame({"col1": ["value1"], "col2": ["value2"]})
-            mock_read_excel.return_value = mock_df
+        buffer = io.BytesIO()
+        pd.DataFrame({"col1": ["value1"], "col2": ["value2"]}).to_excel(
+            buffer, index=False
+        )
+        buffer.name = "test.xlsx"
 
-            result = load_csv(mock_file)
+        result = load_csv(buffer)
 
-            assert isinstance(result, pd.DataFrame)
-            mock_read_excel.assert_called_once_with(mock_file)
+        assert isinstance(result, pd.DataFrame)
+        assert result.to_dict("records") == [{"col1": "value1", "col2": "value2"}]
 
     def test_load_xls_file(self):
         """Test loading an old Excel file successfully."""
@@ -102,6 +146,7 @@ class TestLoadCSV:
         """Test error handling when CSV reading fails."""
         mock_file = MagicMock()
         mock_file.name = "test.csv"
+        mock_file.read.return_value = b"col1,col2\nvalue1,value2"
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_read_csv.side_effect = Exception("File not found")
@@ -117,8 +162,8 @@ class TestLoadCSV:
         mock_file = MagicMock()
         mock_file.name = "test.xlsx"
 
-        with patch("data_loader.pd.read_excel") as mock_read_excel:
-            mock_read_excel.side_effect = Exception("Invalid Excel file")
+        with patch("data_loader.openpyxl.load_workbook") as mock_load_workbook:
+            mock_load_workbook.side_effect = Exception("Invalid Excel file")
 
             with pytest.raises(ValueError) as exc_info:
                 load_csv(mock_file)
@@ -130,6 +175,9 @@ class TestLoadCSV:
         """Test automatic detection of comma-separated values."""
         mock_file = MagicMock()
         mock_file.name = "test.csv"
+        mock_file.read.return_value = (
+            b"col1,col2,col3\nvalue1,value2,value3\nvalue4,value5,value6"
+        )
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_df = pd.DataFrame(
@@ -144,12 +192,17 @@ class TestLoadCSV:
             result = load_csv(mock_file)
 
             assert isinstance(result, pd.DataFrame)
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep=",", quotechar='"', engine="c"
+            )
 
     def test_autodetect_tab_separator(self):
         """Test automatic detection of tab-separated values."""
         mock_file = MagicMock()
         mock_file.name = "test.tsv"
+        mock_file.read.return_value = (
+            b"col1\tcol2\tcol3\nvalue1\tvalue2\tvalue3\nvalue4\tvalue5\tvalue6"
+        )
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_df = pd.DataFrame(
@@ -164,12 +217,17 @@ class TestLoadCSV:
             result = load_csv(mock_file)
 
             assert isinstance(result, pd.DataFrame)
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep="\t", quotechar='"', engine="c"
+            )
 
     def test_autodetect_semicolon_separator(self):
         """Test automatic detection of semicolon-separated values."""
         mock_file = MagicMock()
         mock_file.name = "test.csv"
+        mock_file.read.return_value = (
+            b"col1;col2;col3\nvalue1;value2;value3\nvalue4;value5;value6"
+        )
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_df = pd.DataFrame(
@@ -184,12 +242,17 @@ class TestLoadCSV:
             result = load_csv(mock_file)
 
             assert isinstance(result, pd.DataFrame)
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep=";", quotechar='"', engine="c"
+            )
 
     def test_autodetect_pipe_separator(self):
         """Test automatic detection of pipe-separated values."""
         mock_file = MagicMock()
         mock_file.name = "test.txt"
+        mock_file.read.return_value = (
+            b"col1|col2|col3\nvalue1|value2|value3\nvalue4|value5|value6"
+        )
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_df = pd.DataFrame(
@@ -204,12 +267,15 @@ class TestLoadCSV:
             result = load_csv(mock_file)
 
             assert isinstance(result, pd.DataFrame)
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep="|", quotechar='"', engine="c"
+            )
 
     def test_single_column_file(self):
         """Test handling of single-column files."""
         mock_file = MagicMock()
         mock_file.name = "contributors.txt"
+        mock_file.read.return_value = b"contributor\nkathryn\nmax\nnick"
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_df = pd.DataFrame({"contributor": ["kathryn", "max", "nick"]})
@@ -218,12 +284,15 @@ class TestLoadCSV:
             result = load_csv(mock_file)
 
             assert isinstance(result, pd.DataFrame)
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep=",", quotechar='"', engine="c"
+            )
 
     def test_empty_file(self):
         """Test handling of empty files."""
         mock_file = MagicMock()
         mock_file.name = "empty.csv"
+        mock_file.read.return_value = b""
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_df = pd.DataFrame()
@@ -233,12 +302,15 @@ class TestLoadCSV:
 
             assert isinstance(result, pd.DataFrame)
             assert result.empty
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep=",", quotechar='"', engine="c"
+            )
 
     def test_malformed_separator_detection_error(self):
         """Test error handling when separator detection fails."""
         mock_file = MagicMock()
         mock_file.name = "malformed.csv"
+        mock_file.read.return_value = b"col1,col2\nvalue1"
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_read_csv.side_effect = pd.errors.ParserError(
@@ -255,6 +327,7 @@ class TestLoadCSV:
         """Test handling of files with inconsistent separators."""
         mock_file = MagicMock()
         mock_file.name = "mixed.csv"
+        mock_file.read.return_value = b"col1,col2\nvalue1,value2\nvalue3;value4"
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             # Pandas should still handle this gracefully by picking the most common separator
@@ -264,12 +337,15 @@ class TestLoadCSV:
             result = load_csv(mock_file)
 
             assert isinstance(result, pd.DataFrame)
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep=",", quotechar='"', engine="c"
+            )
 
     def test_file_with_quotes_and_commas(self):
         """Test handling of CSV files with quoted fields containing commas."""
         mock_file = MagicMock()
         mock_file.name = "quoted.csv"
+        mock_file.read.return_value = b'name,description\n"John Doe","A person, who likes commas"\n"Jane Smith","Another person"'
 
         with patch("data_loader.pd.read_csv") as mock_read_csv:
             mock_df = pd.DataFrame(
@@ -283,7 +359,9 @@ class TestLoadCSV:
             result = load_csv(mock_file)
 
             assert isinstance(result, pd.DataFrame)
-            mock_read_csv.assert_called_once_with(mock_file, sep=None, engine="python")
+            mock_read_csv.assert_called_once_with(
+                mock_file, sep=",", quotechar='"', engine="c"
+            )
 
 
 class TestLoadCSVIntegration:
@@ -503,3 +581,1155 @@ class TestLoadCSVIntegration:
             # If it correctly detects as single column
             assert result.shape == (4, 1)
             assert result.iloc[0].iloc[0] == "kathryn"
+
+
+class TestSniffDialect:
+    """Test cases for sniff_dialect function."""
+
+    def test_detects_tab_delimiter(self):
+        """Test that a tab-separated sample is detected."""
+        file_obj = io.BytesIO(b"name\tage\nJohn\t25\nJane\t30")
+
+        assert sniff_dialect(file_obj)["delimiter"] == "\t"
+        assert file_obj.tell() == 0  # File is rewound after sniffing
+
+    def test_single_column_falls_back_to_comma(self):
+        """Test that a single column of values is not split on a letter."""
+        file_obj = io.StringIO("contributor\nkathryn\nmax\nnick")
+
+        assert sniff_dialect(file_obj)["delimiter"] == ","
+
+    def test_only_sample_is_read(self):
+        """Test that only the first sample_size bytes are inspected."""
+        rows = "".join(f"{i};{i * 2}\n" for i in range(10000))
+        file_obj = MagicMock()
+        file_obj.read.return_value = ("a;b\n" + rows)[:100].encode()
+
+        dialect = sniff_dialect(file_obj, sample_size=100)
+
+        file_obj.read.assert_called_once_with(100)
+        assert dialect["delimiter"] == ";"
+
+    def test_load_info_attached(self):
+        """Test that load_csv exposes the dialect and timings to callers."""
+        file_obj = io.StringIO("name|age\nJohn|25\nJane|30")
+        file_obj.name = "test.txt"
+
+        result = load_csv(file_obj)
+
+        load_info = result.attrs["load_info"]
+        assert load_info["delimiter"] == "|"
+        assert load_info["engine"] == "c"
+        assert load_info["sniff_seconds"] >= 0
+        assert load_info["parse_seconds"] >= 0
+
+
+class TestIterCSVChunks:
+    """Test cases for iter_csv_chunks function."""
+
+    def test_chunks_are_bounded(self):
+        """Test that a delimited file is yielded in bounded chunks."""
+        rows = "\n".join(f"S{i}\tT{i % 3}\t{i}" for i in range(10))
+        file_obj = io.StringIO("sample\ttarget\treads\n" + rows)
+        file_obj.name = "alleles.tsv"
+
+        chunks = list(iter_csv_chunks(file_obj, rows_per_chunk=4))
+
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+        assert all(
+            list(chunk.columns) == ["sample", "target", "reads"] for chunk in chunks
+        )
+        combined = pd.concat(chunks, ignore_index=True)
+        assert combined["reads"].tolist() == list(range(10))
+
+    def test_excel_file_is_streamed(self):
+        """Test that rows of an xlsx sheet are yielded in chunks."""
+        buffer = io.BytesIO()
+        pd.DataFrame({"col1": range(5)}).to_excel(buffer, index=False)
+        buffer.name = "test.xlsx"
+
+        chunks = list(iter_csv_chunks(buffer, rows_per_chunk=2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert pd.concat(chunks)["col1"].tolist() == list(range(5))
+
+    def test_xls_file_is_sliced(self):
+        """Test that legacy Excel sheets are yielded in slices."""
+        mock_file = MagicMock()
+        mock_file.name = "test.xls"
+
+        with patch("data_loader.pd.read_excel") as mock_read_excel:
+            mock_read_excel.return_value = pd.DataFrame({"col1": range(5)})
+
+            chunks = list(iter_csv_chunks(mock_file, rows_per_chunk=2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+    def test_invalid_chunk_size(self):
+        """Test that a non-positive chunk size is rejected."""
+        file_obj = io.StringIO("a,b\n1,2")
+        file_obj.name = "test.csv"
+
+        with pytest.raises(ValueError):
+            list(iter_csv_chunks(file_obj, rows_per_chunk=0))
+
+    def test_unsupported_file_format(self):
+        """Test error handling for unsupported file format."""
+        mock_file = MagicMock()
+        mock_file.name = "test.pdf"
+
+        with pytest.raises(ValueError) as exc_info:
+            list(iter_csv_chunks(mock_file))
+
+        assert "Unsupported file format" in str(exc_info.value)
+
+
+class TestExcelSheets:
+    """Test cases for reading a chosen sheet of an Excel workbook."""
+
+    @staticmethod
+    def _workbook():
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer) as writer:
+            pd.DataFrame({"readme": ["notes"]}).to_excel(
+                writer, sheet_name="About", index=False
+            )
+            pd.DataFrame(
+                {
+                    "specimen": [f"S{i}" for i in range(6)],
+                    "country": ["Ghana"] * 6,
+                    "reads": range(6),
+                }
+            ).to_excel(writer, sheet_name="Specimens", index=False)
+        buffer.name = "metadata.xlsx"
+        return buffer
+
+    def test_list_sheets(self):
+        """Test that sheet names are listed in workbook order."""
+        assert list_excel_sheets(self._workbook()) == ["About", "Specimens"]
+
+    def test_list_sheets_invalid_file(self):
+        """Test error handling for a file that is not a workbook."""
+        buffer = io.BytesIO(b"not a workbook")
+        buffer.name = "broken.xlsx"
+
+        with pytest.raises(ValueError) as exc_info:
+            list_excel_sheets(buffer)
+
+        assert "Failed to read Excel file" in str(exc_info.value)
+
+    def test_first_sheet_by_default(self):
+        """Test that the first sheet is read when none is chosen."""
+        result = load_csv(self._workbook())
+
+        assert list(result.columns) == ["readme"]
+
+    def test_selected_sheet(self):
+        """Test reading a chosen sheet with projected columns and dtypes."""
+        result = load_csv(
+            self._workbook(),
+            usecols=["specimen", "reads"],
+            dtype={"reads": "int32"},
+            sheet_name="Specimens",
+        )
+
+        assert list(result.columns) == ["specimen", "reads"]
+        assert result["reads"].dtype == "int32"
+        assert result.attrs["load_info"]["sheet_name"] == "Specimens"
+
+    def test_probe_selected_sheet(self):
+        """Test that an UploadedTable previews and loads the chosen sheet."""
+        table = UploadedTable(self._workbook(), n_rows=2, sheet_name="Specimens")
+
+        assert table.columns.tolist() == ["specimen", "country", "reads"]
+        assert len(table.preview) == 2
+        assert len(table.load()) == 6
+
+    def test_header_and_blank_rows(self):
+        """Test unnamed and duplicate headers, and that blank rows are skipped."""
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["id", None, "id", "reads"])
+        sheet.append(["S1", "x", "a", 1])
+        sheet.append([None, None, None, None])
+        sheet.append(["S2", "y", "b", 2])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        buffer.name = "sheet.xlsx"
+
+        result = load_csv(buffer)
+
+        assert list(result.columns) == ["id", "Unnamed: 1", "id.1", "reads"]
+        assert result["id"].tolist() == ["S1", "S2"]
+
+    @staticmethod
+    def _sheet(rows):
+        workbook = openpyxl.Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        buffer.name = "sheet.xlsx"
+        return buffer
+
+    @pytest.mark.parametrize(
+        "rows",
+        [
+            # Values under a blank header cell and past the end of the header
+            [["id", None, "reads"], ["S1", "x", 1], ["S2", None, 2, None, "late"]],
+            # Duplicates that collide with a name already in the header
+            [["a", "a", "a.1", "a"], [1, 2, 3, 4], [5, 6, 7, 8]],
+        ],
+    )
+    def test_header_matches_read_excel(self, rows):
+        """Test that columns are kept and named as pandas.read_excel does."""
+        result = load_csv(self._sheet(rows))
+        expected = pd.read_excel(self._sheet(rows))
+
+        def cells(df):
+            return df.astype(object).where(df.notna(), None).values.tolist()
+
+        assert list(result.columns) == list(expected.columns)
+        assert cells(result) == cells(expected)
+
+
+class TestProbeFile:
+    """Test cases for probe_file and UploadedTable."""
+
+    def test_probe_reads_header_and_sample(self):
+        """Test that only the requested number of rows is parsed."""
+        rows = "\n".join(f"S{i},T{i},{i}" for i in range(1000))
+        file_obj = io.StringIO("sample,target,reads\n" + rows)
+        file_obj.name = "alleles.csv"
+
+        result = probe_file(file_obj, n_rows=5)
+
+        assert list(result.columns) == ["sample", "target", "reads"]
+        assert len(result) == 5
+
+    def test_probe_excel_file(self):
+        """Test probing the first rows of an Excel sheet."""
+        buffer = io.BytesIO()
+        pd.DataFrame({"specimen": [f"S{i}" for i in range(20)]}).to_excel(
+            buffer, index=False
+        )
+        buffer.name = "metadata.xlsx"
+
+        result = probe_file(buffer, n_rows=3)
+
+        assert list(result.columns) == ["specimen"]
+        assert result["specimen"].tolist() == ["S0", "S1", "S2"]
+
+    def test_uploaded_table_defers_full_parse(self):
+        """Test that the full parse only happens when load is called."""
+        file_obj = io.StringIO("a,b\n1,2\n3,4\n5,6")
+        file_obj.name = "test.csv"
+
+        table = UploadedTable(file_obj, n_rows=1)
+
+        assert table.columns.tolist() == ["a", "b"]
+        assert not table.empty
+        with patch("data_loader.load_csv", wraps=load_csv) as mock_load_csv:
+            first = table.load()
+            second = table.load()
+
+        mock_load_csv.assert_called_once()
+        assert first is second
+        assert first.shape == (3, 2)
+
+
+class TestProjectedLoad:
+    """Test cases for parsing only the mapped columns."""
+
+    def test_usecols_and_dtype(self):
+        """Test that only requested columns are parsed, with their dtypes."""
+        file_obj = io.StringIO("sample,target,reads,notes\nS1,T1,10,a\nS2,T1,20,b")
+        file_obj.name = "alleles.csv"
+
+        result = load_csv(
+            file_obj,
+            usecols=["target", "reads"],
+            dtype={"target": "category", "reads": "int32"},
+        )
+
+        assert list(result.columns) == ["target", "reads"]
+        assert isinstance(result["target"].dtype, pd.CategoricalDtype)
+        assert result["reads"].dtype == "int32"
+
+    def test_dtype_that_does_not_fit_is_ignored(self):
+        """Test that a column with missing values keeps its inferred dtype."""
+        file_obj = io.StringIO("target,reads\nT1,10\nT2,\nT3,30")
+        file_obj.name = "alleles.csv"
+
+        result = load_csv(file_obj, dtype={"target": "category", "reads": "int32"})
+
+        assert isinstance(result["target"].dtype, pd.CategoricalDtype)
+        assert result["reads"].dtype == "float64"
+        assert pd.isna(result["reads"].iloc[1])
+
+    def test_uploaded_table_projection(self):
+        """Test that UploadedTable.load applies the projection and extra columns."""
+        file_obj = io.StringIO("run,sample,reads,notes\nR1,S1,10,a\nR1,S2,20,b")
+        file_obj.name = "alleles.csv"
+        table = UploadedTable(file_obj)
+
+        table.project(["reads", "sample"], {"reads": "int32", "unused": "int32"})
+
+        assert table.dtypes == {"reads": "int32"}
+        assert list(table.load().columns) == ["sample", "reads"]
+        with_run = table.load(extra_columns=["run", "not_a_column"])
+        assert list(with_run.columns) == ["run", "sample", "reads"]
+
+
+class TestCompressedInput:
+    """Test cases for compressed delimited files."""
+
+    TSV_CONTENT = b"sample\ttarget\treads\nS1\tT1\t10\nS2\tT2\t20\n"
+
+    @pytest.mark.parametrize(
+        "extension, compress",
+        [
+            (".gz", gzip.compress),
+            (".bz2", bz2.compress),
+            (".xz", lzma.compress),
+        ],
+    )
+    def test_load_compressed_tsv(self, extension, compress):
+        """Test that compressed files are decompressed and sniffed."""
+        file_obj = io.BytesIO(compress(self.TSV_CONTENT))
+        file_obj.name = "alleles.tsv" + extension
+
+        result = load_csv(file_obj)
+
+        assert list(result.columns) == ["sample", "target", "reads"]
+        assert result["reads"].tolist() == [10, 20]
+        assert result.attrs["load_info"]["delimiter"] == "\t"
+
+    def test_load_zstd_tsv(self):
+        """Test that zstd-compressed files are read when zstandard is installed."""
+        zstandard = pytest.importorskip("zstandard")
+        file_obj = io.BytesIO(zstandard.ZstdCompressor().compress(self.TSV_CONTENT))
+        file_obj.name = "alleles.tsv.zst"
+
+        result = load_csv(file_obj)
+
+        assert result.shape == (2, 3)
+
+    def test_zstd_rejected_without_zstandard(self):
+        """Test that .zst uploads are not accepted when zstandard is missing."""
+        if importlib.util.find_spec("zstandard") is not None:
+            pytest.skip("zstandard is installed")
+        file_obj = io.BytesIO(b"compressed")
+        file_obj.name = "alleles.tsv.zst"
+
+        assert "zst" not in COMPRESSED_FILE_TYPES
+        with pytest.raises(ValueError, match="Unsupported file format"):
+            load_csv(file_obj)
+
+    def test_probe_and_chunks_compressed(self):
+        """Test that probing and chunking also read compressed files."""
+        file_obj = io.BytesIO(gzip.compress(self.TSV_CONTENT))
+        file_obj.name = "alleles.csv.gz"
+
+        assert len(probe_file(file_obj, n_rows=1)) == 1
+        chunks = list(iter_csv_chunks(file_obj, rows_per_chunk=1))
+        assert [len(chunk) for chunk in chunks] == [1, 1]
+
+    def test_compressed_excel_unsupported(self):
+        """Test that compressed Excel workbooks are rejected."""
+        file_obj = io.BytesIO(gzip.compress(b"not a workbook"))
+        file_obj.name = "metadata.xlsx.gz"
+
+        with pytest.raises(ValueError) as exc_info:
+            load_csv(file_obj)
+
+        assert "Unsupported file format" in str(exc_info.value)
+
+
+class TestColumnarInput:
+    """Test cases for Parquet, Feather and Arrow IPC files."""
+
+    @staticmethod
+    def _table():
+        return pd.DataFrame(
+            {
+                "sample": [f"S{i}" for i in range(10)],
+                "target": ["T1", "T2"] * 5,
+                "reads": list(range(10)),
+            }
+        )
+
+    @staticmethod
+    def _write(df, path):
+        if path.suffix in (".parquet", ".pq"):
+            df.to_parquet(path)
+        else:
+            df.to_feather(path)
+
+    @pytest.mark.parametrize("extension", [".parquet", ".feather", ".arrow"])
+    def test_load_uploaded_columnar_file(self, tmp_path, extension):
+        """Test reading a columnar file from an in-memory upload."""
+        path = tmp_path / f"alleles{extension}"
+        self._write(self._table(), path)
+        file_obj = io.BytesIO(path.read_bytes())
+        file_obj.name = path.name
+
+        result = load_csv(file_obj)
+
+        pd.testing.assert_frame_equal(result, self._table())
+
+    @pytest.mark.parametrize("extension", [".parquet", ".feather"])
+    def test_load_columnar_path(self, tmp_path, extension):
+        """Test reading a server-side path with a projection and dtypes."""
+        path = tmp_path / f"alleles{extension}"
+        self._write(self._table(), path)
+
+        result = load_csv(
+            str(path),
+            usecols=["target", "reads"],
+            dtype={"target": "category", "reads": "int32"},
+        )
+
+        assert list(result.columns) == ["target", "reads"]
+        assert isinstance(result["target"].dtype, pd.CategoricalDtype)
+        assert result["reads"].dtype == "int32"
+
+    @pytest.mark.parametrize("extension", [".parquet", ".feather"])
+    def test_probe_and_chunks(self, tmp_path, extension):
+        """Test probing and chunking columnar files."""
+        path = tmp_path / f"alleles{extension}"
+        self._write(self._table(), path)
+
+        assert len(probe_file(path, n_rows=3)) == 3
+        chunks = list(iter_csv_chunks(path, rows_per_chunk=4))
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+
+    def test_load_delimited_path(self, tmp_path):
+        """Test reading a delimited file from a server-side path."""
+        path = tmp_path / "alleles.tsv"
+        self._table().to_csv(path, sep="\t", index=False)
+
+        result = load_csv(path)
+
+        pd.testing.assert_frame_equal(result, self._table())
+        assert result.attrs["load_info"]["delimiter"] == "\t"
+
+
+class TestParseCache:
+    """Test cases for ParseCache and content_hash."""
+
+    def test_content_hash_matches_equal_bytes(self):
+        """Test that equal contents hash equally, whatever the file object."""
+        first = io.BytesIO(b"a,b\n1,2\n")
+        second = io.BytesIO(b"a,b\n1,2\n")
+        other = io.BytesIO(b"a,b\n1,3\n")
+
+        assert content_hash(first) == content_hash(second)
+        assert content_hash(first) != content_hash(other)
+        assert first.tell() == 0
+
+    def test_upload_is_hashed_once(self):
+        """Test that reruns reuse the hash of a Streamlit upload."""
+        upload = io.BytesIO(b"a,b\n1,2\n")
+        upload.file_id = "upload-1"
+        upload.size = len(upload.getvalue())
+
+        with patch(
+            "data_loader._hash_contents", wraps=data_loader._hash_contents
+        ) as mock_hash:
+            first = content_hash(upload)
+            second = content_hash(upload)
+
+        assert first == second == content_hash(io.BytesIO(b"a,b\n1,2\n"))
+        mock_hash.assert_called_once()
+
+    def test_changed_path_is_hashed_again(self, tmp_path):
+        """Test that a server-side file is hashed again once it changes."""
+        path = tmp_path / "table.csv"
+        path.write_bytes(b"a,b\n1,2\n")
+        first = content_hash(path)
+        path.write_bytes(b"a,b\n1,2\n3,4\n")
+
+        assert content_hash(path) != first
+        assert content_hash(path) == content_hash(io.BytesIO(path.read_bytes()))
+
+    def test_hits_and_misses(self):
+        """Test that lookups are counted as hits or misses."""
+        cache = ParseCache()
+        df = pd.DataFrame({"a": [1, 2]})
+
+        assert cache.get("key") is None
+        cache.put("key", df)
+        pd.testing.assert_frame_equal(cache.get("key"), df)
+
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the memory cap evicts the least recently used table."""
+        df = pd.DataFrame({"a": range(100)})
+        nbytes = int(df.memory_usage(deep=True).sum())
+        cache = ParseCache(max_bytes=2 * nbytes)
+
+        cache.put("first", df)
+        cache.put("second", df)
+        cache.get("first")
+        cache.put("third", df)
+
+        assert len(cache) == 2
+        assert cache.nbytes == 2 * nbytes
+        assert cache.get("second") is None
+        assert cache.get("first") is not None
+
+    def test_oversized_table_is_not_cached(self):
+        """Test that a table larger than the cap is not cached."""
+        cache = ParseCache(max_bytes=10)
+
+        cache.put("key", pd.DataFrame({"a": range(100)}))
+
+        assert len(cache) == 0
+        assert cache.nbytes == 0
+
+    def test_cached_table_is_not_modified_by_callers(self):
+        """Test that adding a column to a returned table leaves the cache as is."""
+        cache = ParseCache()
+        cache.put("key", pd.DataFrame({"a": [1, 2]}))
+
+        df = cache.get("key")
+        df["b"] = [3, 4]
+
+        assert list(cache.get("key").columns) == ["a"]
+
+    def test_reruns_reuse_parses(self):
+        """Test that a new UploadedTable for the same upload is served from cache."""
+        cache = ParseCache()
+
+        def upload():
+            file_obj = io.BytesIO(b"sample,reads\nS1,1\nS2,2\n")
+            file_obj.name = "reads.csv"
+            return file_obj
+
+        with patch("data_loader.load_csv", wraps=load_csv) as mock_load_csv:
+            for _ in range(3):
+                table = UploadedTable(upload(), cache=cache)
+                table.project(["reads"], {"reads": "int32"})
+                result = table.load()
+
+        mock_load_csv.assert_called_once()
+        assert result["reads"].dtype == "int32"
+        assert cache.stats()["hits"] == 4
+        assert cache.stats()["misses"] == 2
+
+    def test_parse_options_are_part_of_the_key(self):
+        """Test that a different projection is parsed again."""
+        cache = ParseCache()
+        file_obj = io.BytesIO(b"sample,reads\nS1,1\n")
+        file_obj.name = "reads.csv"
+        table = UploadedTable(file_obj, cache=cache)
+
+        table.project(["sample"])
+        assert list(table.load().columns) == ["sample"]
+        table.project(["sample", "reads"])
+        assert list(table.load().columns) == ["sample", "reads"]
+
+        assert cache.stats()["misses"] == 3
+
+
+class TestCompactColumns:
+    """Test cases for compact_columns and memory_report."""
+
+    @staticmethod
+    def _table():
+        return pd.DataFrame(
+            {
+                "sample": ["S1", "S2"] * 50,
+                "allele": [f"ACGT{i}" for i in range(100)],
+                "reads": range(100),
+                "mixed": ["a", 1] * 50,
+            }
+        )
+
+    def test_low_cardinality_columns_become_categorical(self):
+        """Test that only repetitive string columns are made categorical."""
+        result = compact_columns(self._table())
+
+        assert result["sample"].dtype == "category"
+        assert result["allele"].dtype == object
+        assert result["reads"].dtype == "int64"
+        assert result["mixed"].dtype == object
+
+    def test_arrow_strings(self):
+        """Test that every string column can be stored as Arrow strings."""
+        result = compact_columns(self._table(), string_dtype="string[pyarrow]")
+
+        assert result["sample"].dtype == "string[pyarrow]"
+        assert result["allele"].dtype == "string[pyarrow]"
+        assert result["sample"].tolist() == ["S1", "S2"] * 50
+
+    def test_invalid_dtype(self):
+        """Test that an unknown compact dtype is rejected."""
+        with pytest.raises(ValueError) as exc_info:
+            compact_columns(self._table(), string_dtype="int8")
+
+        assert "Unsupported string dtype" in str(exc_info.value)
+
+    def test_memory_report(self):
+        """Test that memory before and after compaction is reported per column."""
+        report = memory_report(compact_columns(self._table()))
+
+        assert report["Column"].tolist() == ["sample", "allele", "reads", "mixed"]
+        sample = report.set_index("Column").loc["sample"]
+        assert sample["dtype"] == "category"
+        assert sample["After (KB)"] < sample["Before (KB)"]
+
+    def test_memory_report_without_compaction(self):
+        """Test that tables that were not compacted have no report."""
+        assert memory_report(self._table()) is None
+
+    def test_compact_on_load(self):
+        """Test that UploadedTable compacts both the preview and the full parse."""
+        rows = "".join(f"S{i % 3},T{i},{i}\n" for i in range(30))
+        file_obj = io.BytesIO(("sample,target,reads\n" + rows).encode())
+        file_obj.name = "reads.csv"
+
+        table = UploadedTable(file_obj, n_rows=10, cache=None, compact="category")
+
+        assert table.preview["sample"].dtype == "category"
+        assert "memory_usage" in table.preview.attrs
+        assert table.load()["sample"].dtype == "category"
+        assert table.load()["target"].dtype == object
+
+
+class TestLoadListOrTable:
+    """Test cases for load_list_or_table."""
+
+    HEADER_NAMES = {"name", "contributors"}
+
+    def test_list_without_header(self, make_upload):
+        """Test that every line of a headerless list is a value."""
+        result = load_list_or_table(
+            make_upload("Alice\nBob Smith\n\nCarol\n", "contributors.txt"),
+            header_names=self.HEADER_NAMES,
+            list_column="contributor",
+        )
+
+        assert list(result.columns) == ["contributor"]
+        assert result["contributor"].tolist() == ["Alice", "Bob Smith", "Carol"]
+
+    def test_list_with_header(self, make_upload):
+        """Test that a header line is recognised and not kept as a value."""
+        result = load_list_or_table(
+            make_upload(
+                "Name\nAlice\nSmith, Bob\nCarol\nDan\nEve\n", "contributors.txt"
+            ),
+            header_names=self.HEADER_NAMES,
+        )
+
+        assert list(result.columns) == ["Name"]
+        assert result["Name"].tolist() == ["Alice", "Smith, Bob", "Carol", "Dan", "Eve"]
+
+    def test_table(self, make_upload):
+        """Test that a delimited table is parsed with its sniffed delimiter."""
+        with patch("data_loader.sniff_dialect") as mock_sniff_dialect:
+            result = load_list_or_table(
+                make_upload("name\taffiliation\nAlice\tEPPIcenter\n", "c.tsv"),
+                header_names=self.HEADER_NAMES,
+            )
+
+        mock_sniff_dialect.assert_not_called()
+        assert list(result.columns) == ["name", "affiliation"]
+        assert result.attrs["load_info"]["delimiter"] == "\t"
+
+    def test_empty_file(self, make_upload):
+        """Test that an empty upload gives an empty table."""
+        assert load_list_or_table(make_upload("\n\n", "contributors.txt")).empty
+
+    def test_excel_is_a_table(self):
+        """Test that Excel files are read as tables."""
+        buffer = io.BytesIO()
+        pd.DataFrame({"people": ["Alice", "Bob"]}).to_excel(buffer, index=False)
+        buffer.name = "contributors.xlsx"
+
+        result = load_list_or_table(buffer, header_names=self.HEADER_NAMES)
+
+        assert result["people"].tolist() == ["Alice", "Bob"]
+
+
+class TestUploadedTables:
+    """Test cases for UploadedTables."""
+
+    @staticmethod
+    def _run_files(make_upload):
+        return [
+            make_upload("sample,target,reads\nS1,T1,1\nS2,T1,2\n", "run1.csv"),
+            make_upload("reads\ttarget\tsample\n3\tT2\tS3\n", "run2.tsv"),
+        ]
+
+    def test_files_are_concatenated(self, make_upload):
+        """Test that the parts are combined in upload order with the first file's columns."""
+        tables = UploadedTables(self._run_files(make_upload), cache=None)
+
+        assert tables.columns.tolist() == ["sample", "target", "reads"]
+        assert len(tables.preview) == 3
+        result = tables.load()
+        assert result["sample"].tolist() == ["S1", "S2", "S3"]
+        assert result["reads"].tolist() == [1, 2, 3]
+        assert not tables.empty
+
+    def test_projection_and_dtypes(self, make_upload):
+        """Test that the projection applies to every file and dtypes stay consistent."""
+        files = [
+            make_upload(
+                "sample,target,reads\n"
+                + "".join(f"S{run},T{i},{i}\n" for i in range(4)),
+                f"run{run}.csv",
+            )
+            for run in (1, 2)
+        ]
+        tables = UploadedTables(files, cache=None, compact="category")
+
+        tables.project(["sample", "reads"], {"reads": "int32"})
+        result = tables.load()
+
+        assert result.columns.tolist() == ["sample", "reads"]
+        assert result["reads"].dtype == "int32"
+        assert result["sample"].dtype == "category"
+
+    def test_timings_per_file(self, make_upload):
+        """Test that the parse time of each file is reported."""
+        tables = UploadedTables(self._run_files(make_upload), cache=None)
+        tables.load()
+
+        assert set(tables.timings) == {"run1.csv", "run2.tsv"}
+        assert all(seconds >= 0 for seconds in tables.timings.values())
+
+    def test_mismatched_columns(self, make_upload):
+        """Test that files with different columns are rejected."""
+        files = [
+            make_upload("sample,reads\nS1,1\n", "run1.csv"),
+            make_upload("sample,count\nS2,2\n", "run2.csv"),
+        ]
+
+        with pytest.raises(ValueError) as exc_info:
+            UploadedTables(files, cache=None)
+
+        assert "run2.csv does not have the same columns as run1.csv" in str(
+            exc_info.value
+        )
+
+    def test_no_files(self):
+        """Test that an empty upload is rejected."""
+        with pytest.raises(ValueError):
+            UploadedTables([])
+
+
+class TestSpilledUpload:
+    """Test cases for spilling uploads to disk and chunked loading."""
+
+    @staticmethod
+    def _alleles(rows=10):
+        return "sample,target,reads\n" + "".join(
+            f"S{i % 2},T{i},{i}\n" for i in range(rows)
+        )
+
+    def test_upload_size(self, tmp_path):
+        """Test the size of in-memory uploads and paths."""
+        file_obj = io.BytesIO(b"a,b\n1,2\n")
+        path = tmp_path / "table.csv"
+        path.write_bytes(b"a,b\n")
+
+        assert upload_size(file_obj) == 8
+        assert upload_size(path) == 4
+
+    def test_spilled_upload_is_parsed_from_disk(self, make_upload, tmp_path):
+        """Test that a spilled upload keeps its format and is read as a path."""
+        spilled = SpilledUpload(
+            make_upload(self._alleles(), "alleles.csv"), directory=tmp_path
+        )
+
+        assert spilled.path.endswith("_alleles.csv")
+        assert spilled.name == "alleles.csv"
+        result = load_csv(spilled)
+        assert result["reads"].tolist() == list(range(10))
+
+    def test_temporary_file_is_deleted(self, make_upload, tmp_path):
+        """Test that the temporary file is removed on close and on collection."""
+        closed = SpilledUpload(
+            make_upload(self._alleles(), "alleles.csv"), directory=tmp_path
+        )
+        collected = SpilledUpload(
+            make_upload(self._alleles(), "alleles.csv"), directory=tmp_path
+        )
+        collected_path = collected.path
+
+        closed.close()
+        del collected
+
+        assert not os.path.exists(closed.path)
+        assert not os.path.exists(collected_path)
+
+    def test_chunked_load_matches_full_load(self, make_upload):
+        """Test that a chunked parse gives the same table as a full parse."""
+        full = load_csv(
+            make_upload(self._alleles(25), "alleles.csv"), usecols=["sample", "reads"]
+        )
+        chunked = load_csv(
+            make_upload(self._alleles(25), "alleles.csv"),
+            usecols=["sample", "reads"],
+            dtype={"reads": "int32"},
+            compact="category",
+            rows_per_chunk=10,
+        )
+
+        assert chunked.columns.tolist() == ["sample", "reads"]
+        assert chunked["sample"].dtype == "category"
+        assert chunked["reads"].dtype == "int32"
+        assert chunked["sample"].tolist() == full["sample"].tolist()
+        assert chunked["reads"].tolist() == full["reads"].tolist()
+
+    def test_no_chunks_without_compaction(self, make_upload):
+        """Test that a file is parsed in one go when there is nothing to compact."""
+        with patch("data_loader.iter_csv_chunks") as mock_chunks:
+            result = load_csv(
+                make_upload(self._alleles(25), "alleles.csv"), rows_per_chunk=10
+            )
+
+        mock_chunks.assert_not_called()
+        assert len(result) == 25
+
+    def test_chunked_load_of_header_only_file(self, make_upload):
+        """Test that a file without data rows still loads when chunked."""
+        file_obj = make_upload("sample,reads\n", "empty.csv")
+
+        result = load_csv(file_obj, compact="category", rows_per_chunk=10)
+
+        assert result.columns.tolist() == ["sample", "reads"]
+        assert result.empty
+
+    def test_uploaded_table_loads_in_chunks(self, make_upload, tmp_path):
+        """Test that UploadedTable compacts a spilled upload in chunks."""
+        spilled = SpilledUpload(
+            make_upload(self._alleles(30), "alleles.csv"), directory=tmp_path
+        )
+        table = UploadedTable(
+            spilled, n_rows=5, cache=None, compact="category", rows_per_chunk=7
+        )
+
+        with patch("data_loader.iter_csv_chunks", wraps=iter_csv_chunks) as mock_iter:
+            result = table.load()
+
+        mock_iter.assert_called_once()
+        assert len(result) == 30
+
+
+class TestParallelParse:
+    """Test cases for byte-range parallel parsing of large delimited files."""
+
+    @staticmethod
+    def _write_table(tmp_path, rows=1000, name="alleles.tsv"):
+        path = tmp_path / name
+        path.write_text(
+            "sample\ttarget\treads\n"
+            + "".join(f"S{i % 7}\tT{i}\t{i}\n" for i in range(rows))
+        )
+        return path
+
+    def test_byte_ranges_end_on_newlines(self, tmp_path):
+        """Test that ranges cover the data exactly and start at line boundaries."""
+        path = self._write_table(tmp_path)
+        data = path.read_bytes()
+        data_start = data.index(b"\n") + 1
+
+        ranges = _byte_ranges(path, data_start, 4)
+
+        assert ranges[0][0] == data_start
+        assert ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert data[start - 1 : start] == b"\n"
+
+    def test_parallel_parse_matches_serial(self, tmp_path):
+        """Test that a file split across processes parses like a single read."""
+        path = self._write_table(tmp_path)
+        expected = load_csv(path, usecols=["sample", "reads"])
+
+        with patch("data_loader.PARALLEL_PARSE_THRESHOLD", 0), patch(
+            "data_loader.MAX_PARSE_PROCESSES", 3
+        ):
+            result = load_csv(
+                path, usecols=["sample", "reads"], dtype={"sample": "category"}
+            )
+
+        assert result.attrs["load_info"]["processes"] == 3
+        assert result["sample"].dtype == "category"
+        assert result["sample"].tolist() == expected["sample"].tolist()
+        assert result["reads"].tolist() == expected["reads"].tolist()
+
+    def test_quoted_files_are_parsed_serially(self, tmp_path):
+        """Test that files with quoted fields are not split."""
+        path = tmp_path / "quoted.csv"
+        path.write_text('name,note\n"Smith, John","line one\nline two"\nDoe,x\n')
+
+        with patch("data_loader.PARALLEL_PARSE_THRESHOLD", 0), patch(
+            "data_loader.MAX_PARSE_PROCESSES", 3
+        ):
+            result = load_csv(path)
+
+        assert result.attrs["load_info"]["processes"] == 1
+        assert result["note"].tolist() == ["line one\nline two", "x"]
+
+    def test_quote_past_the_sample_is_parsed_serially(self, tmp_path):
+        """Test that a quoted newline after the sniffed sample is not split."""
+        path = tmp_path / "late_quote.csv"
+        rows = "".join(f"S{i},plain note {i}\n" for i in range(10_000))
+        path.write_text(f'name,note\n{rows}S,"line one\nline two"\n')
+        assert path.stat().st_size > 64 * 1024
+
+        with patch("data_loader.PARALLEL_PARSE_THRESHOLD", 0), patch(
+            "data_loader.MAX_PARSE_PROCESSES", 5
+        ):
+            result = load_csv(path)
+
+        assert result.attrs["load_info"]["processes"] == 1
+        assert len(result) == 10_001
+        assert result["note"].iloc[-1] == "line one\nline two"
+
+    def test_failed_ranges_fall_back_to_serial(self, tmp_path):
+        """Test that the file is parsed serially if the process pool fails."""
+        path = self._write_table(tmp_path)
+        pool = MagicMock()
+        pool.map.side_effect = OSError("pool failed")
+
+        with patch("data_loader.PARALLEL_PARSE_THRESHOLD", 0), patch(
+            "data_loader.MAX_PARSE_PROCESSES", 3
+        ), patch("data_loader._parse_pool", return_value=pool):
+            result = load_csv(path)
+
+        assert result.attrs["load_info"]["processes"] == 1
+        assert len(result) == 1000
+
+    def test_one_pool_is_shared_and_not_forked(self, tmp_path):
+        """Test that parses share one pool whose workers are not forked."""
+        path = self._write_table(tmp_path)
+
+        with patch("data_loader.PARALLEL_PARSE_THRESHOLD", 0), patch(
+            "data_loader.MAX_PARSE_PROCESSES", 2
+        ):
+            load_csv(path)
+            pool = data_loader._parse_pool()
+            load_csv(path)
+
+        assert data_loader._parse_pool() is pool
+        assert pool._mp_context.get_start_method() != "fork"
+
+    def test_spilled_upload_is_split_and_compacted(self, tmp_path):
+        """Test that a compacted spilled upload is parsed in parallel, not chunked."""
+        with open(self._write_table(tmp_path), "rb") as handle:
+            spilled = SpilledUpload(handle, directory=tmp_path)
+
+        with patch("data_loader.PARALLEL_PARSE_THRESHOLD", 0), patch(
+            "data_loader.MAX_PARSE_PROCESSES", 3
+        ), patch("data_loader.iter_csv_chunks") as mock_chunks:
+            result = load_csv(spilled, compact="category", rows_per_chunk=100)
+
+        mock_chunks.assert_not_called()
+        assert result.attrs["load_info"]["processes"] == 3
+        assert result["sample"].dtype == "category"
+        assert len(result) == 1000
+
+    def test_in_memory_uploads_are_parsed_serially(self):
+        """Test that only files on disk are split."""
+        file_obj = io.BytesIO(b"a,b\n1,2\n3,4\n")
+        file_obj.name = "small.csv"
+
+        with patch("data_loader.PARALLEL_PARSE_THRESHOLD", 0):
+            result = load_csv(file_obj)
+
+        assert result.attrs["load_info"]["processes"] == 1
+
+
+class TestResolveDataPaths:
+    """Test cases for reading server-side paths under allow-listed roots."""
+
+    @staticmethod
+    def _data_root(tmp_path):
+        root = tmp_path / "data"
+        (root / "run1").mkdir(parents=True)
+        (root / "run2").mkdir()
+        (root / "run1" / "alleles.tsv").write_text("sample\treads\nS1\t1\n")
+        (root / "run1" / "notes.md").write_text("not a table")
+        (root / "run2" / "alleles.tsv").write_text("sample\treads\nS2\t2\n")
+        (tmp_path / "secret.csv").write_text("a,b\n1,2\n")
+        return root
+
+    def test_relative_file(self, tmp_path):
+        """Test that a relative path is resolved against the root."""
+        root = self._data_root(tmp_path)
+
+        paths = resolve_data_paths("run1/alleles.tsv", roots=[root])
+
+        assert paths == [(root / "run1" / "alleles.tsv").resolve()]
+        assert load_csv(paths[0])["sample"].tolist() == ["S1"]
+
+    def test_directory_lists_supported_files(self, tmp_path):
+        """Test that a directory stands for the supported files inside it."""
+        root = self._data_root(tmp_path)
+
+        paths = resolve_data_paths("run1", roots=[root])
+
+        assert [path.name for path in paths] == ["alleles.tsv"]
+
+    def test_recursive_glob(self, tmp_path):
+        """Test that a glob matches files across subdirectories in order."""
+        root = self._data_root(tmp_path)
+
+        paths = resolve_data_paths("**/*.tsv", roots=[root])
+
+        assert [path.parent.name for path in paths] == ["run1", "run2"]
+        tables = UploadedTables(paths, cache=None)
+        assert tables.load()["sample"].tolist() == ["S1", "S2"]
+
+    def test_paths_outside_root_are_rejected(self, tmp_path):
+        """Test that .. and symbolic links cannot escape the data root."""
+        root = self._data_root(tmp_path)
+        (root / "link.csv").symlink_to(tmp_path / "secret.csv")
+
+        for pattern, message in [
+            ("../secret.csv", "may not contain '..'"),
+            ("run1/../../secret.csv", "may not contain '..'"),
+            (str(tmp_path / "secret.csv"), "is outside the data roots"),
+            ("link.csv", "No supported files match"),
+        ]:
+            with pytest.raises(ValueError) as exc_info:
+                resolve_data_paths(pattern, roots=[root])
+            assert message in str(exc_info.value)
+
+    def test_patterns_are_checked_before_globbing(self, tmp_path):
+        """Test that a pattern outside the roots never walks the filesystem."""
+        root = self._data_root(tmp_path)
+
+        with patch("data_loader.glob.glob") as mock_glob:
+            for pattern in ["/**", "/usr/**/*.csv", "**/../../**"]:
+                with pytest.raises(ValueError):
+                    resolve_data_paths(pattern, roots=[root])
+
+        mock_glob.assert_not_called()
+
+    def test_absolute_path_inside_root(self, tmp_path):
+        """Test that an absolute pattern is globbed below its root."""
+        root = self._data_root(tmp_path)
+
+        paths = resolve_data_paths(
+            str(root.resolve() / "run*" / "alleles.tsv"), roots=[root]
+        )
+
+        assert [path.parent.name for path in paths] == ["run1", "run2"]
+
+    def test_disabled_without_roots(self):
+        """Test that server-side paths are disabled when no root is configured."""
+        with patch.dict(os.environ, {"PMO_BUILDER_DATA_ROOTS": ""}):
+            assert data_roots() == []
+            with pytest.raises(ValueError) as exc_info:
+                resolve_data_paths("alleles.tsv")
+
+        assert "disabled" in str(exc_info.value)
+
+    def test_roots_from_environment(self, tmp_path):
+        """Test that the data roots are read from the environment."""
+        root = self._data_root(tmp_path)
+
+        with patch.dict(os.environ, {"PMO_BUILDER_DATA_ROOTS": str(root)}):
+            assert data_roots() == [os.path.realpath(root)]
+            assert len(resolve_data_paths("run2/alleles.tsv")) == 1
+
+
+class TestExcelParquetCache:
+    """Test cases for the Parquet cache of parsed Excel sheets."""
+
+    @staticmethod
+    @functools.cache
+    def _workbook_bytes(rows):
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer) as writer:
+            pd.DataFrame(
+                {
+                    "specimen": [f"S{i}" for i in range(rows)],
+                    "reads": range(rows),
+                }
+            ).to_excel(writer, sheet_name="Specimens", index=False)
+        return buffer.getvalue()
+
+    @classmethod
+    def _workbook(cls, rows=6):
+        # Workbooks record when they were saved, so reuse the same bytes to
+        # keep the content hash stable across calls
+        buffer = io.BytesIO(cls._workbook_bytes(rows))
+        buffer.name = "metadata.xlsx"
+        return buffer
+
+    def test_full_read_is_cached(self, excel_cache):
+        """Test that a sheet is parsed once and then read from Parquet."""
+        first = load_csv(self._workbook(), sheet_name="Specimens")
+        with patch("data_loader.openpyxl.load_workbook") as mock_load_workbook:
+            second = load_csv(
+                self._workbook(),
+                usecols=["reads"],
+                dtype={"reads": "int32"},
+                sheet_name="Specimens",
+            )
+
+        mock_load_workbook.assert_not_called()
+        assert first.attrs["load_info"]["parquet_cache"] == "miss"
+        assert second.attrs["load_info"]["parquet_cache"] == "hit"
+        assert second.columns.tolist() == ["reads"]
+        assert second["reads"].dtype == "int32"
+        assert second["reads"].tolist() == first["reads"].tolist()
+        assert excel_cache.stats()["entries"] == 1
+
+    def test_preview_uses_cache_after_full_read(self, excel_cache):
+        """Test that previews stream on a miss and read the copy on a hit."""
+        miss = probe_file(self._workbook(), n_rows=2)
+        assert excel_cache.stats()["entries"] == 0
+
+        load_csv(self._workbook())
+        hit = probe_file(self._workbook(), n_rows=2)
+
+        assert miss.attrs["load_info"]["parquet_cache"] == "miss"
+        assert hit.attrs["load_info"]["parquet_cache"] == "hit"
+        assert hit["specimen"].tolist() == ["S0", "S1"]
+
+    def test_sheets_are_cached_separately(self, excel_cache):
+        """Test that the sheet name is part of the key."""
+        workbook = self._workbook()
+
+        load_csv(workbook)
+        load_csv(workbook, sheet_name="Specimens")
+
+        assert excel_cache.stats()["entries"] == 2
+
+    def test_mixed_columns_are_not_stored(self, excel_cache):
+        """Test that sheets Parquet cannot hold exactly are skipped."""
+        stored = excel_cache.put("key", None, pd.DataFrame({"id": [1, "S2"]}))
+
+        assert not stored
+        assert excel_cache.get("key", None) is None
+        assert excel_cache.stats()["entries"] == 0
+
+    def test_least_recently_read_copies_are_evicted(self, tmp_path):
+        """Test that the disk budget evicts the least recently read copies."""
+        df = pd.DataFrame({"a": range(100)})
+        cache = ExcelParquetCache(tmp_path / "cache")
+        cache.put("first", None, df)
+        size = cache.stats()["nbytes"]
+        cache.max_bytes = 2 * size
+
+        cache.put("second", None, df)
+        os.utime(cache.path("first", None), (0, 0))
+        os.utime(cache.path("second", None), (1, 1))
+        cache.get("first", None)
+        cache.put("third", None, df)
+
+        assert cache.get("second", None) is None
+        assert cache.get("first", None) is not None
+        assert cache.stats()["entries"] == 2
+        assert cache.stats()["hits"] == 2
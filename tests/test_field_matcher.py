@@ -1,15 +1,38 @@
+import itertools
+import json
+import os
+
 import pytest
+import numpy as np
 import pandas as pd
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 
+from data_loader import UploadedTable
+from schema_index import schema_section
 from field_matcher import (
+    ADDITIONAL_FIELD,
+    CONTENT_MATCH_BONUS,
+    CONTENT_MISMATCH_PENALTY,
+    MappingTemplateStore,
+    MatchCache,
+    column_fingerprint,
+    content_scores,
     fuzzy_match_fields,
+    optimal_assignment,
+    score_matrix,
     no_duplicates,
-    interactive_field_mapping,
     field_mapping_json_to_table,
-    additional_fields_section,
-    field_mapping,
+    mapping_editor_section,
+    mapping_projection,
+    mapping_table,
+    profile_columns,
+    read_mapping_table,
+    spill_oversized_uploads,
+    suggest_field_mapping,
+    table_profiles,
+    template_mapping,
 )
+from utils import LRUCache
 
 
 class TestFuzzyMatchFields:
@@ -99,6 +122,180 @@ class TestFuzzyMatchFields:
         assert matches == {}
         assert unused == ["field1"]
 
+    def test_duplicate_field_names_matched_once(self):
+        """Test that a repeated column name is only used once."""
+        matches, unused = fuzzy_match_fields(
+            ["sample_id", "sample_id", "reads"], ["sampleID", "reads"]
+        )
+
+        assert matches == {"sampleID": "sample_id", "reads": "reads"}
+        assert unused == []
+
+
+class TestScoreMatrix:
+    """Test cases for score_matrix function."""
+
+    def test_shape_and_range(self):
+        """Test one row per target and one column per field."""
+        scores = score_matrix(["sample_id", "reads", "other"], ["sampleID", "reads"])
+
+        assert scores.shape == (2, 3)
+        assert scores.min() >= 0
+        assert scores.max() <= 100
+        assert scores[1, 1] == 100
+
+    def test_alternates_take_best_score(self):
+        """Test that each target keeps the best score over its alternates."""
+        field_names = ["specimen_name", "seq"]
+        plain = score_matrix(field_names, ["specimen_id"])
+        with_alternates = score_matrix(
+            field_names, ["specimen_id"], {"specimen_id": ["specimen_name"]}
+        )
+
+        assert with_alternates[0, 0] == 100
+        assert (with_alternates >= plain).all()
+
+    def test_non_string_field_names(self):
+        """Test that numeric headers, as from Excel cells, are scored as text."""
+        matches, unused = fuzzy_match_fields(
+            [2020, "sample", 3.5], ["sample_name"], cache=None
+        )
+
+        assert score_matrix([2020], ["2020"])[0, 0] == 100
+        assert matches == {"sample_name": "sample"}
+        assert unused == [2020, 3.5]
+
+    def test_empty_inputs(self):
+        """Test empty fields or targets give an empty matrix."""
+        assert score_matrix([], ["target1"]).shape == (1, 0)
+        assert score_matrix(["field1"], []).shape == (0, 1)
+
+
+class TestOptimalAssignment:
+    """Test cases for optimal_assignment function."""
+
+    def test_beats_greedy_order(self):
+        """Test that the first row does not take a field the second row needs."""
+        scores = np.array([[90.0, 85.0], [88.0, 10.0]])
+
+        assignment = optimal_assignment(scores)
+
+        assert assignment.tolist() == [1, 0]
+
+    @staticmethod
+    def _best_total(scores):
+        """Highest total score over every one-to-one assignment."""
+        if scores.shape[0] > scores.shape[1]:
+            scores = scores.T
+        n_rows, n_cols = scores.shape
+        return max(
+            scores[range(n_rows), list(cols)].sum()
+            for cols in itertools.permutations(range(n_cols), n_rows)
+        )
+
+    def test_matches_brute_force(self):
+        """Test the total score against every possible assignment."""
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            n_rows, n_cols = (int(size) for size in rng.integers(1, 6, size=2))
+            scores = rng.integers(0, 100, size=(n_rows, n_cols)).astype(float)
+
+            assignment = optimal_assignment(scores)
+
+            rows = np.nonzero(assignment >= 0)[0]
+            cols = assignment[rows]
+            assert len(rows) == min(n_rows, n_cols)
+            assert len(set(cols.tolist())) == len(cols)
+            assert scores[rows, cols].sum() == self._best_total(scores)
+
+    def test_empty_matrix(self):
+        """Test that empty matrices leave every row unassigned."""
+        assert optimal_assignment(np.zeros((2, 0))).tolist() == [-1, -1]
+        assert optimal_assignment(np.zeros((0, 3))).tolist() == []
+
+    def test_optional_threshold_respected(self):
+        """Test that optional targets below the threshold stay unmatched."""
+        matches, unused = fuzzy_match_fields(
+            ["sample_id", "zzz"],
+            ["sampleID", "collectionDate"],
+            is_required=False,
+            match_threshold=80,
+        )
+
+        assert matches == {"sampleID": "sample_id", "collectionDate": None}
+        assert unused == ["zzz"]
+
+
+class TestMatchCache:
+    """Test cases for memoized field matching."""
+
+    def test_repeat_match_is_cached(self):
+        """Test that the same columns and section are only matched once."""
+        cache = MatchCache()
+        args = (["sample_id", "reads"], ["sampleID"], {"sampleID": ["sample"]})
+
+        first = fuzzy_match_fields(*args, cache=cache)
+        with patch("field_matcher.score_matrix") as mock_score_matrix:
+            second = fuzzy_match_fields(*args, cache=cache)
+
+        mock_score_matrix.assert_not_called()
+        assert second == first
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_options_are_part_of_key(self):
+        """Test that the section, alternates and threshold change the key."""
+        cache = MatchCache()
+        fields = ["sample_id", "reads"]
+
+        fuzzy_match_fields(fields, ["sampleID"], cache=cache)
+        fuzzy_match_fields(fields, ["sampleID"], {"sampleID": ["id"]}, cache=cache)
+        fuzzy_match_fields(
+            fields, ["sampleID"], is_required=False, match_threshold=90, cache=cache
+        )
+
+        assert cache.stats() == {
+            "hits": 0,
+            "misses": 3,
+            "entries": 3,
+            "max_entries": cache.max_entries,
+        }
+
+    def test_cached_result_is_a_copy(self):
+        """Test that editing a returned mapping does not change the cache."""
+        cache = MatchCache()
+        matches, unused = fuzzy_match_fields(
+            ["sample_id", "reads"], ["sampleID"], cache=cache
+        )
+        matches["sampleID"] = "reads"
+        unused.clear()
+
+        assert fuzzy_match_fields(
+            ["sample_id", "reads"], ["sampleID"], cache=cache
+        ) == (
+            {"sampleID": "sample_id"},
+            ["reads"],
+        )
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the entry bound evicts the least recently used result."""
+        cache = MatchCache(max_entries=2)
+        for fields in (["a"], ["b"], ["a"], ["c"]):
+            fuzzy_match_fields(fields, ["target"], cache=cache)
+
+        assert cache.get(cache.key(["b"], ["target"])) is None
+        assert cache.get(cache.key(["a"], ["target"])) is not None
+        assert len(cache) == 2
+
+    def test_error_shown_on_cached_result(self):
+        """Test that missing required fields are reported on every call."""
+        cache = MatchCache()
+        with patch("streamlit.error") as mock_error:
+            fuzzy_match_fields(["sample_id"], ["sampleID", "reads"], cache=cache)
+            fuzzy_match_fields(["sample_id"], ["sampleID", "reads"], cache=cache)
+
+        assert mock_error.call_count == 2
+
 
 class TestNoDuplicates:
     """Test cases for no_duplicates function."""
@@ -135,52 +332,6 @@ class TestNoDuplicates:
             mock_error.assert_not_called()
 
 
-class TestInteractiveFieldMapping:
-    """Test cases for interactive_field_mapping function."""
-
-    def test_required_fields_mapping(self):
-        """Test mapping for required fields."""
-        field_mapping = {"target1": "field1", "target2": "field2"}
-        df_columns = ["field1", "field2", "field3"]
-
-        # Mock streamlit selectbox to return the suggested match
-        with patch("streamlit.selectbox") as mock_selectbox:
-            mock_selectbox.side_effect = ["field1", "field2"]
-
-            result = interactive_field_mapping(
-                field_mapping, df_columns, is_required=True
-            )
-
-            assert result == {"target1": "field1", "target2": "field2"}
-            assert mock_selectbox.call_count == 2
-
-    def test_optional_fields_mapping(self):
-        """Test mapping for optional fields with 'no match' option."""
-        field_mapping = {"target1": "field1", "target2": None}
-        df_columns = ["field1", "field2", "field3"]
-
-        with patch("streamlit.selectbox") as mock_selectbox:
-            mock_selectbox.side_effect = ["field1", "no match"]
-
-            result = interactive_field_mapping(
-                field_mapping, df_columns, is_required=False
-            )
-
-            assert result == {"target1": "field1", "target2": None}
-
-    def test_list_suggested_match(self):
-        """Test handling of list suggested matches."""
-        field_mapping = {"target1": ["field1", "field2"]}
-        df_columns = ["field1", "field2", "field3"]
-
-        with patch("streamlit.selectbox") as mock_selectbox:
-            mock_selectbox.return_value = "field1"
-
-            result = interactive_field_mapping(field_mapping, df_columns)
-
-            assert result == {"target1": "field1"}
-
-
 class TestFieldMappingJsonToTable:
     """Test cases for field_mapping_json_to_table function."""
 
@@ -198,97 +349,28 @@ class TestFieldMappingJsonToTable:
         assert result.iloc[2]["Input Field"] is None
 
 
-class TestAdditionalFieldsSection:
-    """Test cases for additional_fields_section function."""
-
-    def test_no_unused_fields(self):
-        """Test with no unused fields."""
-        result = additional_fields_section([])
-        assert result == []
-
-    def test_with_unused_fields(self):
-        """Test with unused fields."""
-        unused_fields = ["field1", "field2", "field3"]
-
-        with patch("streamlit.subheader"), patch("streamlit.write"), patch(
-            "streamlit.columns"
-        ) as mock_columns, patch("streamlit.checkbox") as mock_checkbox, patch(
-            "streamlit.success"
-        ):
-            # Mock columns to return a list of column objects
-            mock_col1 = MagicMock()
-            mock_col2 = MagicMock()
-            mock_columns.return_value = [mock_col1, mock_col2]
-
-            # Mock checkbox to return True for first field, False for others
-            mock_checkbox.side_effect = [True, False, False]
-
-            result = additional_fields_section(unused_fields)
-
-            assert result == ["field1"]
-
-
-class TestFieldMapping:
-    """Test cases for field_mapping function."""
+class TestMappingProjection:
+    """Test cases for mapping_projection function."""
 
-    def test_basic_field_mapping(self):
-        """Test basic field mapping workflow."""
-        input_fields = ["field1", "field2", "field3"]
-        target_schema = ["target1", "target2"]
-        target_alternate_schema = {"target1": ["field1"]}
-
-        with patch(
-            "field_matcher.fuzzy_field_matching_page_section"
-        ) as mock_fuzzy, patch(
-            "field_matcher.interactive_field_mapping_page_section"
-        ) as mock_interactive:
-            # Mock fuzzy matching
-            mock_fuzzy.return_value = (
-                {"target1": "field1", "target2": "field2"},
-                ["field3"],
-            )
-
-            # Mock interactive mapping (toggle off)
-            mock_interactive.return_value = (
-                {"target1": "field1", "target2": "field2"},
-                input_fields,
-            )
-
-            result_mapping, result_unused = field_mapping(
-                input_fields, target_schema, target_alternate_schema
-            )
-
-            assert result_mapping == {"target1": "field1", "target2": "field2"}
-            assert result_unused == ["field3"]  # Should use original unused fields
-
-    def test_interactive_mapping_used(self):
-        """Test when interactive mapping is used."""
-        input_fields = ["field1", "field2", "field3"]
-        target_schema = ["target1", "target2"]
+    def test_columns_and_dtypes(self):
+        """Test that mapped and additional columns are kept with schema dtypes."""
+        required = {"target_name": "locus", "reads": "count"}
+        optional = {"umis": None, "chrom": "chromosome"}
+        field_dtypes = {"target_name": "category", "reads": "int32", "umis": "int32"}
 
-        with patch(
-            "field_matcher.fuzzy_field_matching_page_section"
-        ) as mock_fuzzy, patch(
-            "field_matcher.interactive_field_mapping_page_section"
-        ) as mock_interactive:
-            # Mock fuzzy matching
-            mock_fuzzy.return_value = (
-                {"target1": "field1", "target2": "field2"},
-                ["field3"],
-            )
+        columns, dtypes = mapping_projection(
+            [required, optional], ["notes", "locus"], field_dtypes
+        )
 
-            # Mock interactive mapping (toggle on) - returns different unused fields
-            mock_interactive.return_value = (
-                {"target1": "field1", "target2": "field3"},
-                ["field2"],  # Different unused fields
-            )
+        assert columns == ["locus", "count", "chromosome", "notes"]
+        assert dtypes == {"locus": "category", "count": "int32"}
 
-            result_mapping, result_unused = field_mapping(
-                input_fields, target_schema, {}
-            )
+    def test_missing_mappings(self):
+        """Test with no optional mapping and no declared dtypes."""
+        columns, dtypes = mapping_projection([{"target_name": "locus"}, None])
 
-            assert result_mapping == {"target1": "field1", "target2": "field3"}
-            assert result_unused == ["field2"]  # Should use updated unused fields
+        assert columns == ["locus"]
+        assert dtypes == {}
 
 
 class TestEdgeCases:
@@ -379,5 +461,356 @@ class TestIntegration:
         assert len(unused_high) >= len(unused_low)
 
 
+class TestSpillOversizedUploads:
+    """Test cases for spill_oversized_uploads."""
+
+    @staticmethod
+    def _rows(size):
+        return b"a\n" + b"1\n" * size
+
+    def test_only_oversized_uploads_are_spilled(self, make_upload):
+        """Test that small uploads stay in memory and large ones go to disk."""
+        small = make_upload(self._rows(1), "small.csv", file_id="small.csv")
+        large = make_upload(self._rows(100), "large.csv", file_id="large.csv")
+
+        with patch("field_matcher.st") as mock_st:
+            mock_st.session_state = {}
+            files, spilled = spill_oversized_uploads(
+                [small, large], "spilled", memory_budget=50
+            )
+
+        assert spilled
+        assert files[0] is small
+        assert os.path.exists(os.fspath(files[1]))
+        files[1].close()
+
+    def test_spilled_upload_is_reused_and_dropped(self, make_upload):
+        """Test that reruns reuse a spilled copy and drop it once it is removed."""
+        large = make_upload(self._rows(100), "large.csv", file_id="large.csv")
+
+        with patch("field_matcher.st") as mock_st:
+            mock_st.session_state = {}
+            first, _ = spill_oversized_uploads([large], "spilled", memory_budget=50)
+            second, _ = spill_oversized_uploads([large], "spilled", memory_budget=50)
+            files, spilled = spill_oversized_uploads([], "spilled", memory_budget=50)
+
+            assert first[0] is second[0]
+            assert mock_st.session_state["spilled"] == {}
+        assert files == [] and not spilled
+        first[0].close()
+
+
+class TestMappingTemplates:
+    """Test cases for saved mapping templates."""
+
+    def test_fingerprint_ignores_column_order(self):
+        """Test that the same column set gives the same fingerprint."""
+        section = schema_section(["sampleID"])
+
+        assert column_fingerprint(["a", "b"], section) == column_fingerprint(
+            ["b", "a"], section
+        )
+        assert column_fingerprint(["a", "b"], section) != column_fingerprint(
+            ["a", "c"], section
+        )
+
+    def test_fingerprint_depends_on_section(self):
+        """Test that the schema section is part of the fingerprint."""
+        columns = ["sample_id", "reads"]
+
+        assert column_fingerprint(
+            columns, schema_section(["sampleID"])
+        ) != column_fingerprint(columns, schema_section(["sampleID", "reads"]))
+
+    def test_round_trip(self, tmp_path):
+        """Test that a saved template is read back."""
+        store = MappingTemplateStore(tmp_path / "templates")
+
+        assert store.get("abc") is None
+        assert store.put("abc", {"sampleID": "id"}, {"reads": None}, ["extra"])
+        assert store.get("abc") == {
+            "required": {"sampleID": "id"},
+            "optional": {"reads": None},
+            "additional": ["extra"],
+        }
+
+        store.delete("abc")
+        assert store.get("abc") is None
+
+    def test_corrupt_template_is_ignored(self, tmp_path):
+        """Test that an unreadable template is treated as missing."""
+        store = MappingTemplateStore(tmp_path)
+        with open(store.path("abc"), "w") as file:
+            file.write("{not json")
+
+        assert store.get("abc") is None
+
+    def test_template_mapping_restores_targets(self):
+        """Test that a saved mapping covers every current target."""
+        mapping = template_mapping({"sampleID": "id"}, ["sampleID", "reads"], ["id"])
+
+        assert mapping == {"sampleID": "id", "reads": None}
+
+    def test_stale_template_mapping_is_dropped(self):
+        """Test that mappings to missing fields or targets are not used."""
+        assert template_mapping({"sampleID": "gone"}, ["sampleID"], ["id"]) is None
+        assert template_mapping({"old": "id"}, ["sampleID"], ["id"]) is None
+        assert template_mapping(None, ["sampleID"], ["id"]) is None
+
+    def test_saved_mapping_skips_matcher(self):
+        """Test that a saved mapping is shown instead of fuzzy matching."""
+        with patch("field_matcher.fuzzy_match_fields") as mock_match:
+            mapping, unused = suggest_field_mapping(
+                ["id", "count", "extra"],
+                ["sampleID", "reads"],
+                saved_mapping={"sampleID": "id", "reads": "count"},
+            )
+
+        mock_match.assert_not_called()
+        assert mapping == {"sampleID": "id", "reads": "count"}
+        assert unused == ["extra"]
+
+
+class TestProfileColumns:
+    """Test cases for content-based column profiling."""
+
+    def test_detects_content_types(self):
+        """Test the DNA, count, pseudocigar and date checks."""
+        df = pd.DataFrame(
+            {
+                "ASV": ["ACGTTGCA", "acggttca", "TTGACCAG"],
+                "n": [10, 0, 3],
+                "n_text": ["10", "0", "3"],
+                "PseudoCIGAR": ["12A40I=TT", "3D=2", "."],
+                "when": ["2023-01-05", "2023/02/11", "01/03/2022"],
+                "Locus": ["t1", "t2", "t3"],
+                "ratio": [0.5, 1.5, -2.0],
+            }
+        )
+
+        profiles = profile_columns(df)
+
+        assert profiles["ASV"] == {"dna"}
+        assert profiles["n"] == {"count"}
+        assert profiles["n_text"] == {"count"}
+        assert profiles["PseudoCIGAR"] == {"pseudocigar"}
+        assert profiles["when"] == {"date"}
+        assert profiles["Locus"] == frozenset()
+        assert profiles["ratio"] == frozenset()
+
+    def test_only_sample_rows_are_checked(self):
+        """Test that rows past the sample do not change the profile."""
+        df = pd.DataFrame({"reads": [1, 2, 3] + [-1] * 1000})
+
+        assert profile_columns(df, sample_rows=3)["reads"] == {"count"}
+        assert profile_columns(df)["reads"] == frozenset()
+
+    def test_empty_columns_are_not_profiled(self):
+        """Test that columns without sampled values carry no information."""
+        df = pd.DataFrame({"empty": [None, None], "reads": [1, 2]})
+
+        assert "empty" not in profile_columns(df)
+
+    def test_content_scores(self):
+        """Test bonuses for fitting contents and penalties for others."""
+        profiles = {"ASV": frozenset({"dna"}), "n": frozenset({"count"})}
+
+        scores = content_scores(
+            ["ASV", "n", "unprofiled"], ["seq", "reads", "target_name"], profiles
+        )
+
+        assert scores.tolist() == [
+            [CONTENT_MATCH_BONUS, -CONTENT_MISMATCH_PENALTY, 0],
+            [-CONTENT_MISMATCH_PENALTY, CONTENT_MATCH_BONUS, 0],
+            [0, 0, 0],
+        ]
+
+    def test_contents_guide_matching(self):
+        """Test that a cryptic header with fitting contents wins the target."""
+        df = pd.DataFrame(
+            {"seq_reads": [10, 20, 3], "allele": ["ACGTTG", "ACGGTT", "TTGACC"]}
+        )
+        fields = df.columns.tolist()
+
+        by_name, _ = fuzzy_match_fields(fields, ["seq"], cache=None)
+        by_content, unused = fuzzy_match_fields(
+            fields, ["seq"], cache=None, field_profiles=profile_columns(df)
+        )
+
+        assert by_name == {"seq": "seq_reads"}
+        assert by_content == {"seq": "allele"}
+        assert unused == ["seq_reads"]
+
+    def test_panel_example_primers_are_not_swapped(self):
+        """Test that both primer columns fitting DNA keep their own targets."""
+        root = os.path.join(os.path.dirname(__file__), "..")
+        with open(os.path.join(root, "conf", "schema.json")) as file:
+            fields = json.load(file)["panel_info"]
+        df = pd.read_csv(
+            os.path.join(root, "example_data", "mad4hatter_panel_info_example.csv"),
+            sep="\t",
+        )
+
+        matches, _ = fuzzy_match_fields(
+            df.columns.tolist(),
+            fields["required"],
+            fields["required_alternatives"],
+            cache=None,
+            field_profiles=profile_columns(df),
+        )
+
+        assert matches["forward_primer_seq"] == "fwd_primer"
+        assert matches["reverse_primer_seq"] == "rev_primer"
+
+    def test_contents_do_not_qualify_weak_optional_names(self):
+        """Test that integer distractors take no optional count targets."""
+        root = os.path.join(os.path.dirname(__file__), "..")
+        with open(os.path.join(root, "conf", "schema.json")) as file:
+            fields = json.load(file)["mhap_info"]
+        df = pd.DataFrame(
+            {
+                "sampleID": ["S1", "S2", "S3"],
+                "Locus": ["t1", "t2", "t3"],
+                "ASV": ["ACGTTG", "ACGGTT", "TTGACC"],
+                "Reads": [10, 20, 3],
+                "n_alleles": [1, 2, 1],
+                "plate_col": [3, 4, 5],
+                "well_idx": [1, 2, 3],
+            }
+        )
+        profiles = profile_columns(df)
+
+        required, unused = fuzzy_match_fields(
+            df.columns.tolist(),
+            fields["required"],
+            fields["required_alternatives"],
+            cache=None,
+            field_profiles=profiles,
+        )
+        optional, unused = fuzzy_match_fields(
+            unused,
+            fields["optional"],
+            fields["optional_alternatives"],
+            is_required=False,
+            cache=None,
+            field_profiles=profiles,
+        )
+
+        assert required["reads"] == "Reads"
+        assert set(optional.values()) == {None}
+        assert unused == ["n_alleles", "plate_col", "well_idx"]
+
+    def test_table_profiled_once_per_upload(self, make_upload):
+        """Test that reruns reuse the profiles of the same uploaded rows."""
+        cache = LRUCache(4)
+
+        content = "ASV\tn\nACGTTG\t1\nTTGACC\t2\n"
+
+        with patch(
+            "field_matcher.profile_columns", wraps=profile_columns
+        ) as mock_profile:
+            first = table_profiles(
+                UploadedTable(make_upload(content, "alleles.tsv")), cache=cache
+            )
+            second = table_profiles(
+                UploadedTable(make_upload(content, "alleles.tsv")), cache=cache
+            )
+
+        assert first == second == {"ASV": {"dna"}, "n": {"count"}}
+        assert mock_profile.call_count == 1
+
+    def test_profiles_are_part_of_cache_key(self):
+        """Test that a cached name-only result is not reused with profiles."""
+        cache = MatchCache()
+        profiles = {"allele": frozenset({"dna"})}
+
+        fuzzy_match_fields(["allele"], ["seq"], cache=cache)
+        fuzzy_match_fields(["allele"], ["seq"], cache=cache, field_profiles=profiles)
+
+        assert cache.stats()["misses"] == 2
+
+
+class TestMappingEditor:
+    """Test cases for the single-grid mapping editor."""
+
+    def test_mapping_table(self):
+        """Test one row per input column with its PMO field."""
+        table = mapping_table(
+            ["id", "count", "extra", "other"],
+            [{"sampleID": "id"}, {"reads": "count", "umis": None}],
+            ["extra"],
+        )
+
+        assert table["Input Field"].tolist() == ["id", "count", "extra", "other"]
+        assert table["PMO Field"].tolist() == [
+            "sampleID",
+            "reads",
+            ADDITIONAL_FIELD,
+            None,
+        ]
+
+    def test_round_trip(self):
+        """Test that an unedited table gives back the suggested mappings."""
+        required = {"sampleID": "id", "target": None}
+        optional = {"reads": "count", "umis": None}
+        table = mapping_table(["id", "count", "extra"], [required, optional], ["extra"])
+
+        mappings, additional = read_mapping_table(
+            table, [["sampleID", "target"], ["reads", "umis"]]
+        )
+
+        assert mappings == [required, optional]
+        assert additional == ["extra"]
+
+    def test_first_column_wins_duplicate_target(self):
+        """Test that a target picked twice is mapped to the first column."""
+        table = pd.DataFrame(
+            {"Input Field": ["a", "b", "c"], "PMO Field": ["t1", "t1", float("nan")]}
+        )
+
+        mappings, additional = read_mapping_table(table, [["t1", "t2"]])
+
+        assert mappings == [{"t1": "a", "t2": None}]
+        assert additional == []
+
+    def test_editor_returns_edits(self):
+        """Test that the edited grid gives the mappings and additional fields."""
+        edited = pd.DataFrame(
+            {
+                "Input Field": ["id", "count", "extra"],
+                "PMO Field": ["sampleID", ADDITIONAL_FIELD, "reads"],
+            }
+        )
+        with patch("field_matcher.st") as mock_st:
+            mock_st.data_editor.return_value = edited
+            mappings, additional = mapping_editor_section(
+                ["id", "count", "extra"],
+                [["sampleID"], ["reads"]],
+                [{"sampleID": "id"}, {"reads": "count"}],
+            )
+
+        mock_st.data_editor.assert_called_once()
+        assert mappings == [{"sampleID": "id"}, {"reads": "extra"}]
+        assert additional == ["count"]
+        mock_st.error.assert_not_called()
+        mock_st.warning.assert_not_called()
+
+    def test_editor_reports_duplicates_and_missing(self):
+        """Test errors for a target picked twice and an unmapped required field."""
+        edited = pd.DataFrame(
+            {"Input Field": ["a", "b"], "PMO Field": ["reads", "reads"]}
+        )
+        with patch("field_matcher.st") as mock_st:
+            mock_st.data_editor.return_value = edited
+            mappings, _ = mapping_editor_section(
+                ["a", "b"], [["sampleID"], ["reads"]], [{}, {}]
+            )
+
+        assert mock_st.error.call_count == 2
+        assert "sampleID" in mock_st.error.call_args.args[0]
+        # An incomplete required mapping is withheld from the transforms
+        assert mappings == [None, {"reads": "a"}]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
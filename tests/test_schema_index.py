@@ -0,0 +1,122 @@
+"""
+Unit tests for schema_index.py
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+from rapidfuzz.utils import default_process
+
+from schema_index import SchemaIndex, SchemaSection, schema_section, section_key
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "conf", "schema.json")
+
+
+@pytest.fixture
+def schema():
+    with open(SCHEMA_PATH) as file:
+        return json.load(file)
+
+
+class TestSchemaSection:
+    """Test cases for SchemaSection and schema_section."""
+
+    def test_queries_are_preprocessed(self):
+        """Test that every target and alternate is normalized once."""
+        section = schema_section(
+            ["Sample_ID", "reads"], {"Sample_ID": ["Specimen-ID", "id"]}
+        )
+
+        assert section.targets == ("Sample_ID", "reads")
+        assert section.queries == (
+            default_process("Sample_ID"),
+            default_process("Specimen-ID"),
+            default_process("id"),
+            default_process("reads"),
+        )
+        assert section.owners.tolist() == [0, 0, 0, 1]
+        assert section.alternates["Sample_ID"] == ("Specimen-ID", "id")
+
+    def test_same_targets_share_a_section(self):
+        """Test that equal targets and alternates are compiled only once."""
+        first = schema_section(["a", "b"], {"a": ["x"]})
+        second = schema_section(["a", "b"], {"a": ["x"], "c": ["y"]})
+
+        assert first is second
+        assert schema_section(first) is first
+        assert schema_section(["a", "b"]) is not first
+
+    def test_section_is_read_only(self):
+        """Test that a shared section cannot be modified."""
+        section = schema_section(["a"], {"a": ["x"]})
+
+        with pytest.raises(TypeError):
+            section.alternates["a"] = ("y",)
+        with pytest.raises(ValueError):
+            section.owners[0] = 1
+        with pytest.raises(AttributeError):
+            section.extra = 1
+
+    def test_empty_section(self):
+        """Test a section without targets."""
+        section = SchemaSection(section_key([]))
+
+        assert len(section) == 0
+        assert section.queries == ()
+        assert section.owners.dtype == np.intp
+
+
+class TestSchemaIndex:
+    """Test cases for SchemaIndex."""
+
+    def test_every_matched_group_is_indexed(self, schema):
+        """Test that required and optional groups of every section are built."""
+        index = SchemaIndex(schema)
+
+        assert ("mhap_info", "required") in index.sections
+        assert ("mhap_info", "optional") in index.sections
+        assert ("sequencing_info", "required") in index.sections
+        assert ("read_counts_perstage", "raw_counts", "required") in index.sections
+        assert not any("dtypes" in path for path in index.sections)
+
+    def test_section_matches_schema(self, schema):
+        """Test that a section holds the targets and alternates of the schema."""
+        section = SchemaIndex(schema).section("specimen_level_metadata", "required")
+        fields = schema["specimen_level_metadata"]
+
+        assert list(section.targets) == fields["required"]
+        for target, alternates in fields["required_alternatives"].items():
+            if target in section.targets:
+                assert section.alternates[target] == tuple(alternates)
+
+    def test_pages_reuse_indexed_sections(self, schema):
+        """Test that matching the schema lists reuses the indexed section."""
+        index = SchemaIndex(schema)
+        fields = schema["mhap_info"]
+
+        assert schema_section(
+            fields["optional"], fields["optional_alternatives"]
+        ) is index.section("mhap_info", "optional")
+
+
+class TestSchemaDtypes:
+    """Test cases for the dtypes declared in the schema."""
+
+    def test_grouping_fields_are_not_categorical(self, schema):
+        """Test that fields pmotools groups on are not parsed as categories."""
+        grouped = {
+            ("mhap_info",): ["library_sample_name", "target_name"],
+            ("read_counts_perstage", "reads_by_stage"): [
+                "library_sample_name",
+                "target_name",
+                "stage",
+            ],
+        }
+        for path, fields in grouped.items():
+            section = schema
+            for name in path:
+                section = section[name]
+            dtypes = section.get("dtypes", {})
+            for field in fields:
+                assert dtypes.get(field) != "category", (path, field)
@@ -1,10 +1,19 @@
 """
 Unit tests for transformer.py
 """
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
 import pandas as pd
+import pytest
 from unittest.mock import patch
 
+import transformer
 from transformer import (
+    columns_as_objects,
     transform_mhap_info,
     transform_panel_info,
     transform_specimen_info,
@@ -383,3 +392,144 @@ class TestTransformLibrarySampleInfo:
             call_args = mock_transform.call_args[1]
             assert call_args["experiment_accession_col"] is None
             assert call_args["library_prep_plate_name_col"] is None
+
+
+class TestColumnsAsObjects:
+    """Test cases for columns_as_objects function."""
+
+    def test_only_listed_numeric_columns_are_converted(self):
+        """Test that numpy numbers are converted only in the numeric columns."""
+        df = pd.DataFrame(
+            {
+                "start": np.array([1, 2], dtype="int32"),
+                "density": [1.5, np.nan],
+                "reads": np.array([10, 20], dtype="int32"),
+                "name": ["a", "b"],
+            }
+        )
+
+        result = columns_as_objects(
+            df, ["start", "reads", "name", None], ["start", "density"]
+        )
+
+        assert result["start"].dtype == object
+        assert isinstance(result["start"].iloc[0], int)
+        assert result["density"].dtype == object
+        assert result["reads"].dtype == "int32"
+        assert np.shares_memory(result["reads"].values, df["reads"].values)
+        # The uploaded table itself is left as it was
+        assert df["start"].dtype == "int32"
+        assert df["density"].dtype == "float64"
+
+    def test_extension_columns_are_converted(self):
+        """Test that categorical, Arrow and nullable columns become objects."""
+        df = pd.DataFrame(
+            {
+                "name": pd.Categorical(["a", "b"], categories=["a", "b", "c"]),
+                "target": pd.array(["t1", "t2"], dtype="string[pyarrow]"),
+                "count": pd.array([1, None], dtype="Int32"),
+                "other": pd.Categorical(["x", "y"]),
+            }
+        )
+
+        result = columns_as_objects(df, ["name", "target", "count"])
+
+        for column in ("name", "target", "count"):
+            assert result[column].dtype == object
+        assert result["name"].tolist() == ["a", "b"]
+        assert result["other"].dtype == "category"
+        assert df["name"].dtype == "category"
+
+    def test_nothing_to_convert_returns_the_same_frame(self):
+        """Test that no copy is made when every listed column is kept."""
+        df = pd.DataFrame({"name": ["a", "b"], "count": np.array([1, 2])})
+
+        assert columns_as_objects(df, ["name", "count", "missing", None]) is df
+
+    def test_categorical_mhap_info_matches_object_output(self):
+        """Test that unused categories add no empty samples or targets."""
+        df = pd.DataFrame(
+            {
+                "sample_id": ["S1", "S1", "S2"],
+                "target": ["T1", "T2", "T1"],
+                "sequence": ["ATCG", "GCTA", "ATCG"],
+                "reads": [100, 200, 50],
+            }
+        )
+        categorical = df.assign(
+            sample_id=pd.Categorical(df["sample_id"], ["S1", "S2", "S3"]),
+            target=pd.Categorical(df["target"], ["T1", "T2", "T3"]),
+        )
+        field_mapping = {
+            "library_sample_name": "sample_id",
+            "target_name": "target",
+            "seq": "sequence",
+            "reads": "reads",
+        }
+
+        expected = transform_mhap_info(df, "run_1", field_mapping, {})
+        result = transform_mhap_info(categorical, "run_1", field_mapping, {})
+
+        assert json.dumps(result, sort_keys=True) == json.dumps(
+            expected, sort_keys=True
+        )
+        assert "S3" not in json.dumps(result)
+
+    def test_transform_output_is_json_serializable(self):
+        """Test that a numpy parasite density is serialized by pmotools."""
+        df = pd.DataFrame(
+            {
+                "library_sample": ["LS1", "LS2"],
+                "sequencing_info": ["SI1", "SI1"],
+                "specimen": ["S1", "S2"],
+                "panel": ["P1", "P1"],
+                "density": np.array([120, 45], dtype="int32"),
+            }
+        )
+        field_mapping = {
+            "library_sample_name": "library_sample",
+            "sequencing_info_name": "sequencing_info",
+            "specimen_name": "specimen",
+            "panel_name": "panel",
+        }
+
+        result = transform_library_sample_info(
+            df, field_mapping, {"parasite_density": "density"}
+        )
+
+        assert json.loads(json.dumps(result))
+        assert df["density"].dtype == "int32"
+
+
+class TestLazyBuilders:
+    """Test cases for importing the pmotools builders on first use."""
+
+    def test_import_does_not_load_builders(self):
+        """Test that importing the transforms loads no builder module."""
+        src = os.path.join(os.path.dirname(__file__), "..", "src")
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, transformer; "
+                "print([m for m in sys.modules if 'pmo_builder.' in m])",
+            ],
+            capture_output=True,
+            check=True,
+            cwd=src,
+            text=True,
+        )
+
+        assert result.stdout.strip() == "[]"
+
+    def test_builder_is_the_pmotools_function(self):
+        """Test that a builder attribute resolves to the pmotools function."""
+        from pmotools.pmo_builder.mhap_table_to_pmo import mhap_table_to_pmo
+
+        assert transformer.mhap_table_to_pmo is mhap_table_to_pmo
+        assert transformer._builder("mhap_table_to_pmo") is mhap_table_to_pmo
+
+    def test_unknown_attribute(self):
+        """Test that other missing attributes still raise AttributeError."""
+        with pytest.raises(AttributeError):
+            transformer.not_a_builder
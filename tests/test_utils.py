@@ -8,7 +8,7 @@ import tempfile
 import os
 from unittest.mock import patch, mock_open
 
-from utils import save_to_csv, load_schema
+from utils import LRUCache, save_to_csv, load_schema, write_atomically
 
 
 class TestSaveToCSV:
@@ -124,3 +124,60 @@ class TestLoadSchema:
         with patch("builtins.open", mock_open(read_data="{}")):
             result = load_schema()
             assert result == {}
+
+
+class TestLRUCache:
+    """Test cases for LRUCache."""
+
+    def test_least_recently_used_is_evicted(self):
+        """Test eviction order, and that a read refreshes an entry."""
+        cache = LRUCache(max_weight=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert (cache.hits, cache.misses) == (3, 1)
+
+    def test_weighted_entries(self):
+        """Test that entries are evicted by weight and oversized ones skipped."""
+        cache = LRUCache(max_weight=5, weigh=len)
+        cache.put("short", "abc")
+        cache.put("long", "abcdef")
+        cache.put("other", "de")
+
+        assert cache.get("long") is None
+        assert cache.weight == 5
+        cache.clear()
+        assert len(cache) == 0 and cache.weight == 0 and cache.hits == 0
+
+
+class TestWriteAtomically:
+    """Test cases for write_atomically function."""
+
+    def test_writes_file_without_leftovers(self, tmp_path):
+        """Test that the file is written and no temporary file is left."""
+        path = tmp_path / "store" / "entry.json"
+
+        write_atomically(path, lambda temporary: open(temporary, "w").close())
+
+        assert os.listdir(tmp_path / "store") == ["entry.json"]
+
+    def test_failed_write_keeps_previous_file(self, tmp_path):
+        """Test that a failing writer leaves the old file and no temporary one."""
+        path = tmp_path / "entry.json"
+        path.write_text("old")
+
+        def fail(temporary):
+            with open(temporary, "w") as file:
+                file.write("partial")
+            raise ValueError("cannot serialize")
+
+        with pytest.raises(ValueError):
+            write_atomically(path, fail)
+
+        assert path.read_text() == "old"
+        assert os.listdir(tmp_path) == ["entry.json"]